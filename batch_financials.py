@@ -0,0 +1,291 @@
+"""Колоночный (пакетный) расчёт финансовых показателей для множества регионов.
+
+Модуль повторяет формулы функции calculate_financials() из main_pro.py, но
+работает не с одним регионом, а сразу со столбцами входных данных: каждый
+показатель вычисляется одним проходом по всем регионам (map/zip по столбцам),
+без построения промежуточного словаря на каждый регион. Результаты можно
+хранить в компактной таблице FinancialTable (см. region_table.py), строки
+которой читаются так же, как словари calculate_financials().
+
+Результаты совпадают со скалярной функцией значение в значение, включая
+строку 'no payback' для убыточных регионов.
+"""
+
+import math
+from array import array
+from bisect import bisect_left
+from operator import mul, sub, add
+
+from columnar_loaders import AssumptionColumns
+from region_table import RegionRow, RegionTable
+
+# Базовый сценарий (совпадает с константами в calculate_financials)
+MONTHLY_SALES_VOLUME = 60   # объем продаж в месяц
+INITIAL_INVESTMENT = 500000   # начальные инвестиции в бизнес
+NO_PAYBACK = 'no payback'   # значение срока окупаемости для убыточных регионов
+NO_IP_DATA = -1   # ip_count региона без строк businesses.csv с выбранными кодами ОКВЭД
+
+# Названия входных столбцов пакетного расчёта
+INPUT_COLUMNS = (
+    'rent',   # средняя аренда за кв. м (regions.csv: avg_rent_per_sqm)
+    'area',   # площадь помещения (assumptions.csv: area_sqm)
+    'teachers',   # количество преподавателей
+    'salary',   # зарплата одного преподавателя (salary_per_teacher)
+    'avg_check',   # средний чек
+    'marketing',   # расходы на маркетинг
+    'other_costs',   # прочие расходы
+    'children_5_7',   # количество детей 5-7 лет
+    'ip_count',   # количество действующих ИП
+)
+
+# Необязательные входные столбцы: параметры сценария по строкам вместо общих
+# monthly_sales_volume и initial_investment (например, у разных форматов центра)
+SCENARIO_COLUMNS = (
+    'volume',   # объем продаж в месяц
+    'investment',   # начальные инвестиции (с паушальным взносом франшизы)
+    'royalty',   # роялти франшизы, % месячной выручки (входит в месячные затраты)
+)
+
+# Входные столбцы, которые берутся из assumptions.csv: {столбец: параметр}
+ASSUMPTION_SOURCES = {
+    'area': 'area_sqm',
+    'teachers': 'teachers',
+    'salary': 'salary_per_teacher',
+    'avg_check': 'avg_check',
+    'marketing': 'marketing',
+    'other_costs': 'other_costs',
+}
+
+# Границы уровней: значение <= границы попадает в соответствующий уровень
+PROFITABILITY_BOUNDS = (10, 25)
+PROFITABILITY_LEVELS = ('low', 'regular', 'high')
+COMPETITION_BOUNDS = (8, 12)
+COMPETITION_LEVELS = ('low', 'medium', 'high')
+UNKNOWN_LEVEL = 'unknown'   # уровень конкуренции при отсутствии данных об ИП (NO_IP_DATA)
+
+
+def bin_levels(values, bounds, levels):
+    """Раскладывает значения по уровням (low/regular/high и т.п.) одним проходом.
+
+    Значение x относится к уровню i, если bounds[i-1] < x <= bounds[i], что
+    повторяет конструкции match/case из calculate_financials().
+
+    Args:
+        values (iterable): Значения показателя.
+        bounds (tuple): Возрастающие границы уровней.
+        levels (tuple): Названия уровней (на один больше, чем границ).
+
+    Returns:
+        list: Названия уровней для каждого значения.
+    """
+    return [levels[bisect_left(bounds, x)] for x in values]
+
+
+def build_input_columns(regions, regions_dict, businesses_dict, assumptions_dict):
+    """Собирает входные столбцы из словарей, возвращаемых загрузчиками main_pro.
+
+    Args:
+        regions (list): Названия регионов в нужном порядке.
+        regions_dict (RegionTable | dict): Результат load_regions().
+        businesses_dict (RegionTable | dict): Результат load_businesses().
+        assumptions_dict (dict | AssumptionColumns): Результат load_assumptions()
+            или load_assumptions_columns().
+
+    Returns:
+        dict: Словарь {название столбца: array('q')} с ключами из INPUT_COLUMNS.
+
+    Исключения:
+        KeyError: Если для региона отсутствуют данные в одном из словарей.
+    """
+    if isinstance(regions_dict, RegionTable) and isinstance(businesses_dict, RegionTable):
+        # Таблицы уже разложены по столбцам - выбираем строки по индексу
+        columns = {
+            'rent': regions_dict.column('avg_rent_per_sqm', regions),
+            'children_5_7': regions_dict.column('children_5_7', regions),
+            'ip_count': businesses_dict.column('ip_count', regions),
+        }
+    else:
+        reg = [regions_dict[r] for r in regions]
+        bus = [businesses_dict[r] for r in regions]
+        columns = {
+            'rent': array('q', [d['avg_rent_per_sqm'] for d in reg]),
+            'children_5_7': array('q', [d['children_5_7'] for d in reg]),
+            'ip_count': array('q', [d['ip_count'] for d in bus]),
+        }
+    if isinstance(assumptions_dict, AssumptionColumns):
+        # Предположения уже разложены по столбцам - выбираем строки по индексу
+        for name, param in ASSUMPTION_SOURCES.items():
+            columns[name] = assumptions_dict.column(param, regions)
+    else:
+        ass = [assumptions_dict[r] for r in regions]
+        for name, param in ASSUMPTION_SOURCES.items():
+            columns[name] = array('q', [d[param] for d in ass])
+    return columns
+
+
+def calculate_financials_batch(regions, columns,
+                               monthly_sales_volume=MONTHLY_SALES_VOLUME,
+                               initial_investment=INITIAL_INVESTMENT):
+    """Вычисляет финансовые показатели для всех регионов столбцами.
+
+    Args:
+        regions (list): Названия регионов (по одному на строку столбцов).
+        columns (dict): Входные столбцы с ключами из INPUT_COLUMNS
+            (array, list или любая последовательность одинаковой длины) и
+            необязательными столбцами SCENARIO_COLUMNS.
+        monthly_sales_volume (int, optional): Объем продаж в месяц, если нет
+            столбца 'volume'. По умолчанию 60.
+        initial_investment (int, optional): Начальные инвестиции, если нет
+            столбца 'investment'. По умолчанию 500000.
+
+    Returns:
+        dict: Словарь столбцов с теми же ключами, что и результат
+            calculate_financials(): 'region', 'children_5_7', 'ip_count',
+            'total_costs', 'monthly_revenue', 'profit', 'profitability',
+            'profitability_level', 'break_even_children', 'competition_density',
+            'competition_level', 'payback_period_month'.
+
+    Исключения:
+        KeyError: Если отсутствует один из входных столбцов.
+        ValueError: Если длины столбцов не совпадают с количеством регионов.
+        ZeroDivisionError: При нулевой выручке или нулевом количестве детей.
+    """
+    n = len(regions)
+    for name in INPUT_COLUMNS + tuple(name for name in SCENARIO_COLUMNS if name in columns):
+        if len(columns[name]) != n:
+            raise ValueError(f'Столбец {name} содержит {len(columns[name])} значений, ожидалось {n}.')
+
+    children = columns['children_5_7']
+    ip_count = columns['ip_count']
+    avg_check = columns['avg_check']
+
+    # Месячные затраты: аренда + зарплаты + маркетинг + прочие
+    rent = map(mul, columns['rent'], columns['area'])
+    salaries = map(mul, columns['teachers'], columns['salary'])
+    total_costs = array('q', map(add, map(add, rent, salaries),
+                                 map(add, columns['marketing'], columns['other_costs'])))
+    if 'volume' in columns:
+        monthly_revenue = array('q', map(mul, avg_check, columns['volume']))
+    else:
+        monthly_revenue = array('q', [c * monthly_sales_volume for c in avg_check])
+    if 'royalty' in columns:
+        # Роялти растёт с выручкой: точка безубыточности - первый объём, при
+        # котором выручка за вычетом роялти покрывает остальные затраты
+        royalty = columns['royalty']
+        break_even_children = array('q', [-(-c * 100 // (a * (100 - r)))
+                                          for c, a, r in zip(total_costs, avg_check, royalty)])
+        total_costs = array('q', [c + round(v * r / 100) for c, v, r in zip(total_costs, monthly_revenue, royalty)])
+    else:
+        break_even_children = array('q', [math.ceil(c / a) for c, a in zip(total_costs, avg_check)])
+    profit = array('q', map(sub, monthly_revenue, total_costs))
+    profitability = array('d', [round((p / r) * 100, 1) for p, r in zip(profit, monthly_revenue)])
+
+    # Без данных об ИП плотность не определена: math.inf ставит регион последним
+    # в рейтингах конкуренции, а уровень - UNKNOWN_LEVEL вместо «низкого»
+    competition_density = array('d', [round(ip / (ch / 1000), 1) if ip != NO_IP_DATA else math.inf
+                                      for ip, ch in zip(ip_count, children)])
+    competition_level = [UNKNOWN_LEVEL if ip == NO_IP_DATA else level for ip, level in
+                         zip(ip_count, bin_levels(competition_density, COMPETITION_BOUNDS, COMPETITION_LEVELS))]
+
+    if 'investment' in columns:
+        payback = [math.ceil(i / p) if p > 0 else NO_PAYBACK for i, p in zip(columns['investment'], profit)]
+    else:
+        payback = [math.ceil(initial_investment / p) if p > 0 else NO_PAYBACK for p in profit]
+
+    return {
+        'region': list(regions),
+        'children_5_7': array('q', children),
+        'ip_count': array('q', ip_count),
+        'total_costs': total_costs,
+        'monthly_revenue': monthly_revenue,
+        'profit': profit,
+        'profitability': profitability,
+        'profitability_level': bin_levels(profitability, PROFITABILITY_BOUNDS, PROFITABILITY_LEVELS),
+        'break_even_children': break_even_children,
+        'competition_density': competition_density,
+        'competition_level': competition_level,
+        'payback_period_month': payback,
+    }
+
+
+def iter_financials(batch):
+    """Построчно выдаёт результаты пакетного расчёта в виде словарей.
+
+    Нужна для передачи результатов в генераторы отчётов, которые ожидают
+    словарь того же вида, что возвращает calculate_financials().
+
+    Args:
+        batch (dict): Результат calculate_financials_batch().
+
+    Yields:
+        dict: Словарь с финансовыми показателями одного региона.
+    """
+    keys = list(batch)
+    for values in zip(*(batch[k] for k in keys)):
+        yield dict(zip(keys, values))
+
+
+class FinancialResult(RegionRow):
+    """Показатели одного региона: строка FinancialTable.
+
+    Читается как словарь calculate_financials(): result['profit'],
+    result.get('ip_count'), dict(result).
+    """
+
+    __slots__ = ()
+
+
+# Столбцы уровней хранятся кодами (номер уровня в кортеже названий)
+LEVEL_COLUMNS = {
+    'profitability_level': PROFITABILITY_LEVELS,
+    'competition_level': COMPETITION_LEVELS + (UNKNOWN_LEVEL,),
+}
+NO_PAYBACK_CODE = -1   # значение столбца срока окупаемости для убыточных регионов
+
+
+class FinancialTable(RegionTable):
+    """Результаты пакетного расчёта в столбцах array: {регион: FinancialResult}.
+
+    Числовые показатели хранятся в array('q')/array('d'), уровни - кодами в
+    array('B'), срок окупаемости - в array('q') с NO_PAYBACK_CODE вместо
+    'no payback'. Строки-представления возвращают значения в том же виде, что
+    и calculate_financials(), поэтому генераторы отчётов, рейтинги и выгрузка
+    работают с таблицей напрямую.
+    """
+
+    __slots__ = ()
+
+    row_type = FinancialResult
+
+    @classmethod
+    def from_batch(cls, batch):
+        """Создаёт таблицу из результата calculate_financials_batch().
+
+        Исключения:
+            ValueError: Если длины столбцов не совпадают.
+        """
+        columns = {}
+        for field, values in batch.items():
+            if field == 'region':
+                columns[field] = list(values)   # он же - список регионов таблицы
+            elif field in LEVEL_COLUMNS:
+                codes = {level: code for code, level in enumerate(LEVEL_COLUMNS[field])}
+                columns[field] = array('B', map(codes.__getitem__, values))
+            elif field == 'payback_period_month':
+                columns[field] = array('q', [NO_PAYBACK_CODE if m == NO_PAYBACK else m for m in values])
+            else:
+                columns[field] = values if isinstance(values, array) else array('q', values)
+        return cls.from_columns(columns['region'], columns)
+
+    def _build_getters(self):
+        getters = {}
+        for field in self.fields:
+            column = self.columns[field]
+            if field in LEVEL_COLUMNS:
+                levels = LEVEL_COLUMNS[field]
+                getters[field] = lambda i, codes=column, levels=levels: levels[codes[i]]
+            elif field == 'payback_period_month':
+                getters[field] = lambda i, months=column: NO_PAYBACK if months[i] == NO_PAYBACK_CODE else months[i]
+            else:
+                getters[field] = column.__getitem__
+        return getters
@@ -0,0 +1,152 @@
+"""Нагрузочный клиент для HTTP-сервиса (см. http_service.py).
+
+Клиент открывает заданное число соединений keep-alive, по кругу отправляет
+запросы к указанным путям и выводит таблицу с числом запросов в секунду и
+перцентилями задержки (p50, p90, p99) по каждому пути и в целом.
+
+С флагом --serve сервис запускается в том же процессе на свободном порту по
+данным из --data-dir, иначе клиент обращается к уже запущенному сервису.
+
+Пример:
+    python main_pro.py serve --port 8765 &
+    python bench_http_service.py --port 8765 --requests 5000 --concurrency 16
+    python bench_http_service.py --serve --requests 2000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import defaultdict
+from urllib.parse import quote, unquote
+
+import http_service
+from create_table import format_fancy_table
+from main_pro import load_data
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(sorted_values, q):
+    """Перцентиль по отсортированному списку (ближайший ранг)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def default_paths(regions):
+    """Набор путей по умолчанию: все виды отчётов и показатели."""
+    regions = sorted(regions)
+    paths = ['/financials', '/report/overview']
+    paths.extend(f'/report/single?region={quote(r)}' for r in regions)
+    if len(regions) >= 2:
+        paths.append(f'/report/compare?regions={quote(regions[0])},{quote(regions[1])}')
+    return paths
+
+
+async def _fetch(reader, writer, host, path):
+    """Отправляет один GET-запрос по открытому соединению и возвращает статус."""
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n'.encode('latin-1'))
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def run_load(host, port, paths, requests, concurrency):
+    """Выполняет нагрузочный тест.
+
+    Returns:
+        tuple: (общее время в секундах, {путь: [задержки в секундах]}, число ошибок).
+    """
+    latencies = defaultdict(list)
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for i in counter:
+                path = paths[i % len(paths)]
+                start = time.perf_counter()
+                status = await _fetch(reader, writer, host, path)
+                latencies[path].append(time.perf_counter() - start)
+                if status != 200:
+                    errors += 1
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start, latencies, errors
+
+
+def format_results(elapsed, latencies, errors):
+    """Таблица результатов нагрузочного теста."""
+    rows = []
+    everything = sorted(v for values in latencies.values() for v in values)
+    groups = [(path, sorted(values)) for path, values in latencies.items()] + [('ВСЕГО', everything)]
+    for path, values in groups:
+        rows.append([unquote(path), len(values)] + [f'{percentile(values, q) * 1000:.2f} мс' for q in PERCENTILES])
+    headers = ['ПУТЬ', 'ЗАПРОСОВ'] + [f'P{q}' for q in PERCENTILES]
+    return (format_fancy_table(headers, rows) +
+            f'\nЗапросов в секунду: {len(everything) / elapsed:.0f}, ошибок: {errors}, время: {elapsed:.2f} с')
+
+
+async def _main(args):
+    server = None
+    host, port = args.host, args.port
+    if args.serve:
+        # Сервис в том же процессе: удобно для быстрой проверки без отдельного запуска
+        service = http_service.AnalysisService(load_data(args.data_dir), args.cache_size)
+        server = await http_service.start_server(service, host, 0)
+        port = server.sockets[0].getsockname()[1]
+        regions = service.tables[0]
+    else:
+        regions = None
+    paths = args.paths or default_paths(regions or await _fetch_regions(host, port))
+    try:
+        elapsed, latencies, errors = await run_load(host, port, paths, args.requests, args.concurrency)
+    finally:
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+    print(format_results(elapsed, latencies, errors))
+
+
+async def _fetch_regions(host, port):
+    """Список регионов запущенного сервиса (GET /regions)."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f'GET /regions HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n'.encode('latin-1'))
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    return json.loads(response.split(b'\r\n\r\n', 1)[1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default=http_service.DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=http_service.DEFAULT_PORT)
+    parser.add_argument('--requests', type=int, default=2000, help='всего запросов')
+    parser.add_argument('--concurrency', type=int, default=8, help='одновременных соединений')
+    parser.add_argument('--paths', nargs='+', metavar='ПУТЬ', help='пути запросов (по умолчанию все виды отчётов)')
+    parser.add_argument('--serve', action='store_true', help='запустить сервис в этом же процессе')
+    parser.add_argument('--data-dir', default='.', help='директория с CSV-файлами (для --serve)')
+    parser.add_argument('--cache-size', type=int, default=http_service.DEFAULT_CACHE_SIZE,
+                        help='размер кэша ответов (для --serve)')
+    args = parser.parse_args(argv)
+    asyncio.run(_main(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Замер памяти: таблицы в столбцах (RegionTable, FinancialTable) против словарей словарей.
+
+Для синтетических данных заданного масштаба (см. synthetic_data.py) в
+отдельном процессе для каждого варианта загружаются regions, businesses и
+assumptions и рассчитываются показатели всех регионов:
+
+    dict  - словари словарей и словари calculate_financials() на регион
+            (представление до перехода на RegionTable);
+    table - RegionTable, AssumptionColumns и FinancialTable.
+
+Выводится удерживаемая память структур (tracemalloc) и пиковый размер
+резидентной памяти процесса (ru_maxrss).
+
+Пример:
+    python bench_region_table.py --regions 100000
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+import main_pro
+from batch_financials import build_input_columns, calculate_financials_batch, iter_financials
+from columnar_loaders import load_assumptions_columns
+from create_table import format_fancy_table
+from synthetic_data import generate_dataset
+
+VARIANTS = ('dict', 'table')
+
+
+def build(variant, paths):
+    """Загружает таблицы и рассчитывает показатели в заданном представлении."""
+    regions_path, businesses_path, assumptions_path = paths
+    if variant == 'table':
+        tables = (main_pro.load_regions(regions_path), main_pro.load_businesses(businesses_path),
+                  load_assumptions_columns(assumptions_path))
+        return tables, main_pro.compute_financials(list(tables[0]), *tables)
+    tables = (main_pro.load_regions(regions_path).to_dict(), main_pro.load_businesses(businesses_path).to_dict(),
+              main_pro.load_assumptions(assumptions_path))
+    regions = list(tables[0])
+    batch = calculate_financials_batch(regions, build_input_columns(regions, *tables))
+    return tables, {result['region']: result for result in iter_financials(batch)}
+
+
+def measure_variant(variant, paths):
+    """Удерживаемая память структур (байт) и пиковый RSS процесса (байт)."""
+    # Пиковый RSS - без трассировки, которая сама расходует память;
+    # ru_maxrss - в килобайтах в Linux и в байтах в macOS
+    data = build(variant, paths)
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+    del data
+    tracemalloc.start()
+    data = build(variant, paths)
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return retained, rss
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--regions', type=lambda text: int(float(text)), default=100000,
+                        help='число регионов (допускается запись вида 1e5)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--variant', choices=VARIANTS, help=argparse.SUPPRESS)   # запуск в дочернем процессе
+    parser.add_argument('--data-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.variant:
+        paths = [f'{args.data_dir}/{name}' for name in main_pro.DATA_FILES]
+        print(json.dumps(measure_variant(args.variant, paths)))
+        return
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        generate_dataset(data_dir, args.regions, args.seed)
+        measured = {}
+        for variant in VARIANTS:
+            # Каждый вариант - в отдельном процессе, чтобы пиковый RSS не смешивался
+            output = subprocess.run([sys.executable, __file__, '--variant', variant, '--data-dir', data_dir],
+                                    capture_output=True, text=True, check=True).stdout
+            measured[variant] = json.loads(output.splitlines()[-1])
+
+    base_retained, base_rss = measured['dict']
+    rows = [[variant, f'{retained / 2**20:.1f} МиБ', f'{base_retained / retained:.1f}x',
+             f'{rss / 2**20:.1f} МиБ', f'{base_rss / rss:.1f}x']
+            for variant, (retained, rss) in measured.items()]
+    print(f'Регионов: {args.regions}')
+    print(format_fancy_table(['ПРЕДСТАВЛЕНИЕ', 'СТРУКТУРЫ', 'ЭКОНОМИЯ', 'ПИКОВЫЙ RSS', 'ЭКОНОМИЯ'], rows))
+
+
+if __name__ == '__main__':
+    main()
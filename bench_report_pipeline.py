@@ -0,0 +1,97 @@
+"""Замер масштабирования параллельной генерации отчётов по числу процессов.
+
+Скрипт генерирует синтетические показатели для заданного числа регионов,
+формирует все отчёты (по каждому региону, все попарные сравнения и сводный)
+при разном количестве процессов и выводит таблицу пропускной способности.
+Содержимое отчётов при каждом числе процессов сверяется по хешу с эталоном,
+записанным прежним способом (render_report() и save_report() по одному
+отчёту), а число записанных байт - с размером файлов на диске.
+
+Пример:
+    python bench_report_pipeline.py --regions 200 --workers 1 2 4 8
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import tempfile
+import time
+from array import array
+
+from batch_financials import INPUT_COLUMNS, calculate_financials_batch, iter_financials
+from create_table import format_fancy_table
+from main_pro import plan_reports, render_report, save_report
+from report_pipeline import run_report_pipeline
+from synthetic_data import SYNTHETIC_RANGES
+
+
+def synthetic_results(count, seed=0):
+    """Возвращает синтетические результаты расчёта {регион: показатели}."""
+    rnd = random.Random(seed)
+    regions = [f'Регион-{i:05d}' for i in range(count)]
+    columns = {name: array('q', [rnd.randint(*SYNTHETIC_RANGES[name]) for _ in regions])
+               for name in INPUT_COLUMNS}
+    batch = calculate_financials_batch(regions, columns)
+    return {result['region']: result for result in iter_financials(batch)}
+
+
+def directory_digest(path):
+    """Хеш содержимого всех файлов директории (в порядке имён)."""
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(path)):
+        digest.update(name.encode('utf-8'))
+        with open(os.path.join(path, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def directory_size(path):
+    """Суммарный размер файлов директории в байтах."""
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def reference_digest(results, jobs):
+    """Хеш отчётов, записанных последовательно через save_report()."""
+    with tempfile.TemporaryDirectory() as output_dir:
+        for kind, regions, options in jobs:
+            save_report(*render_report(kind, regions, results, options), output_dir)
+        return directory_digest(output_dir)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--regions', type=int, default=150, help='число синтетических регионов')
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+                        help='варианты числа процессов')
+    parser.add_argument('--io-workers', type=int, default=4, help='потоков записи')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    results = synthetic_results(args.regions, args.seed)
+    jobs = plan_reports(results)
+    print(f'Регионов: {args.regions}, отчётов: {len(jobs)}, ядер: {os.cpu_count()}')
+
+    expected_digest = reference_digest(results, jobs)
+    rows = []
+    baseline_time = None
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as output_dir:
+            start = time.perf_counter()
+            count, written = run_report_pipeline(results, jobs, output_dir, workers=workers,
+                                                 io_workers=0 if workers == 1 else args.io_workers)
+            elapsed = time.perf_counter() - start
+            digest = directory_digest(output_dir)
+            size = directory_size(output_dir)
+        if baseline_time is None:
+            baseline_time = elapsed
+        rows.append([workers, f'{elapsed:.2f} с', int(count / elapsed), f'{baseline_time / elapsed:.2f}x',
+                     'да' if digest == expected_digest else 'НЕТ', 'да' if written == size else 'НЕТ'])
+
+    headers = ['ПРОЦЕССОВ', 'ВРЕМЯ', 'ОТЧЁТОВ/С', 'УСКОРЕНИЕ', 'СОВПАДАЕТ', 'БАЙТЫ']
+    print(format_fancy_table(headers, rows))
+
+
+if __name__ == '__main__':
+    main()
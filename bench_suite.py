@@ -0,0 +1,246 @@
+"""Набор замеров производительности основных этапов на синтетических данных.
+
+Для каждого масштаба (по умолчанию 1e2, 1e3 и 1e4 регионов; допустимо до 1e6)
+генерируются regions.csv, businesses.csv и assumptions.csv (см.
+synthetic_data.py) и по отдельности замеряются этапы:
+
+    load_regions, load_businesses, load_assumptions, load_assumptions_columns
+    calculate_financials (по одному региону), calculate_financials_batch
+    project_cashflows (прогноз денежного потока на 60 месяцев)
+    optimize_portfolio (портфель центров на бюджет PORTFOLIO_CENTERS центров)
+    generate_single_report, generate_comparison_report (на выборке регионов)
+    generate_overview_report, write_overview_report, format_fancy_table (по всем регионам)
+
+Потоковая запись сводного отчёта (write_overview_report) сверяется побайтно с
+текстом generate_overview_report() и с таблицей, построенной прежним способом
+через format_fancy_table().
+
+Для каждого этапа записываются время (лучшее из нескольких прогонов),
+пропускная способность (элементов в секунду) и пиковая память по tracemalloc
+(отдельным прогоном, чтобы трассировка не искажала время). Результаты
+сохраняются в JSON; с флагом --compare они сравниваются с предыдущим файлом,
+и при замедлении какого-либо этапа больше порога скрипт завершается с кодом 1.
+
+Пример:
+    python bench_suite.py --scales 1e2 1e3 1e4 1e5 --output bench_new.json --compare bench_old.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import cashflow
+import main_pro
+import portfolio
+import skyline
+from batch_financials import INITIAL_INVESTMENT, build_input_columns, calculate_financials_batch, iter_financials
+from columnar_loaders import load_assumptions_columns
+from create_table import format_fancy_table
+from synthetic_data import generate_dataset
+
+RESULTS_VERSION = 1   # версия структуры файла результатов
+DEFAULT_SCALES = ('1e2', '1e3', '1e4')
+DEFAULT_SAMPLE = 1000   # регионов (и пар) для отчётов по одному региону и сравнений
+DEFAULT_REPEAT = 3   # прогонов для замера времени (берётся лучший)
+DEFAULT_THRESHOLD = 1.25   # допустимое замедление при сравнении
+PORTFOLIO_CENTERS = 20   # бюджет портфеля в начальных инвестициях одного центра
+MIN_COMPARE_SECONDS = 0.005   # более короткие этапы не помечаются как замедление (шум)
+
+
+def measure(function, repeat=DEFAULT_REPEAT, memory=True):
+    """Замеряет время выполнения (лучшее из repeat прогонов) и пиковую память функции.
+
+    Returns:
+        tuple: (результат функции, секунды, пик памяти в байтах или None).
+    """
+    elapsed = None
+    for _ in range(max(1, repeat)):
+        gc.collect()
+        start = time.perf_counter()
+        result = function()
+        run_time = time.perf_counter() - start
+        elapsed = run_time if elapsed is None else min(elapsed, run_time)
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            function()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def check_overview_parity(results, path):
+    """Проверяет, что потоково записанный сводный отчёт совпадает с прежним выводом.
+
+    Исключения:
+        RuntimeError: Если файл отличается от generate_overview_report() или
+            таблица - от format_fancy_table() по тем же строкам.
+    """
+    with open(path, 'rb') as f:
+        written = f.read()
+    if written != main_pro.generate_overview_report(results).encode('utf-8'):
+        raise RuntimeError('потоковая запись сводного отчёта отличается от generate_overview_report()')
+    # Таблица, как её строил сводный отчёт до потоковой записи: список строк и format_fancy_table()
+    tiers = {r['region']: layer + 1 for r, layer in zip(results, skyline.pareto_layers(results))}
+    rows = [[r['region'], r['profit'], f"{r['profitability']:.1f}%",
+             main_pro.competition_labels[r['competition_level']], f"{r['payback_period_month']} мес.",
+             tiers[r['region']]] for r in sorted(results, key=lambda x: x['profit'], reverse=True)]
+    headers = ["РЕГИОН", "ПРИБЫЛЬ", "РЕНТАБ.", "КОНКУРЕНЦИЯ", "ОКУПАЕМОСТЬ", "ЯРУС"]
+    expected = (f'СВОДНЫЙ АНАЛИЗ ПО {len(results)} РЕГИОНАМ\n\n'
+                + format_fancy_table(headers, rows, currency_columns=[1]) + '\n')
+    if not written.startswith(expected.encode('utf-8')):
+        raise RuntimeError('таблица сводного отчёта отличается от format_fancy_table()')
+
+
+def run_scale(count, sample=DEFAULT_SAMPLE, repeat=DEFAULT_REPEAT, memory=True, seed=0):
+    """Выполняет замеры всех этапов для одного масштаба.
+
+    Returns:
+        list: Записи {'scale', 'stage', 'items', 'seconds', 'per_second', 'peak_bytes'}.
+    """
+    records = []
+
+    def stage(name, items, function):
+        result, elapsed, peak = measure(function, repeat, memory)
+        records.append({'scale': count, 'stage': name, 'items': items, 'seconds': round(elapsed, 6),
+                        'per_second': round(items / elapsed, 1) if elapsed > 0 else None,
+                        'peak_bytes': peak})
+        print(f'  {name:<28}{elapsed:9.3f} с', file=sys.stderr)
+        return result
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        regions_path, businesses_path, assumptions_path = generate_dataset(data_dir, count, seed)
+
+        regions_dict = stage('load_regions', count, lambda: main_pro.load_regions(regions_path))
+        businesses_dict = stage('load_businesses', count, lambda: main_pro.load_businesses(businesses_path))
+        assumptions_dict = stage('load_assumptions', count, lambda: main_pro.load_assumptions(assumptions_path))
+        stage('load_assumptions_columns', count, lambda: load_assumptions_columns(assumptions_path))
+
+    regions = sorted(regions_dict)
+    stage('calculate_financials', count, lambda: [
+        main_pro.calculate_financials(r, regions_dict[r], businesses_dict[r], assumptions_dict[r]) for r in regions])
+
+    def batch():
+        columns = build_input_columns(regions, regions_dict, businesses_dict, assumptions_dict)
+        return list(iter_financials(calculate_financials_batch(regions, columns)))
+    results = stage('calculate_financials_batch', count, batch)
+    columns = build_input_columns(regions, regions_dict, businesses_dict, assumptions_dict)
+    stage('project_cashflows', count, lambda: cashflow.project_cashflows(regions, columns, cashflow.make_assumptions()))
+    stage('optimize_portfolio', count, lambda: portfolio.optimize_portfolio(
+        portfolio.build_items(regions, columns), PORTFOLIO_CENTERS * INITIAL_INVESTMENT))
+
+    sampled = results[:sample]
+    pairs = list(zip(sampled, sampled[1:] + sampled[:1]))
+    stage('generate_single_report', len(sampled), lambda: [main_pro.generate_single_report(r) for r in sampled])
+    stage('generate_comparison_report', len(pairs),
+          lambda: [main_pro.generate_comparison_report(list(pair)) for pair in pairs])
+    stage('generate_overview_report', count, lambda: main_pro.generate_overview_report(results))
+    with tempfile.TemporaryDirectory() as output_dir:
+        stage('write_overview_report', count, lambda: main_pro.save_report(
+            'report_overview_all.txt', main_pro.iter_overview_report(results), output_dir))
+        check_overview_parity(results, os.path.join(output_dir, 'report_overview_all.txt'))
+
+    rows = [[r['region'], r['profit'], f"{r['profitability']:.1f}%", r['competition_level'],
+             f"{r['payback_period_month']} мес."] for r in results]
+    headers = ["РЕГИОН", "ПРИБЫЛЬ", "РЕНТАБ.", "КОНКУРЕНЦИЯ", "ОКУПАЕМОСТЬ"]
+    stage('format_fancy_table', count, lambda: format_fancy_table(headers, rows, currency_columns=[1]))
+    return records
+
+
+def git_revision():
+    """Текущий коммит git (или None вне репозитория)."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """Сравнивает записи с предыдущим прогоном по (масштаб, этап).
+
+    Returns:
+        tuple: (строки таблицы сравнения, число этапов с замедлением больше порога).
+    """
+    previous = {(r['scale'], r['stage']): r for r in baseline['results']}
+    rows, regressions = [], 0
+    for record in current:
+        old = previous.get((record['scale'], record['stage']))
+        if old is None or not old['seconds']:
+            continue
+        ratio = record['seconds'] / old['seconds']
+        flag = 'ЗАМЕДЛЕНИЕ' if ratio > threshold and record['seconds'] >= MIN_COMPARE_SECONDS else ''
+        regressions += bool(flag)
+        rows.append([record['scale'], record['stage'], f"{old['seconds']:.3f} с",
+                     f"{record['seconds']:.3f} с", f'{ratio:.2f}x', flag])
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', nargs='+', default=DEFAULT_SCALES,
+                        help='числа регионов, например 1e2 1e3 1e4 (по умолчанию 1e2 1e3 1e4)')
+    parser.add_argument('--sample', type=int, default=DEFAULT_SAMPLE,
+                        help='регионов для отчётов по региону и сравнений (по умолчанию 1000)')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help='прогонов для замера времени, берётся лучший (по умолчанию 3)')
+    parser.add_argument('--no-memory', action='store_true', help='не замерять пиковую память (быстрее)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='bench_results.json', help='файл результатов (JSON)')
+    parser.add_argument('--compare', metavar='ФАЙЛ', help='сравнить с результатами предыдущего прогона')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='допустимое замедление при сравнении (по умолчанию 1.25)')
+    args = parser.parse_args(argv)
+
+    records = []
+    for text in args.scales:
+        count = int(float(text))
+        print(f'Масштаб: {count} регионов', file=sys.stderr)
+        records.extend(run_scale(count, args.sample, args.repeat, not args.no_memory, args.seed))
+
+    document = {
+        'version': RESULTS_VERSION,
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'git': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'sample': args.sample,
+            'repeat': args.repeat,
+            'seed': args.seed,
+        },
+        'results': records,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+
+    headers = ['РЕГИОНОВ', 'ЭТАП', 'ЭЛЕМЕНТОВ', 'ВРЕМЯ', 'ЭЛЕМЕНТОВ/С', 'ПИК ПАМЯТИ']
+    rows = [[r['scale'], r['stage'], r['items'], f"{r['seconds']:.3f} с", int(r['per_second'] or 0),
+             '—' if r['peak_bytes'] is None else f"{r['peak_bytes'] / 2**20:.1f} МиБ"] for r in records]
+    print(format_fancy_table(headers, rows))
+    print(f'Результаты сохранены: {args.output}')
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows, regressions = compare_results(records, baseline, args.threshold)
+        print(format_fancy_table(['РЕГИОНОВ', 'ЭТАП', 'БЫЛО', 'СТАЛО', 'ОТНОШЕНИЕ', ''], rows))
+        if regressions:
+            print(f'Замедлений больше {args.threshold}x: {regressions}')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,280 @@
+"""Инкрементальная пересборка отчётов по манифесту сборки.
+
+После правки одной строки assumptions.csv незачем пересчитывать все регионы и
+перезаписывать все report_*.txt. Манифест (JSON в служебной директории
+.basepro/build, по одному на директорию отчётов) хранит:
+
+    inputs  - хеш входных строк каждого региона из regions, businesses и
+              assumptions;
+    results - рассчитанные показатели регионов;
+    reports - для каждого задания plan_reports() ключ зависимостей (тип,
+              регионы, параметры и хеши входов этих регионов), хеш текста
+              отчёта и отпечаток файла на диске.
+
+При следующем запуске через calculate_financials() проходят только регионы с
+изменившимися входами, заново формируются только отчёты, зависящие от них
+(а также отсутствующие или изменённые на диске), и перезаписываются только
+файлы, текст которых действительно изменился. Остальные файлы не трогаются.
+
+Если изменился код расчёта или формирования отчётов (любой модуль проекта,
+транзитивно импортируемый из main_pro), манифест считается недействительным и
+выполняется полная пересборка. Записи о регионах и отчётах, не вошедших в
+текущую сборку (например, при выборке --regions), сохраняются для следующих
+запусков; удаляются только записи о регионах, исчезнувших из входных данных,
+и об отчётах, файлов которых больше нет на диске.
+"""
+
+import ast
+import functools
+import hashlib
+import importlib.util
+import json
+import os
+import tempfile
+
+from data_cache import file_digest, source_stamp, stamp_matches
+from report_pipeline import render_reports, write_reports
+
+MANIFEST_DIR = os.path.join('.basepro', 'build')   # служебная директория проекта
+MANIFEST_VERSION = 1   # версия структуры манифеста
+
+# Модуль, с которого начинается обход импортов при вычислении хеша кода
+CODE_ROOT = 'main_pro'
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _project_module(name):
+    """Путь к исходному файлу модуля проекта или None (стандартная библиотека, пакеты)."""
+    try:
+        spec = importlib.util.find_spec(name)
+    except (ImportError, ValueError):
+        return None
+    if spec is None or not spec.origin or not os.path.isfile(spec.origin):
+        return None
+    if os.path.dirname(os.path.abspath(spec.origin)) != PROJECT_DIR:
+        return None
+    return spec.origin
+
+
+def _imported_names(path):
+    """Имена модулей верхнего уровня, импортируемых в файле (включая импорты внутри функций)."""
+    with open(path, 'rb') as f:
+        tree = ast.parse(f.read(), filename=path)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                yield alias.name.partition('.')[0]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            yield node.module.partition('.')[0]
+
+
+@functools.lru_cache(maxsize=None)
+def code_modules(root=CODE_ROOT):
+    """Модули проекта, транзитивно импортируемые из root, от которых зависят отчёты.
+
+    Список выводится из импортов в исходном коде, поэтому новый модуль расчёта
+    или формирования отчётов не нужно добавлять вручную.
+
+    Returns:
+        tuple: Пары (имя модуля, путь к файлу) в порядке имён.
+    """
+    found = {}
+    pending = [root]
+    while pending:
+        name = pending.pop()
+        if name in found:
+            continue
+        path = _project_module(name)
+        if path is None:
+            continue
+        found[name] = path
+        pending.extend(n for n in _imported_names(path) if n not in found)
+    return tuple(sorted(found.items()))
+
+
+def code_digest(modules=None):
+    """Хеш исходного кода модулей расчёта и формирования отчётов (по умолчанию code_modules())."""
+    digest = hashlib.sha256()
+    for name, path in modules or code_modules():
+        digest.update(name.encode('utf-8'))
+        digest.update(file_digest(path).encode('ascii'))
+    return digest.hexdigest()
+
+
+def manifest_path(output_dir, manifest_dir=MANIFEST_DIR):
+    """Возвращает путь к манифесту для директории отчётов."""
+    name = hashlib.sha256(os.path.abspath(output_dir).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(manifest_dir, f'manifest-{name}.json')
+
+
+def _digest(value):
+    """SHA-256 канонического JSON-представления значения."""
+    text = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _hashed_chunks(chunks, digest):
+    """Выдаёт части отчёта, добавляя их к хэшу digest по мере выдачи."""
+    for chunk in chunks:
+        digest.update(chunk.encode('utf-8'))
+        yield chunk
+
+
+def _input_row(table, region):
+    """Строка таблицы в виде словаря (строки RegionTable - представления) или None."""
+    return dict(table[region]) if region in table else None
+
+
+def region_input_digests(regions, regions_dict, businesses_dict, assumptions_dict):
+    """Хеши входных строк регионов из всех трёх таблиц.
+
+    Returns:
+        dict: Словарь {регион: хеш}.
+    """
+    return {region: _digest([_input_row(regions_dict, region), _input_row(businesses_dict, region),
+                             _input_row(assumptions_dict, region)])
+            for region in regions}
+
+
+def job_id(kind, regions):
+    """Идентификатор задания plan_reports() в манифесте."""
+    return '\0'.join([kind, *regions])
+
+
+def job_key(kind, regions, options, inputs):
+    """Ключ зависимостей отчёта: меняется при изменении входов любого из его регионов."""
+    return _digest([kind, regions, options, [inputs[r] for r in regions]])
+
+
+def empty_manifest():
+    """Пустой манифест для текущей версии кода."""
+    return {'version': MANIFEST_VERSION, 'code': code_digest(), 'inputs': {}, 'results': {}, 'reports': {}}
+
+
+def load_manifest(path):
+    """Читает манифест; при его отсутствии, повреждении или смене кода возвращает пустой."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return empty_manifest()
+    if manifest.get('version') != MANIFEST_VERSION or manifest.get('code') != code_digest():
+        return empty_manifest()
+    return manifest
+
+
+def save_manifest(path, manifest):
+    """Атомарно сохраняет манифест (временный файл в той же директории + замена)."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.json')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump(manifest, file, ensure_ascii=False)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)   # атомарная замена
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def build_reports(regions, tables, jobs, compute, output_dir='.', workers=1, io_workers=0,
+                  manifest_dir=MANIFEST_DIR, force=False, all_regions=None):
+    """Инкрементально пересчитывает регионы и пересобирает отчёты.
+
+    Args:
+        regions (list): Названия регионов.
+        tables (tuple): (regions_dict, businesses_dict, assumptions_dict).
+        jobs (list): Задания из main_pro.plan_reports().
+        compute (callable): Расчёт показателей compute(regions, *tables) ->
+            {регион: показатели} (main_pro.compute_financials, возвращает FinancialTable).
+        output_dir (str, optional): Директория для отчётов. По умолчанию текущая.
+        workers (int, optional): Процессов рендеринга (см. report_pipeline.render_reports()).
+        io_workers (int, optional): Потоков записи (см. report_pipeline.write_reports()).
+        manifest_dir (str, optional): Директория манифестов.
+        force (bool, optional): Игнорировать манифест и пересобрать всё. По умолчанию False.
+        all_regions (iterable, optional): Все регионы входных данных: записи о
+            регионах вне этого набора и об отчётах по ним удаляются из
+            манифеста. По умолчанию None - набор неизвестен (загружена
+            выборка), записи о регионах вне сборки сохраняются.
+
+    Returns:
+        tuple: (результаты {регион: показатели} в порядке regions, статистика
+            {'regions', 'recomputed', 'reports', 'rendered', 'written'}).
+    """
+    path = manifest_path(output_dir, manifest_dir)
+    manifest = empty_manifest() if force else load_manifest(path)
+    old_inputs, old_results, entries = manifest['inputs'], manifest['results'], manifest['reports']
+
+    # Расчёт только для регионов с изменившимися входами
+    inputs = region_input_digests(regions, *tables)
+    changed = [r for r in regions if old_inputs.get(r) != inputs[r] or r not in old_results]
+    fresh = compute(changed, *tables) if changed else {}
+    if len(changed) == len(regions):
+        results = fresh   # пересчитаны все регионы - таблица расчёта используется как есть
+    else:
+        results = {r: fresh[r] if r in fresh else old_results[r] for r in regions}
+    manifest['inputs'].update(inputs)
+    manifest['results'].update((r, dict(fresh[r])) for r in changed)
+    # Регионы, удалённые из входных данных, из манифеста убираются
+    removed = set()
+    if all_regions is not None:
+        present = set(all_regions)
+        removed = {r for r in old_inputs if r not in present}
+        for region in removed:
+            del old_inputs[region]
+            old_results.pop(region, None)
+
+    # Отчёты, зависящие от изменившихся регионов, отсутствующие или изменённые на диске
+    pending = []
+    for kind, job_regions, options in jobs:
+        key = job_key(kind, job_regions, options, inputs)
+        entry = entries.get(job_id(kind, job_regions))
+        if (entry is None or entry['key'] != key
+                or not stamp_matches(os.path.join(output_dir, entry['filename']), entry['stamp'])):
+            pending.append(((kind, job_regions, options), key))
+
+    written = []
+
+    def changed_reports():
+        """Пропускает отчёты, текст которых совпадает с уже лежащим на диске."""
+        rendered = render_reports(results, [job for job, _ in pending], workers, stream=True)
+        for (job, key), (filename, report) in zip(pending, rendered):
+            if not isinstance(report, str):
+                # Сводный отчёт частями: хэш считается при записи, без сборки текста
+                # целиком, поэтому такой отчёт записывается и при совпадении текста
+                digest = hashlib.sha256()
+                written.append((job, key, filename, digest))
+                yield filename, _hashed_chunks(report, digest)
+                continue
+            digest = hashlib.sha256(report.encode('utf-8')).hexdigest()
+            entry = entries.get(job_id(job[0], job[1]))
+            if (entry is not None and entry['filename'] == filename and entry['report'] == digest
+                    and stamp_matches(os.path.join(output_dir, filename), entry['stamp'])):
+                entry['key'] = key
+                continue
+            written.append((job, key, filename, digest))
+            yield filename, report
+
+    os.makedirs(output_dir, exist_ok=True)
+    write_reports(changed_reports(), output_dir, io_workers)
+    for (kind, job_regions, _), key, filename, digest in written:
+        entries[job_id(kind, job_regions)] = {
+            'key': key, 'filename': filename, 'report': digest if isinstance(digest, str) else digest.hexdigest(),
+            'stamp': source_stamp(os.path.join(output_dir, filename)),
+        }
+    # Записи об отчётах вне текущего плана сохраняются, пока их файлы на месте
+    # и регионы есть во входных данных (сами файлы не трогаются)
+    planned = {job_id(kind, job_regions) for kind, job_regions, _ in jobs}
+    manifest['reports'] = {
+        job: entry for job, entry in entries.items()
+        if job in planned or (removed.isdisjoint(job.split('\0')[1:])
+                              and os.path.exists(os.path.join(output_dir, entry['filename'])))}
+
+    save_manifest(path, manifest)
+    return results, {'regions': len(regions), 'recomputed': len(changed), 'reports': len(jobs),
+                     'rendered': len(pending), 'written': len(written)}
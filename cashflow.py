@@ -0,0 +1,412 @@
+"""Помесячный прогноз денежного потока с разгоном набора, сезонностью и индексацией аренды.
+
+calculate_financials() считает срок окупаемости как ceil(инвестиции / прибыль),
+то есть с полным набором детей с первого месяца. Модуль строит прогноз на
+горизонт (по умолчанию 60 месяцев) с учётом:
+
+    разгона набора  - доля полного набора в первые месяцы ("linear:6:0.3"
+                      или список долей "0.3,0.5,0.8");
+    сезонности      - множители набора по календарным месяцам ("6:0.7,7:0.5,8:0.6"),
+                      отсчёт от месяца открытия;
+    индексации      - годовой рост аренды, ступенькой раз в 12 месяцев;
+    дисконтирования - годовая ставка для NPV и дисконтированной окупаемости.
+
+По каждому региону рассчитываются накопленный денежный поток, NPV, IRR,
+месяц фактической окупаемости (первый месяц с неотрицательным накопленным
+потоком) и дисконтированной окупаемости.
+
+Поток региона r в месяце m раскладывается на произведения столбцов регионов
+на профили месяцев, не зависящие от региона:
+
+    CF[r, m] = выручка[r] * набор[m] - аренда[r] * индексация[m] - прочие затраты[r]
+
+Поэтому матрица регионы x месяцы не хранится и не обходится поэлементно в
+Python: накопленный поток месяца M - линейная комбинация трёх столбцов с
+префиксными суммами профилей, NPV - то же с дисконтированными суммами, а IRR
+ищется бисекцией сразу по всем регионам на сетке ставок с заранее
+вычисленными суммами профилей. Месячные проходы выполняются map по столбцам
+(один проход на месяц) только для ещё не окупившихся регионов.
+"""
+
+import csv
+import math
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+from itertools import accumulate, compress, repeat
+from operator import mul, not_, sub, truediv
+
+from batch_financials import INITIAL_INVESTMENT, MONTHLY_SALES_VOLUME
+from create_table import format_fancy_table
+from scenario_sweep import fixed_costs
+
+DEFAULT_HORIZON = 60   # горизонт прогноза, месяцев
+DEFAULT_START_MONTH = 9   # календарный месяц открытия (сентябрь - начало учебного года)
+DEFAULT_RAMP = 'linear:6:0.3'   # разгон набора: с 30% до полного за 6 месяцев
+DEFAULT_SEASON = '6:0.7,7:0.5,8:0.6'   # летний спад набора
+DEFAULT_RENT_INDEXATION = 0.05   # годовая индексация аренды
+DEFAULT_DISCOUNT_RATE = 0.15   # годовая ставка дисконтирования
+CHECKPOINT_MONTHS = 12   # шаг контрольных точек накопленного потока в отчёте
+
+# Сетка месячных ставок для поиска IRR: от -5% до +100% в месяц (около -46% и
+# +409 500% годовых). При более низких ставках NPV определяется последними
+# месяцами горизонта и из-за летних спадов может менять знак несколько раз
+IRR_RATE_MIN = -0.05
+IRR_RATE_MAX = 1.0
+IRR_GRID_STEPS = 4096
+
+# Параметры прогноза: горизонт, месяц открытия, разгон (доли полного набора
+# по первым месяцам), сезонность {календарный месяц: множитель}, годовые
+# индексация аренды и ставка дисконтирования
+CashflowAssumptions = namedtuple('CashflowAssumptions',
+                                 'horizon start_month ramp season rent_indexation discount_rate')
+
+# Без разгона, сезонности, индексации и дисконтирования месяц окупаемости
+# совпадает с ceil(инвестиции / прибыль) из calculate_financials()
+NEUTRAL_ASSUMPTIONS = CashflowAssumptions(DEFAULT_HORIZON, 1, (), {}, 0.0, 0.0)
+
+
+def parse_ramp(text):
+    """Разбирает описание разгона набора.
+
+    Поддерживаются "none" (полный набор с первого месяца), "linear:N:доля"
+    (линейный рост от доли до полного набора за N месяцев) и список долей
+    полного набора по первым месяцам через запятую ("0.3,0.5,0.8"); после
+    разгона набор полный.
+
+    Args:
+        text (str): Описание разгона.
+
+    Returns:
+        tuple: Доли полного набора по первым месяцам.
+
+    Исключения:
+        ValueError: Если описание некорректно.
+    """
+    if text == 'none':
+        return ()
+    try:
+        if text.startswith('linear:'):
+            _, months, start = text.split(':')
+            months, start = int(months), float(start)
+            if months < 1:
+                raise ValueError
+            shares = tuple(start + (1 - start) * k / months for k in range(months))
+        else:
+            shares = tuple(float(part) for part in text.split(','))
+    except ValueError:
+        raise ValueError(f'некорректный разгон набора {text!r}') from None
+    if any(share < 0 for share in shares):
+        raise ValueError(f'доли набора в разгоне {text!r} должны быть неотрицательными')
+    return shares
+
+
+def parse_season(text):
+    """Разбирает сезонные множители набора вида "6:0.7,7:0.5,8:0.6" ("none" - без сезонности).
+
+    Returns:
+        dict: Словарь {календарный месяц 1-12: множитель набора}.
+
+    Исключения:
+        ValueError: Если описание некорректно.
+    """
+    if text == 'none':
+        return {}
+    season = {}
+    try:
+        for part in text.split(','):
+            month, factor = part.split(':')
+            season[int(month)] = float(factor)
+    except ValueError:
+        raise ValueError(f'некорректная сезонность {text!r}') from None
+    if any(not 1 <= month <= 12 or factor < 0 for month, factor in season.items()):
+        raise ValueError(f'сезонность {text!r}: месяцы 1-12, множители неотрицательные')
+    return season
+
+
+def make_assumptions(horizon=DEFAULT_HORIZON, start_month=DEFAULT_START_MONTH, ramp=DEFAULT_RAMP,
+                     season=DEFAULT_SEASON, rent_indexation=DEFAULT_RENT_INDEXATION,
+                     discount_rate=DEFAULT_DISCOUNT_RATE):
+    """Собирает и проверяет параметры прогноза.
+
+    Args:
+        horizon (int, optional): Горизонт, месяцев. По умолчанию 60.
+        start_month (int, optional): Календарный месяц открытия. По умолчанию 9.
+        ramp (str, optional): Разгон набора (см. parse_ramp()).
+        season (str, optional): Сезонность (см. parse_season()).
+        rent_indexation (float, optional): Годовая индексация аренды. По умолчанию 0.05.
+        discount_rate (float, optional): Годовая ставка дисконтирования. По умолчанию 0.15.
+
+    Returns:
+        CashflowAssumptions: Параметры прогноза.
+
+    Исключения:
+        ValueError: Если параметры некорректны.
+    """
+    if horizon < 1:
+        raise ValueError('горизонт прогноза должен быть положительным')
+    if not 1 <= start_month <= 12:
+        raise ValueError('месяц открытия должен быть от 1 до 12')
+    if rent_indexation <= -1 or discount_rate <= -1:
+        raise ValueError('индексация и ставка дисконтирования должны быть больше -100%')
+    return CashflowAssumptions(horizon, start_month, parse_ramp(ramp), parse_season(season),
+                               rent_indexation, discount_rate)
+
+
+def month_profiles(assumptions):
+    """Профили месяцев, общие для всех регионов.
+
+    Returns:
+        tuple: (доли полного набора с учётом разгона и сезонности,
+            множители аренды с учётом индексации) - списки длины horizon.
+    """
+    ramp, season = assumptions.ramp, assumptions.season
+    enrollment = [(ramp[m] if m < len(ramp) else 1.0) * season.get((assumptions.start_month - 1 + m) % 12 + 1, 1.0)
+                  for m in range(assumptions.horizon)]
+    rent_factors = [(1 + assumptions.rent_indexation) ** (m // 12) for m in range(assumptions.horizon)]
+    return enrollment, rent_factors
+
+
+def _profile_sums(enrollment, rent_factors, rate):
+    """Дисконтированные по месячной ставке суммы профилей и единичного потока."""
+    v = 1 / (1 + rate)
+    weights = list(accumulate(repeat(v, len(enrollment)), mul))   # v^1 ... v^horizon
+    return sum(map(mul, enrollment, weights)), sum(map(mul, rent_factors, weights)), sum(weights)
+
+
+def _combine(a, b, c, x, y, z):
+    """Генератор a*x - b*y - c*z по регионам (a, b, c - столбцы, x, y, z - числа)."""
+    return map(sub, map(sub, map(mul, a, repeat(x)), map(mul, b, repeat(y))), map(mul, c, repeat(z)))
+
+
+def _upper_hull(points):
+    """Верхняя выпуклая оболочка точек, упорядоченных по возрастанию первой координаты."""
+    hull = []
+    for x, y in points:
+        while len(hull) >= 2 and ((hull[-1][0] - hull[-2][0]) * (y - hull[-2][1])
+                                  >= (hull[-1][1] - hull[-2][1]) * (x - hull[-2][0])):
+            hull.pop()
+        hull.append((x, y))
+    return hull
+
+
+def _first_month(a, b, c, prefix_a, prefix_b, prefix_c, investment):
+    """Первый месяц, в котором a*A[M] - b*B[M] - c*C[M] >= investment (None - не достигается).
+
+    Столбцы a, b, c неотрицательны, C возрастает. Каждый месяц - один проход
+    по регионам, ещё не достигшим порога (генератор списка по float быстрее
+    цепочки map).
+
+    При положительных вложениях регионы, которые не достигают порога ни в
+    одном месяце, отбрасываются до помесячных проходов: B[M] >= k*C[M] с
+    k = min(B/C), поэтому значение не больше a*A[M] - (b*k + c)*C[M], а
+    максимум этой оценки по месяцам достигается в вершине верхней выпуклой
+    оболочки точек (C[M], A[M]) и находится бинарным поиском по наклонам рёбер.
+    """
+    n = len(a)
+    result = [None] * n
+    pending = list(range(n))
+    if investment > 0:
+        ratio = min(map(truediv, prefix_b, prefix_c))
+        hull = _upper_hull([(0.0, 0.0), *zip(prefix_c, prefix_a)])
+        slopes = [(y1 - y2) / (x2 - x1) for (x1, y1), (x2, y2) in zip(hull, hull[1:])]   # возрастают
+        keep = []
+        for p, q, r in zip(a, b, c):
+            w = q * ratio + r
+            x, y = hull[bisect_right(slopes, -w / p) if p > 0 else 0]
+            keep.append(p * y - w * x >= investment)
+        pending = list(compress(pending, keep))
+        a, b, c = list(compress(a, keep)), list(compress(b, keep)), list(compress(c, keep))
+    for month, (x, y, z) in enumerate(zip(prefix_a, prefix_b, prefix_c), 1):
+        if not pending:
+            break
+        reached = [p * x - q * y - r * z >= investment for p, q, r in zip(a, b, c)]
+        for i in compress(pending, reached):
+            result[i] = month
+        keep = list(map(not_, reached))
+        pending = list(compress(pending, keep))
+        a, b, c = list(compress(a, keep)), list(compress(b, keep)), list(compress(c, keep))
+    return result
+
+
+def _irr(revenue, rent, fixed, investment, enrollment, rent_factors):
+    """Годовая IRR по регионам (None - корень вне сетки ставок или поток без смены знака).
+
+    Суммы профилей на сетке месячных ставок не зависят от региона и считаются
+    один раз; затем бисекция по номеру узла сетки идёт сразу по всем регионам
+    (NPV убывает по ставке для потока "вложения, затем доходы"), а ставка
+    уточняется линейной интерполяцией между соседними узлами.
+    """
+    step = (IRR_RATE_MAX - IRR_RATE_MIN) / IRR_GRID_STEPS
+    grid = [_profile_sums(enrollment, rent_factors, IRR_RATE_MIN + k * step) for k in range(IRR_GRID_STEPS + 1)]
+
+    def npv_at(nodes, rows):
+        return [revenue[i] * grid[k][0] - rent[i] * grid[k][1] - fixed[i] * grid[k][2] - investment
+                for i, k in zip(rows, nodes)]
+
+    n = len(revenue)
+    rows = list(range(n))
+    low_npv = npv_at(repeat(0), rows)
+    high_npv = npv_at(repeat(IRR_GRID_STEPS), rows)
+    rows = [i for i in rows if low_npv[i] > 0 >= high_npv[i]]   # корень внутри сетки
+    low, high = [0] * len(rows), [IRR_GRID_STEPS] * len(rows)
+    while any(h - l > 1 for l, h in zip(low, high)):
+        middle = [(l + h) // 2 for l, h in zip(low, high)]
+        positive = [value > 0 for value in npv_at(middle, rows)]
+        low = [m if p else l for m, l, p in zip(middle, low, positive)]
+        high = [h if p else m for m, h, p in zip(middle, high, positive)]
+
+    result = [None] * n
+    for i, k, npv_low, npv_high in zip(rows, low, npv_at(low, rows), npv_at(high, rows)):
+        monthly = IRR_RATE_MIN + (k + npv_low / (npv_low - npv_high)) * step
+        result[i] = (1 + monthly) ** 12 - 1
+    return result
+
+
+def project_cashflows(regions, columns, assumptions=NEUTRAL_ASSUMPTIONS,
+                      monthly_sales_volume=MONTHLY_SALES_VOLUME,
+                      initial_investment=INITIAL_INVESTMENT):
+    """Рассчитывает помесячный прогноз денежного потока для всех регионов.
+
+    Args:
+        regions (list): Названия регионов.
+        columns (dict): Входные столбцы (см. batch_financials.build_input_columns()).
+        assumptions (CashflowAssumptions, optional): Параметры прогноза.
+            По умолчанию NEUTRAL_ASSUMPTIONS (модель calculate_financials()).
+        monthly_sales_volume (int, optional): Полный набор детей в месяц. По умолчанию 60.
+        initial_investment (int, optional): Начальные инвестиции. По умолчанию 500000.
+
+    Returns:
+        dict: Словарь столбцов:
+            'region' - названия регионов;
+            'steady_profit' - месячная прибыль при полном наборе без индексации;
+            'simple_payback_month' - ceil(инвестиции / прибыль), как в calculate_financials();
+            'payback_month', 'discounted_payback_month' - месяц окупаемости
+                (None - не окупается на горизонте);
+            'npv' - чистая приведённая стоимость на горизонте, ₽;
+            'irr' - годовая внутренняя норма доходности (None - не определена);
+            'cumulative_cash' - {месяц: накопленный поток} в контрольных точках
+                (каждые 12 месяцев и конец горизонта).
+
+    Исключения:
+        ValueError: Если длины столбцов не совпадают с количеством регионов.
+    """
+    n = len(regions)
+    for name in ('avg_check', 'rent', 'area', 'teachers', 'salary', 'marketing', 'other_costs'):
+        if len(columns[name]) != n:
+            raise ValueError(f'Столбец {name} содержит {len(columns[name])} значений, ожидалось {n}.')
+
+    revenue = [c * monthly_sales_volume for c in columns['avg_check']]   # выручка при полном наборе
+    rent = list(map(mul, columns['rent'], columns['area']))
+    fixed = fixed_costs(columns)
+    steady_profit = array('q', map(sub, map(sub, revenue, rent), fixed))
+    # Месячные проходы - в float: арифметика float быстрее смешанной int * float
+    revenue, rent, fixed = (list(map(float, column)) for column in (revenue, rent, fixed))
+
+    enrollment, rent_factors = month_profiles(assumptions)
+    horizon = assumptions.horizon
+    prefix_enrollment = list(accumulate(enrollment))
+    prefix_rent = list(accumulate(rent_factors))
+    prefix_months = list(map(float, range(1, horizon + 1)))
+
+    # Дисконтированные префиксные суммы по месячной ставке
+    v = (1 + assumptions.discount_rate) ** (-1 / 12)
+    weights = list(accumulate(repeat(v, horizon), mul))
+    discounted = [list(accumulate(map(mul, profile, weights))) for profile in (enrollment, rent_factors, repeat(1.0))]
+
+    checkpoints = sorted({*range(CHECKPOINT_MONTHS, horizon + 1, CHECKPOINT_MONTHS), horizon})
+    cumulative = {month: array('d', map(sub, _combine(revenue, rent, fixed, prefix_enrollment[month - 1],
+                                                      prefix_rent[month - 1], month), repeat(initial_investment)))
+                  for month in checkpoints}
+
+    return {
+        'region': list(regions),
+        'steady_profit': steady_profit,
+        'simple_payback_month': [math.ceil(initial_investment / p) if p > 0 else None for p in steady_profit],
+        'payback_month': _first_month(revenue, rent, fixed, prefix_enrollment, prefix_rent, prefix_months,
+                                      initial_investment),
+        'discounted_payback_month': _first_month(revenue, rent, fixed, *discounted, initial_investment),
+        'npv': array('d', map(sub, _combine(revenue, rent, fixed, *(sums[-1] for sums in discounted)),
+                              repeat(initial_investment))),
+        'irr': _irr(revenue, rent, fixed, initial_investment, enrollment, rent_factors),
+        'cumulative_cash': cumulative,
+    }
+
+
+def _money(amount):
+    """Денежная сумма с пробелами между разрядами (как format_currency в main_pro)."""
+    return f'{round(amount):,}'.replace(',', ' ')
+
+
+def _format_months(value):
+    """Срок окупаемости для отчёта."""
+    return 'не окупается' if value is None else f'{value} мес.'
+
+
+def _format_rate(value):
+    """Годовая ставка в процентах для отчёта."""
+    return '—' if value is None else f'{value * 100:.1f}%'
+
+
+def write_cashflow_csv(projection, path):
+    """Записывает показатели прогноза по регионам в CSV (одна строка на регион).
+
+    Пустое значение срока окупаемости или IRR означает, что показатель не
+    определён на горизонте прогноза.
+    """
+    checkpoints = list(projection['cumulative_cash'])
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(['region', 'steady_profit', 'simple_payback_month', 'payback_month',
+                         'discounted_payback_month', 'npv', 'irr',
+                         *(f'cumulative_cash_{month}' for month in checkpoints)])
+        writer.writerows(zip(
+            projection['region'], projection['steady_profit'],
+            *(['' if m is None else m for m in projection[key]]
+              for key in ('simple_payback_month', 'payback_month', 'discounted_payback_month')),
+            [round(v) for v in projection['npv']],
+            ['' if r is None else round(r, 4) for r in projection['irr']],
+            *([round(v) for v in projection['cumulative_cash'][month]] for month in checkpoints)))
+
+
+def generate_cashflow_report(projection, assumptions, initial_investment=INITIAL_INVESTMENT):
+    """Генерирует текстовый отчёт по прогнозу денежного потока.
+
+    Регионы упорядочены по убыванию NPV.
+
+    Args:
+        projection (dict): Результат project_cashflows().
+        assumptions (CashflowAssumptions): Параметры прогноза.
+        initial_investment (int, optional): Начальные инвестиции. По умолчанию 500000.
+
+    Returns:
+        str: Текст отчёта.
+    """
+    horizon = assumptions.horizon
+    final_cash = projection['cumulative_cash'][horizon]
+    npv = projection['npv']
+    order = sorted(range(len(npv)), key=lambda i: (-npv[i], projection['region'][i]))
+    headers = ["РЕГИОН", "NPV", "IRR (ГОД.)", "ОКУПАЕМОСТЬ", "БЕЗ РАЗГОНА", "ДИСК. ОКУПАЕМОСТЬ",
+               f"КЭШ ЗА {horizon} МЕС."]
+    rows = [[projection['region'][i], round(npv[i]), _format_rate(projection['irr'][i]),
+             _format_months(projection['payback_month'][i]), _format_months(projection['simple_payback_month'][i]),
+             _format_months(projection['discounted_payback_month'][i]), round(final_cash[i])] for i in order]
+    table_output = format_fancy_table(headers, rows, currency_columns=[1, 6])
+
+    ramp = ', '.join(f'{share * 100:.0f}%' for share in assumptions.ramp) or 'нет'
+    season = ', '.join(f'{month}: {factor * 100:.0f}%' for month, factor in sorted(assumptions.season.items())) or 'нет'
+    paid = sum(m is not None for m in projection['payback_month'])
+    return f"""ПРОГНОЗ ДЕНЕЖНОГО ПОТОКА ПО {len(npv)} РЕГИОНАМ
+• Горизонт:                  {horizon} мес., открытие в {assumptions.start_month}-м месяце года
+• Начальные вложения:        {_money(initial_investment)} ₽
+• Разгон набора:             {ramp}
+• Сезонность набора:         {season}
+• Индексация аренды:         {assumptions.rent_indexation * 100:.1f}% в год
+• Ставка дисконтирования:    {assumptions.discount_rate * 100:.1f}% в год
+• Окупаются на горизонте:    {paid} из {len(npv)}
+
+{table_output}
+Окупаемость - первый месяц, в котором накопленный денежный поток неотрицателен;
+без разгона - ceil(вложения / прибыль) при полном наборе с первого месяца, как в
+обычных отчётах; дисконтированная - то же для дисконтированного потока.
+"""
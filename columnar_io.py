@@ -0,0 +1,217 @@
+"""Компактный двоичный колоночный формат с поддержкой отображения в память (mmap).
+
+Структура файла:
+    8 байт   — сигнатура MAGIC
+    8 байт   — длина заголовка (uint64, little-endian)
+    заголовок — JSON (UTF-8) с метаданными и описанием столбцов
+    данные   — столбцы подряд, каждый выровнен на 8 байт
+
+Числовые столбцы ('q' — int64, 'd' — float64, 'B' — uint8) хранятся как есть
+в порядке байтов машины и читаются без копирования через memoryview.cast().
+Строковые столбцы ('str') хранятся как один блок UTF-8, в котором значения
+разделены нулевым байтом: так весь столбец декодируется одним вызовом.
+
+Запись выполняется атомарно: данные пишутся во временный файл в том же
+каталоге и затем переименовываются через os.replace(), поэтому параллельно
+работающие процессы видят либо старый, либо новый файл целиком.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+MAGIC = b'BPCOL1\0\0'   # сигнатура формата
+ALIGN = 8   # выравнивание столбцов в байтах
+NUMERIC_TYPES = ('q', 'd', 'B')   # поддерживаемые коды array для числовых столбцов
+SEPARATOR = '\0'   # разделитель значений строкового столбца
+
+
+def _padding(size):
+    """Количество байт, которое нужно дописать до границы выравнивания."""
+    return -size % ALIGN
+
+
+def _default_mode():
+    """Права нового файла с учётом umask процесса, как у open() (0o666 & ~umask)."""
+    mask = os.umask(0)   # umask можно только прочитать вместе с установкой
+    os.umask(mask)
+    return 0o666 & ~mask
+
+
+def _encode_strings(name, values):
+    """Кодирует строки в один блок UTF-8 с разделителем SEPARATOR."""
+    for value in values:
+        if SEPARATOR in value:
+            raise ValueError(f'Столбец {name}: строка содержит нулевой символ')
+    return SEPARATOR.join(values).encode('utf-8')
+
+
+def write_columns(path, columns, meta=None):
+    """Атомарно записывает набор столбцов в двоичный файл.
+
+    Args:
+        path (str): Путь к файлу.
+        columns (dict): Словарь {имя столбца: значения}. Значения типа array
+            с кодом 'q', 'd' или 'B' сохраняются как числовые столбцы, список
+            строк — как строковый столбец.
+        meta (dict, optional): Произвольные метаданные, сериализуемые в JSON.
+
+    Исключения:
+        TypeError: Если тип столбца не поддерживается.
+        ValueError: Если строка содержит нулевой символ.
+        OSError: При ошибках записи.
+    """
+    blocks = []   # (описание столбца, список байтовых блоков)
+    for name, values in columns.items():
+        if isinstance(values, array):
+            if values.typecode not in NUMERIC_TYPES:
+                raise TypeError(f'Столбец {name}: неподдерживаемый тип array {values.typecode!r}')
+            blocks.append(({'name': name, 'type': values.typecode, 'length': len(values)},
+                           [values.tobytes()]))
+        elif isinstance(values, (list, tuple)) and all(isinstance(v, str) for v in values):
+            blocks.append(({'name': name, 'type': 'str', 'length': len(values)},
+                           [_encode_strings(name, values)]))
+        else:
+            raise TypeError(f'Столбец {name}: ожидается array или список строк')
+
+    # Раскладываем столбцы по смещениям относительно начала области данных
+    position = 0
+    for info, parts in blocks:
+        info['offset'] = position
+        info['nbytes'] = sum(len(p) for p in parts)
+        position += info['nbytes'] + _padding(info['nbytes'])
+
+    header = json.dumps({
+        'byteorder': sys.byteorder,
+        'meta': meta or {},
+        'columns': [info for info, _ in blocks],
+    }, ensure_ascii=False).encode('utf-8')
+    header += b' ' * _padding(len(MAGIC) + 8 + len(header))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.bin')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(MAGIC)
+            file.write(struct.pack('<Q', len(header)))
+            file.write(header)
+            for info, parts in blocks:
+                for part in parts:
+                    file.write(part)
+                file.write(b'\0' * _padding(info['nbytes']))
+            file.flush()
+            os.fsync(file.fileno())
+        # mkstemp создаёт файл с правами 0600: после замены results.bin был бы
+        # доступен только владельцу, в отличие от остальных выгрузок
+        os.chmod(tmp_path, _default_mode())
+        os.replace(tmp_path, path)   # атомарная замена
+    except BaseException:
+        # Не оставляем за собой недописанный временный файл
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class ColumnFile:
+    """Двоичный колоночный файл, отображённый в память.
+
+    Числовые столбцы возвращаются как memoryview поверх mmap (без копирования),
+    строковые — декодируются в список строк при первом обращении.
+
+    Attributes:
+        meta (dict): Метаданные, переданные при записи.
+        names (list): Имена столбцов в порядке записи.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views = []
+        try:
+            size = len(self._mmap)
+            start = len(MAGIC) + 8
+            if size < start or self._mmap[:len(MAGIC)] != MAGIC:
+                raise ValueError(f'{path}: неизвестный формат файла')
+            (header_len,) = struct.unpack_from('<Q', self._mmap, len(MAGIC))
+            if start + header_len > size:
+                raise ValueError(f'{path}: файл обрезан (заголовок неполный)')
+            header = json.loads(self._mmap[start:start + header_len].decode('utf-8'))
+            if header['byteorder'] != sys.byteorder:
+                raise ValueError(f'{path}: файл записан с другим порядком байтов')
+            columns = {info['name']: info for info in header['columns']}
+            # Повреждённый или обрезанный файл обнаруживается при открытии, а не
+            # при чтении столбца: все столбцы должны целиком помещаться в файл
+            data_start = start + header_len
+            for info in columns.values():
+                if info['type'] == 'str':
+                    valid = True
+                else:
+                    valid = info['type'] in NUMERIC_TYPES and info['nbytes'] % array(info['type']).itemsize == 0
+                if not valid or info['offset'] < 0 or data_start + info['offset'] + info['nbytes'] > size:
+                    raise ValueError(f"{path}: столбец {info['name']} повреждён или файл обрезан")
+        except (KeyError, TypeError, AttributeError) as error:
+            self._mmap.close()
+            raise ValueError(f'{path}: некорректный заголовок файла') from error
+        except BaseException:
+            self._mmap.close()
+            raise
+        self._data_start = data_start
+        self._columns = columns
+        self._strings = {}
+        self.meta = header['meta']
+        self.names = [info['name'] for info in header['columns']]
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def __getitem__(self, name):
+        """Возвращает столбец по имени (memoryview для чисел, list для строк)."""
+        info = self._columns[name]
+        start = self._data_start + info['offset']
+        if info['type'] == 'str':
+            if name not in self._strings:
+                if info['length'] == 0:
+                    self._strings[name] = []
+                else:
+                    blob = self._mmap[start:start + info['nbytes']]
+                    self._strings[name] = blob.decode('utf-8').split(SEPARATOR)
+            return self._strings[name]
+        view = memoryview(self._mmap)[start:start + info['nbytes']].cast(info['type'])
+        self._views.append(view)
+        return view
+
+    def close(self):
+        """Освобождает представления столбцов и закрывает отображение файла."""
+        for view in self._views:
+            view.release()
+        self._views.clear()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_columns(path):
+    """Открывает двоичный колоночный файл.
+
+    Args:
+        path (str): Путь к файлу.
+
+    Returns:
+        ColumnFile: Объект с доступом к столбцам по имени.
+
+    Исключения:
+        FileNotFoundError: Если файл не найден.
+        ValueError: Если файл имеет неизвестный формат, повреждён или обрезан.
+    """
+    return ColumnFile(path)
@@ -0,0 +1,487 @@
+"""Потоковые загрузчики CSV-файлов в колоночное представление.
+
+В отличие от загрузчиков из main_pro.py, которые строят словарь словарей,
+загрузчики этого модуля раскладывают данные сразу по столбцам (array) с
+индексом регионов. Память растёт пропорционально числу регионов, умноженному
+на число параметров, а не числу строк исходного файла.
+
+Выгрузка реестра бизнесов (businesses.csv) содержит много кодов ОКВЭД на
+регион; load_business_index() фильтрует строки по кодам ещё до разбора CSV и
+суммирует число ИП по парам (регион, код).
+
+Все загрузчики принимают выборку регионов (regions): строки других регионов
+отсеиваются по префиксу строки ещё до разбора CSV (см. iter_region_lines()),
+поэтому отчёт по одному региону не разбирает весь национальный файл.
+"""
+
+import csv
+import itertools
+import re
+from array import array
+from operator import methodcaller
+
+import profiling
+from region_table import RegionTable
+
+# Известные параметры файла assumptions.csv (порядок столбцов)
+ASSUMPTION_PARAMS = (
+    'area_sqm',
+    'teachers',
+    'salary_per_teacher',
+    'avg_check',
+    'marketing',
+    'other_costs',
+)
+
+DEFAULT_OKVED = ('85.59',)   # коды ОКВЭД детских центров по умолчанию
+REGION_PREFIX_LIMIT = 256   # при большей выборке регионов строки не отсеиваются по префиксу
+
+
+def iter_region_lines(file, regions=None, delimiter=';'):
+    """Строки открытого CSV-файла (с заголовком), которые могут относиться к выбранным регионам.
+
+    Если первый столбец файла - region, строка другого региона отбрасывается
+    проверкой str.startswith по кортежу префиксов "регион;" (в том числе в
+    кавычках), без разделения на поля. Проверка только отсеивает заведомо
+    лишние строки: загрузчик после разбора всё равно сравнивает регион точно.
+
+    Args:
+        file: Открытый текстовый файл, позиция - в начале.
+        regions (iterable, optional): Названия регионов. По умолчанию None -
+            все строки без фильтра.
+        delimiter (str, optional): Разделитель полей. По умолчанию ';'.
+
+    Returns:
+        iterator: Строка заголовка, затем строки-кандидаты.
+    """
+    header_line = file.readline()
+    if regions is None:
+        return itertools.chain([header_line], file)
+    names = set(regions)
+    header = next(csv.reader([header_line], delimiter=delimiter), [])
+    if not header or header[0] != 'region' or len(names) > REGION_PREFIX_LIMIT:
+        return itertools.chain([header_line], file)   # фильтр только после разбора
+    quoted = ('"' + name.replace('"', '""') + '"' for name in names)
+    prefixes = tuple(name + delimiter for name in names) + tuple(quoted)
+    return itertools.chain([header_line], filter(methodcaller('startswith', prefixes), file))
+
+
+class AssumptionColumns:
+    """Предположения по регионам, разложенные по столбцам.
+
+    Для каждого известного параметра хранится столбец array('q') и маска
+    заполненности (bytearray), индекс регионов сопоставляет названию региона
+    номер строки. Объект поддерживает чтение в стиле словаря, как результат
+    load_assumptions(): assumptions[region][param].
+
+    Attributes:
+        params (tuple): Названия параметров (столбцов).
+        regions (list): Названия регионов в порядке первого появления в файле.
+        index (dict): Словарь {регион: номер строки}.
+        columns (dict): Словарь {параметр: array('q')}.
+        present (dict): Словарь {параметр: bytearray} — 1, если значение задано.
+        skipped_rows (list): Пропущенные строки файла в виде (номер строки, причина);
+            номер None, если строки отбирались по регионам до разбора.
+        unknown_params (dict): Счётчики строк с неизвестными параметрами.
+    """
+
+    __slots__ = ('params', 'regions', 'index', 'columns', 'present',
+                 'skipped_rows', 'unknown_params')
+
+    def __init__(self, params=ASSUMPTION_PARAMS):
+        self.params = tuple(params)
+        self.regions = []
+        self.index = {}
+        self.columns = {p: array('q') for p in self.params}
+        self.present = {p: bytearray() for p in self.params}
+        self.skipped_rows = []
+        self.unknown_params = {}
+
+    def _region_row(self, region):
+        """Возвращает номер строки региона, добавляя регион при первом появлении."""
+        row = self.index.get(region)
+        if row is None:
+            row = len(self.regions)
+            self.index[region] = row
+            self.regions.append(region)
+            for p in self.params:
+                self.columns[p].append(0)
+                self.present[p].append(0)
+        return row
+
+    def set(self, region, param, value):
+        """Записывает значение параметра для региона.
+
+        Returns:
+            bool: False, если параметр неизвестен и значение не сохранено.
+        """
+        row = self._region_row(region)
+        column = self.columns.get(param)
+        if column is None:
+            self.unknown_params[param] = self.unknown_params.get(param, 0) + 1
+            return False
+        column[row] = value
+        self.present[param][row] = 1
+        return True
+
+    def missing(self):
+        """Возвращает регионы, для которых задан не полный набор параметров.
+
+        Returns:
+            dict: Словарь {регион: [отсутствующие параметры]}.
+        """
+        result = {}
+        for p in self.params:
+            mask = self.present[p]
+            row = mask.find(0)
+            while row != -1:
+                result.setdefault(self.regions[row], []).append(p)
+                row = mask.find(0, row + 1)
+        return result
+
+    def column(self, param, regions=None):
+        """Возвращает столбец параметра, при необходимости только для части регионов.
+
+        Args:
+            param (str): Название параметра.
+            regions (list, optional): Названия регионов. По умолчанию — все регионы.
+
+        Returns:
+            array: Значения параметра в порядке регионов.
+
+        Исключения:
+            KeyError: Если регион неизвестен или для него не задан параметр.
+        """
+        column = self.columns[param]
+        if regions is None:
+            if self.present[param].find(0) != -1:
+                raise KeyError(param)
+            return array('q', column)
+        present = self.present[param]
+        rows = [self.index[r] for r in regions]
+        if not all(present[i] for i in rows):
+            raise KeyError(param)
+        return array('q', [column[i] for i in rows])
+
+    def row(self, region):
+        """Возвращает параметры региона в виде словаря (как load_assumptions())."""
+        i = self.index[region]
+        return {p: self.columns[p][i] for p in self.params if self.present[p][i]}
+
+    # Чтение в стиле словаря словарей
+    def __getitem__(self, region):
+        return self.row(region)
+
+    def __contains__(self, region):
+        return region in self.index
+
+    def __iter__(self):
+        return iter(self.regions)
+
+    def __len__(self):
+        return len(self.regions)
+
+    def keys(self):
+        return list(self.regions)
+
+    def to_dict(self):
+        """Преобразует столбцы в словарь словарей того же вида, что load_assumptions()."""
+        return {region: self.row(region) for region in self.regions}
+
+
+def load_assumptions_columns(filename='assumptions.csv', params=ASSUMPTION_PARAMS, regions=None):
+    """Загружает предположения из CSV-файла за один проход сразу в столбцы.
+
+    Формат файла (длинный):
+        region;param;value
+        Казань;area_sqm;40
+        ...
+
+    Строки с отсутствующими полями или нечисловыми значениями не теряются
+    молча: они перечисляются в атрибуте skipped_rows результата, а регионы с
+    неполным набором параметров можно получить методом missing().
+
+    Args:
+        filename (str, optional): Путь к CSV-файлу. По умолчанию 'assumptions.csv'.
+        params (tuple, optional): Известные параметры. По умолчанию ASSUMPTION_PARAMS.
+        regions (iterable, optional): Загрузить только эти регионы (см.
+            iter_region_lines()). По умолчанию None - все регионы.
+
+    Returns:
+        AssumptionColumns: Предположения, разложенные по столбцам.
+
+    Исключения:
+        FileNotFoundError: Если файл не найден.
+        ValueError: Если в заголовке нет столбцов region, param и value.
+    """
+    table = AssumptionColumns(params)
+    selected = None if regions is None else set(regions)
+
+    with open(filename, "r", encoding="utf-8", newline="") as file:
+        reader = csv.reader(iter_region_lines(file, selected), delimiter=";")
+        header = next(reader, [])
+        try:
+            i_region = header.index("region")
+            i_param = header.index("param")
+            i_value = header.index("value")
+        except ValueError:
+            raise ValueError(f'{filename}: ожидаются столбцы region;param;value, получено {header}') from None
+        width = max(i_region, i_param, i_value) + 1
+
+        # Локальные ссылки для горячего цикла
+        index = table.index
+        columns = table.columns
+        present = table.present
+        skipped = table.skipped_rows
+
+        # При отборе регионов часть строк не читается, и номера строк неизвестны
+        numbered = selected is None or len(selected) > REGION_PREFIX_LIMIT
+        for row in reader:
+            line_no = reader.line_num if numbered else None
+            if not row:
+                continue   # пустая строка
+            if len(row) < width:
+                skipped.append((line_no, 'недостаточно полей'))
+                continue
+            if selected is not None and row[i_region] not in selected:
+                continue
+            try:
+                value = int(row[i_value])
+            except ValueError:
+                skipped.append((line_no, f'некорректное значение {row[i_value]!r}'))
+                continue
+            i = index.get(row[i_region])
+            column = columns.get(row[i_param])
+            if i is None or column is None:
+                # Новый регион или неизвестный параметр - общий (медленный) путь
+                table.set(row[i_region], row[i_param], value)
+                continue
+            column[i] = value
+            present[row[i_param]][i] = 1
+        profiling.count('load', rows=reader.line_num - 1, skipped=len(skipped))
+
+    return table
+
+
+class BusinessIndex:
+    """Число ИП по парам (регион, код ОКВЭД), разложенное по столбцам.
+
+    Для каждого кода хранится столбец array('q') с числом ИП по регионам;
+    повторные строки одной пары суммируются. Число ИП для любого набора
+    кодов возвращает ip_counts().
+
+    Attributes:
+        regions (list): Названия регионов в порядке первого появления в файле.
+        index (dict): Словарь {регион: номер строки}.
+        columns (dict): Словарь {код ОКВЭД: array('q')}.
+        has_okved (bool): Есть ли в файле столбец okved; без него все строки
+            относятся к коду '' и фильтр по кодам не применяется.
+        skipped_rows (list): Пропущенные строки в виде (текст строки, причина).
+    """
+
+    __slots__ = ('regions', 'index', 'columns', 'has_okved', 'skipped_rows')
+
+    def __init__(self):
+        self.regions = []
+        self.index = {}
+        self.columns = {}
+        self.has_okved = True
+        self.skipped_rows = []
+
+    @property
+    def codes(self):
+        """Коды ОКВЭД, встретившиеся в файле (после фильтра)."""
+        return sorted(self.columns)
+
+    def add(self, region, code, count):
+        """Прибавляет число ИП к паре (регион, код)."""
+        row = self.index.get(region)
+        if row is None:
+            row = len(self.regions)
+            self.index[region] = row
+            self.regions.append(region)
+            for column in self.columns.values():
+                column.append(0)
+        column = self.columns.get(code)
+        if column is None:
+            column = self.columns[code] = array('q', bytes(8 * len(self.regions)))
+        column[row] += count
+
+    def ip_counts(self, codes=None):
+        """Число ИП по регионам, просуммированное по набору кодов.
+
+        Args:
+            codes (iterable, optional): Коды ОКВЭД. По умолчанию - все коды.
+
+        Returns:
+            RegionTable: Таблица с полем 'ip_count' (как load_businesses()).
+        """
+        if codes is None or not self.has_okved:
+            selected = list(self.columns.values())
+        else:
+            selected = [self.columns[code] for code in dict.fromkeys(codes) if code in self.columns]
+        total = array('q', bytes(8 * len(self.regions)))
+        for column in selected:
+            total = array('q', map(int.__add__, total, column))
+        return RegionTable.from_columns(list(self.regions), {'ip_count': total})
+
+
+def load_business_index(filename='businesses.csv', okved=None, regions=None):
+    """Загружает businesses.csv в индекс (регион, код ОКВЭД) с фильтром по кодам.
+
+    Формат файла:
+        region;okved;ip_count
+        Казань;85.59;376
+        Казань;85.41;120
+        ...
+
+    Фильтр применяется до разбора CSV: строка, в тексте которой нет ни одного
+    из кодов, отбрасывается без разделения на поля (поиск выполняется одним
+    регулярным выражением на уровне C). Строки-кандидаты разбираются и
+    проверяются точным сравнением поля okved.
+
+    Args:
+        filename (str, optional): Путь к CSV-файлу. По умолчанию 'businesses.csv'.
+        okved (iterable, optional): Коды ОКВЭД, которые нужно загрузить. По
+            умолчанию None - все коды.
+        regions (iterable, optional): Загрузить только эти регионы (см.
+            iter_region_lines()). По умолчанию None - все регионы.
+
+    Returns:
+        BusinessIndex: Число ИП по парам (регион, код).
+
+    Исключения:
+        FileNotFoundError: Если файл не найден.
+        ValueError: Если в заголовке нет столбцов region и ip_count.
+    """
+    table = BusinessIndex()
+    codes = None if okved is None else frozenset(okved)
+    selected = None if regions is None else set(regions)
+
+    with open(filename, "r", encoding="utf-8", newline="") as file:
+        lines = iter_region_lines(file, selected)
+        header = next(csv.reader([next(lines)], delimiter=";"), [])
+        try:
+            i_region = header.index("region")
+            i_count = header.index("ip_count")
+        except ValueError:
+            raise ValueError(f'{filename}: ожидаются столбцы region;okved;ip_count, получено {header}') from None
+        i_okved = header.index("okved") if "okved" in header else None
+        table.has_okved = i_okved is not None
+        width = max(i_region, i_count, i_okved or 0) + 1
+
+        if codes is not None and i_okved is not None:
+            # Строка с нужным кодом обязательно содержит его как подстроку
+            search = re.compile('|'.join(map(re.escape, sorted(codes)))).search
+            lines = filter(search, lines)
+        reader = csv.reader(lines, delimiter=";")
+        skipped = table.skipped_rows
+        add = table.add
+
+        for row in reader:
+            if not row:
+                continue   # пустая строка
+            if len(row) < width:
+                skipped.append((';'.join(row), 'недостаточно полей'))
+                continue
+            if selected is not None and row[i_region] not in selected:
+                continue
+            code = row[i_okved] if i_okved is not None else ''
+            if codes is not None and i_okved is not None and code not in codes:
+                continue   # код совпал только как подстрока (например, 85.591)
+            try:
+                count = int(row[i_count])
+            except ValueError:
+                skipped.append((';'.join(row), f'некорректное значение {row[i_count]!r}'))
+                continue
+            add(row[i_region], code, count)
+        profiling.count('load', rows=reader.line_num, skipped=len(skipped))
+
+    return table
+
+
+def load_businesses_columns(filename='businesses.csv', okved=DEFAULT_OKVED, regions=None):
+    """Загружает число ИП по регионам, просуммированное по кодам ОКВЭД.
+
+    В отличие от load_businesses() из main_pro.py, строки других кодов
+    отбрасываются до разбора, а результат сразу строится в столбцах.
+
+    Args:
+        filename (str, optional): Путь к CSV-файлу. По умолчанию 'businesses.csv'.
+        okved (iterable, optional): Коды ОКВЭД; None - все коды. По умолчанию DEFAULT_OKVED.
+        regions (iterable, optional): Загрузить только эти регионы. По умолчанию все.
+
+    Returns:
+        RegionTable: Таблица с полем 'ip_count'.
+    """
+    return load_business_index(filename, okved, regions).ip_counts(okved)
+
+
+def load_region_names(filename='regions.csv', delimiter=';'):
+    """Названия регионов из CSV-файла (столбец region) без разбора остальных полей.
+
+    Нужна для разбора выборки регионов (имена, шаблоны, списки в файле) до
+    загрузки таблиц только для выбранных регионов.
+
+    Returns:
+        list: Названия регионов в порядке файла без повторов.
+
+    Исключения:
+        FileNotFoundError: Если файл не найден.
+        ValueError: Если в файле нет столбца region.
+    """
+    with open(filename, encoding='utf-8', newline='') as f:
+        reader = csv.reader(f, delimiter=delimiter)
+        column = next(reader, []).index('region')
+        return list(dict.fromkeys(row[column] for row in reader if len(row) > column))
+
+
+def incomplete_regions(table, regions):
+    """Регионы, для которых в таблице предположений нет полного набора параметров.
+
+    Args:
+        table (AssumptionColumns): Результат load_assumptions_columns().
+        regions (iterable): Регионы, которые должны быть рассчитаны (из regions.csv).
+
+    Returns:
+        dict: Словарь {регион: [отсутствующие параметры]} в порядке regions;
+            у региона без единой строки перечислены все параметры.
+    """
+    missing = table.missing()
+    result = {}
+    for region in regions:
+        if region not in table:
+            result[region] = list(table.params)
+        elif region in missing:
+            result[region] = missing[region]
+    return result
+
+
+def describe_load_problems(table, filename='assumptions.csv', limit=10, regions=None):
+    """Формирует текстовые предупреждения о пропущенных строках и неполных регионах.
+
+    Args:
+        table (AssumptionColumns): Результат load_assumptions_columns().
+        filename (str, optional): Имя файла для сообщений.
+        limit (int, optional): Сколько проблемных строк и регионов перечислять. По умолчанию 10.
+        regions (iterable, optional): Регионы из regions.csv: тогда неполными
+            считаются и регионы, для которых в файле нет ни одной строки, а
+            регионы, которых нет в regions.csv, не перечисляются (load_data()
+            исключает перечисленные регионы из расчёта). По умолчанию None -
+            все регионы файла предположений.
+
+    Returns:
+        list: Список строк-предупреждений (пустой, если проблем нет).
+    """
+    warnings = []
+    if table.skipped_rows:
+        warnings.append(f'{filename}: пропущено строк: {len(table.skipped_rows)}')
+        for line_no, reason in table.skipped_rows[:limit]:
+            warnings.append(f'  строка {line_no}: {reason}' if line_no is not None else f'  {reason}')
+    missing = table.missing() if regions is None else incomplete_regions(table, regions)
+    if missing:
+        excluded = '' if regions is None else ' (исключены из расчёта)'
+        warnings.append(f'{filename}: регионов с неполным набором параметров: {len(missing)}{excluded}')
+        for region, params in list(missing.items())[:limit]:
+            warnings.append(f'  {region}: ' + ('нет строк' if region not in table else f'нет {", ".join(params)}'))
+    return warnings
@@ -1,67 +1,121 @@
-def print_fancy_table(headers, rows, currency_columns=None):
+from operator import itemgetter
+
+
+def _format_currency(item):
+    """Денежное значение с пробелами между разрядами и символом " ₽" (нечисловые - как есть)."""
+    if isinstance(item, (int, float)):
+        return f"{item:,}".replace(',', ' ') + " ₽"
+    return str(item)
+
+
+def cell_width(item, currency=False):
+    """Ширина ячейки со значением item в таблице (как её форматирует iter_fancy_table)."""
+    return len(_format_currency(item) if currency else str(item))
+
+
+def iter_fancy_table(headers, rows, currency_columns=None, widths=None):
     """
-    Выводит таблицу с форматированием.
-    Проверка различия версий
+    Построчно формирует таблицу с форматированием.
+    
+    Строки данных могут быть любым итерируемым объектом (в том числе
+    генератором) и перебираются один раз. Без widths ширина столбцов
+    измеряется по всем строкам: каждая ячейка форматируется один раз, и её
+    текст сохраняется до вывода. С заданными widths проход измерения не нужен:
+    строки форматируются и выдаются по одной, так что память не зависит от
+    числа строк. Более длинные значения в этом режиме не обрезаются.
     
     Args:
         headers (list): Заголовки столбцов
-        rows (list): Строки данных
+        rows (iterable): Строки данных
         currency_columns (list, optional): Индексы столбцов, содержащих денежные значения
+        widths (list, optional): Заданная ширина каждого столбца (без измерения)
+        
+    Yields:
+        str: Строки таблицы без символа перевода строки
+        
+    Исключения:
+        ValueError: Если число значений widths или значений в строке не совпадает
+            с числом заголовков
     """
-    if currency_columns is None:
-        currency_columns = []
-    
-    # Ширина столбцов
-    all_data = [headers] + rows
-    col_widths = []
-    
-    for i in range(len(headers)):
-        if i in currency_columns:
-            # Для столбцов с денежными значениями учитываем форматирование с символом " ₽"
-            max_width = 0
-            for row in rows:
-                if isinstance(row[i], (int, float)):
-                    width = len(f"{row[i]:,}".replace(',', ' ') + " ₽")
-                else:
-                    width = len(str(row[i]))
-                max_width = max(max_width, width)
-            # Также учитываем ширину заголовка
-            max_width = max(max_width, len(headers[i]))
-            col_widths.append(max_width)
-        else:
-            col_widths.append(max(len(str(row[i])) for row in all_data))
+    currency = [i in (currency_columns or ()) for i in range(len(headers))]
+    # Функция форматирования для каждого столбца (строки при этом не копируются)
+    formatters = [_format_currency if c else str for c in currency]
+    
+    def check_length(row):
+        if len(row) != len(headers):
+            raise ValueError(f"ожидается {len(headers)} значений в строке, получено {len(row)}")
+        return row
+    
+    if widths is None:
+        rows = list(map(check_length, rows))
+        # Проход измерения по столбцам: каждая ячейка форматируется один раз,
+        # и её текст хранится до вывода
+        col_widths = []
+        columns = []
+        for i, (header, fmt) in enumerate(zip(headers, formatters)):
+            cells = list(map(fmt, map(itemgetter(i), rows)))
+            col_widths.append(max(len(str(header)), max(map(len, cells), default=0)))
+            columns.append(cells)
+        body = zip(*columns)
+    else:
+        if len(widths) != len(headers):
+            raise ValueError(f"ожидается {len(headers)} значений ширины, получено {len(widths)}")
+        col_widths = list(widths)
+        # Строки форматируются по одной, без хранения
+        body = ([fmt(item) for fmt, item in zip(formatters, check_length(row))] for row in rows)
     
     # Горизонтальная разделительная линия
     def make_line(left, mid, right, fill):
         return left + mid.join(fill * (w + 2) for w in col_widths) + right
     
-    top_line = make_line("┌", "┬", "┐", "─")
-    mid_line = make_line("├", "┼", "┤", "─")
-    bot_line = make_line("└", "┴", "┘", "─")
+    # Шаблон строки данных: денежные значения выравниваются по правому краю,
+    # остальные - по левому (заголовки - всегда по левому)
+    row_template = "│ " + " │ ".join(
+        f"{{:{'>' if c else '<'}{w}}}" for c, w in zip(currency, col_widths)) + " │"
+    
+    yield make_line("┌", "┬", "┐", "─")
+    yield "│ " + " │ ".join(str(h).ljust(w) for h, w in zip(headers, col_widths)) + " │"
+    yield make_line("├", "┼", "┤", "─")
+    for cells in body:
+        yield row_template.format(*cells)
+    yield make_line("└", "┴", "┘", "─")
+
+
+def write_fancy_table(file, headers, rows, currency_columns=None, widths=None):
+    """
+    Записывает таблицу с форматированием в файловый объект построчно.
     
-    def format_row(row, is_header=False):
-        formatted_items = []
-        for i, item in enumerate(row):
-            if not is_header and i in currency_columns:
-                # Форматируем денежные значения с пробелами как разделителями тысяч и символом " ₽"
-                if isinstance(item, (int, float)):
-                    item_str = f"{item:,}".replace(',', ' ') + " ₽"
-                    formatted_items.append(item_str.rjust(col_widths[i]))
-                else:
-                    # Для нечисловых значений в денежных столбцах просто выравниваем по правому краю
-                    item_str = str(item)
-                    formatted_items.append(item_str.rjust(col_widths[i]))
-            else:
-                formatted_items.append(str(item).ljust(col_widths[i]))
-        return "│ " + " │ ".join(formatted_items) + " │"
+    Args:
+        file: Файловый объект, открытый на запись в текстовом режиме
+        headers (list): Заголовки столбцов
+        rows (iterable): Строки данных
+        currency_columns (list, optional): Индексы столбцов, содержащих денежные значения
+        widths (list, optional): Заданная ширина каждого столбца (см. iter_fancy_table)
+        
+    Returns:
+        int: Количество записанных строк таблицы (включая рамки и заголовок)
+    """
+    count = 0
+    for line in iter_fancy_table(headers, rows, currency_columns, widths):
+        file.write(line)
+        file.write("\n")
+        count += 1
+    return count
+
+
+def print_fancy_table(headers, rows, currency_columns=None):
+    """
+    Выводит таблицу с форматированием.
     
-    # Вывод
-    print(top_line)
-    print(format_row(headers, is_header=True))
-    print(mid_line)
-    for row in rows:
-        print(format_row(row))
-    print(bot_line)
+    Args:
+        headers (list): Заголовки столбцов
+        rows (list): Строки данных
+        currency_columns (list, optional): Индексы столбцов, содержащих денежные значения
+    """
+    for line in iter_fancy_table(headers, rows, currency_columns):
+        print(line)
+
+
 def format_fancy_table(headers, rows, currency_columns=None):
     """
     Форматирует таблицу как строку с форматированием.
@@ -74,63 +128,7 @@ def format_fancy_table(headers, rows, currency_columns=None):
     Returns:
         str: Строковое представление таблицы
     """
-    if currency_columns is None:
-        currency_columns = []
-    
-    # Ширина столбцов
-    all_data = [headers] + rows
-    col_widths = []
-    
-    for i in range(len(headers)):
-        if i in currency_columns:
-            # Для столбцов с денежными значениями учитываем форматирование с символом " ₽"
-            max_width = 0
-            for row in rows:
-                if isinstance(row[i], (int, float)):
-                    width = len(f"{row[i]:,}".replace(',', ' ') + " ₽")
-                else:
-                    width = len(str(row[i]))
-                max_width = max(max_width, width)
-            # Также учитываем ширину заголовка
-            max_width = max(max_width, len(headers[i]))
-            col_widths.append(max_width)
-        else:
-            col_widths.append(max(len(str(row[i])) for row in all_data))
-    
-    # Горизонтальная разделительная линия
-    def make_line(left, mid, right, fill):
-        return left + mid.join(fill * (w + 2) for w in col_widths) + right
-    
-    top_line = make_line("┌", "┬", "┐", "─")
-    mid_line = make_line("├", "┼", "┤", "─")
-    bot_line = make_line("└", "┴", "┘", "─")
-    
-    def format_row(row, is_header=False):
-        formatted_items = []
-        for i, item in enumerate(row):
-            if not is_header and i in currency_columns:
-                # Форматируем денежные значения с пробелами как разделителями тысяч и символом " ₽"
-                if isinstance(item, (int, float)):
-                    item_str = f"{item:,}".replace(',', ' ') + " ₽"
-                    formatted_items.append(item_str.rjust(col_widths[i]))
-                else:
-                    # Для нечисловых значений в денежных столбцах просто выравниваем по правому краю
-                    item_str = str(item)
-                    formatted_items.append(item_str.rjust(col_widths[i]))
-            else:
-                formatted_items.append(str(item).ljust(col_widths[i]))
-        return "│ " + " │ ".join(formatted_items) + " │"
-    
-    # Формирование строк таблицы
-    lines = []
-    lines.append(top_line)
-    lines.append(format_row(headers, is_header=True))
-    lines.append(mid_line)
-    for row in rows:
-        lines.append(format_row(row))
-    lines.append(bot_line)
-    
-    return "\n".join(lines)
+    return "\n".join(iter_fancy_table(headers, rows, currency_columns))
 
 # Пример использования
 if __name__ == "__main__":
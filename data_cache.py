@@ -0,0 +1,228 @@
+"""Постоянный двоичный кэш разобранных таблиц regions/businesses/assumptions.
+
+При первом запуске CSV-файлы разбираются обычными загрузчиками, а результат
+сохраняется в двоичном колоночном формате (см. columnar_io.py) в служебной
+директории .basepro/cache. При следующих запусках таблицы читаются из кэша
+через mmap без разбора CSV.
+
+Кэш привязан к каждому исходному файлу по размеру, времени изменения и хешу
+содержимого (SHA-256). Если размер или время изменения не совпадают, хеш
+пересчитывается: при совпадающем содержимом кэш остаётся действительным,
+иначе он автоматически пересобирается.
+"""
+
+import hashlib
+import os
+from array import array
+
+from columnar_io import read_columns, write_columns
+from columnar_loaders import AssumptionColumns
+from region_table import RegionTable
+import profiling
+
+CACHE_DIR = os.path.join('.basepro', 'cache')   # служебная директория проекта
+CACHE_VERSION = 2   # версия структуры кэша (увеличивается при изменении формата или загрузчиков)
+
+# Поля таблиц, которые сохраняются в кэш
+REGION_FIELDS = ('children_5_7', 'avg_rent_per_sqm')
+BUSINESS_FIELDS = ('ip_count',)
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """Вычисляет SHA-256 содержимого файла, читая его блоками."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        while chunk := file.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_stamp(path):
+    """Возвращает отпечаток исходного файла: размер, время изменения и хеш.
+
+    Returns:
+        dict: {'size': int, 'mtime_ns': int, 'sha256': str}
+    """
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': file_digest(path)}
+
+
+def stamp_matches(path, stamp, verify_hash=False, refresh=False):
+    """Проверяет, соответствует ли файл сохранённому отпечатку.
+
+    Отсутствующий файл или файл другого размера сразу считается изменённым,
+    без чтения содержимого (в том числе при verify_hash=True). Если размер
+    и время изменения совпадают, файл считается неизменным (хеш проверяется
+    только при verify_hash=True). Если при том же размере отличается время
+    изменения, решение принимается по хешу содержимого.
+
+    При refresh=True и совпадающем хеше время изменения в stamp обновляется
+    (берётся из состояния файла до чтения), чтобы следующая проверка не
+    пересчитывала хеш.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    if stat.st_size != stamp['size']:
+        return False
+    if stat.st_mtime_ns == stamp['mtime_ns'] and not verify_hash:
+        return True
+    if file_digest(path) != stamp['sha256']:
+        return False
+    if refresh:
+        stamp['mtime_ns'] = stat.st_mtime_ns
+    return True
+
+
+def cache_path(filenames, cache_dir=CACHE_DIR, variant=''):
+    """Возвращает путь к файлу кэша для набора исходных файлов и варианта загрузки."""
+    key = '\0'.join([*(os.path.abspath(f) for f in filenames), variant])
+    name = hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir, f'tables-{name}.bin')
+
+
+def _region_table_columns(prefix, table, fields):
+    """Столбцы таблицы регионов для кэша (RegionTable или словарь словарей)."""
+    if not isinstance(table, RegionTable):
+        table = RegionTable.from_dict(table, fields)
+    columns = {f'{prefix}.region': table.regions}
+    for field in fields:
+        columns[f'{prefix}.{field}'] = table.columns[field]
+    return columns
+
+
+def _region_table_from_columns(prefix, cache, fields):
+    """Восстанавливает RegionTable из столбцов кэша (копированием блоков памяти)."""
+    columns = {}
+    for field in fields:
+        columns[field] = array('q')
+        columns[field].frombytes(cache[f'{prefix}.{field}'].cast('B'))
+    return RegionTable.from_columns(list(cache[f'{prefix}.region']), columns)
+
+
+def save_tables(path, stamps, regions_dict, businesses_dict, assumptions):
+    """Атомарно сохраняет разобранные таблицы в файл кэша.
+
+    Args:
+        path (str): Путь к файлу кэша.
+        stamps (list): Отпечатки исходных файлов (см. source_stamp()).
+        regions_dict (RegionTable): Результат load_regions().
+        businesses_dict (RegionTable): Результат load_businesses().
+        assumptions (AssumptionColumns): Результат load_assumptions_columns().
+    """
+    columns = {}
+    columns.update(_region_table_columns('regions', regions_dict, REGION_FIELDS))
+    columns.update(_region_table_columns('businesses', businesses_dict, BUSINESS_FIELDS))
+    columns['assumptions.region'] = assumptions.regions
+    for param in assumptions.params:
+        columns[f'assumptions.{param}'] = assumptions.columns[param]
+        columns[f'assumptions.{param}.present'] = array('B', assumptions.present[param])
+    meta = {
+        'version': CACHE_VERSION,
+        'sources': stamps,
+        'assumption_params': list(assumptions.params),
+        'skipped_rows': assumptions.skipped_rows,
+        'unknown_params': assumptions.unknown_params,
+    }
+    write_columns(path, columns, meta)
+
+
+def load_cached_tables(path, filenames, verify_hash=False):
+    """Читает таблицы из кэша, если он существует и соответствует исходным файлам.
+
+    Если содержимое исходных файлов совпало по хешу, а время изменения
+    другое (файлы перезаписаны без изменений), отпечатки в кэше обновляются,
+    чтобы следующие запуски не пересчитывали хеш.
+
+    Returns:
+        tuple | None: (regions_dict, businesses_dict, assumptions) или None,
+            если кэш отсутствует, повреждён или устарел.
+    """
+    try:
+        cache = read_columns(path)
+    except (OSError, ValueError):
+        return None
+    try:
+        with cache:
+            meta = cache.meta
+            sources = meta.get('sources', [])
+            if meta.get('version') != CACHE_VERSION or len(sources) != len(filenames):
+                return None
+            mtimes = [s['mtime_ns'] for s in sources]
+            if not all(stamp_matches(f, s, verify_hash, refresh=True) for f, s in zip(filenames, sources)):
+                return None
+
+            regions_dict = _region_table_from_columns('regions', cache, REGION_FIELDS)
+            businesses_dict = _region_table_from_columns('businesses', cache, BUSINESS_FIELDS)
+
+            assumptions = AssumptionColumns(meta['assumption_params'])
+            assumptions.regions = list(cache['assumptions.region'])
+            assumptions.index = {r: i for i, r in enumerate(assumptions.regions)}
+            for param in assumptions.params:
+                assumptions.columns[param].frombytes(cache[f'assumptions.{param}'].cast('B'))
+                assumptions.present[param] = bytearray(cache[f'assumptions.{param}.present'])
+            assumptions.skipped_rows = [tuple(row) for row in meta['skipped_rows']]
+            assumptions.unknown_params = dict(meta['unknown_params'])
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None   # метаданные или столбцы не соответствуют формату кэша - пересборка
+    tables = regions_dict, businesses_dict, assumptions
+    if mtimes != [s['mtime_ns'] for s in sources]:
+        try:
+            save_tables(path, sources, *tables)
+        except OSError:
+            pass   # кэш останется действительным, хеш будет пересчитан в следующий раз
+    return tables
+
+
+def load_tables(load_regions, load_businesses, load_assumptions,
+                filenames=('regions.csv', 'businesses.csv', 'assumptions.csv'),
+                cache_dir=CACHE_DIR, verify_hash=False, variant='', regions=None):
+    """Загружает три таблицы из кэша или разбирает CSV и обновляет кэш.
+
+    Args:
+        load_regions (callable): Загрузчик regions.csv (например, main_pro.load_regions).
+        load_businesses (callable): Загрузчик businesses.csv.
+        load_assumptions (callable): Загрузчик assumptions.csv, возвращающий
+            AssumptionColumns (load_assumptions_columns).
+        filenames (tuple, optional): Пути к regions.csv, businesses.csv и assumptions.csv.
+        cache_dir (str, optional): Директория кэша. По умолчанию .basepro/cache.
+        verify_hash (bool, optional): Всегда сверять хеш содержимого, даже если
+            размер и время изменения файлов совпадают. По умолчанию False.
+        variant (str, optional): Параметры загрузчиков, от которых зависят
+            таблицы (например, набор кодов ОКВЭД); у каждого варианта свой кэш.
+        regions (iterable, optional): Выборка регионов. Если кэша нет, CSV
+            разбираются только для этих регионов (загрузчики принимают параметр
+            regions), а кэш не обновляется: в нём хранятся полные таблицы.
+            Действительный кэш читается целиком. По умолчанию None - все регионы.
+
+    Returns:
+        tuple: (regions_dict, businesses_dict, assumptions).
+
+    Исключения:
+        FileNotFoundError: Если один из исходных файлов не найден.
+    """
+    path = cache_path(filenames, cache_dir, variant)
+    tables = load_cached_tables(path, filenames, verify_hash)
+    if tables is not None:
+        # CSV не разбирались, поэтому строки файлов не учитываются; записи таблиц
+        # считаются отдельно, пропущенные при разборе строки assumptions сохранены в кэше
+        profiling.count('load', cache_hits=1, cached_records=sum(map(len, tables)),
+                        skipped=len(tables[2].skipped_rows))
+        return tables
+
+    regions_file, businesses_file, assumptions_file = filenames
+    if regions is not None:
+        return (load_regions(regions_file, regions=regions), load_businesses(businesses_file, regions=regions),
+                load_assumptions(assumptions_file, regions=regions))
+
+    # Кэш отсутствует или устарел: отпечатки снимаются до разбора, чтобы
+    # изменение файла во время разбора приводило к пересборке при следующем запуске
+    stamps = [source_stamp(f) for f in filenames]
+    tables = (load_regions(regions_file), load_businesses(businesses_file),
+              load_assumptions(assumptions_file))
+    try:
+        save_tables(path, stamps, *tables)
+    except OSError:
+        pass   # кэш необязателен: при ошибке записи работаем без него
+    return tables
@@ -0,0 +1,306 @@
+"""Несколько форматов центра (мини-центр, полный центр, франшиза) в каждом регионе.
+
+assumptions.csv задаёт один набор параметров на регион. Параметры форматов
+задаются отдельным файлом formats.csv с ключом (регион, формат):
+
+    region;format;param;value
+    *;мини;area_sqm;25            <- шаблон формата для всех регионов
+    *;мини;teachers;1
+    *;мини;monthly_sales_volume;30
+    Казань;мини;avg_check;3200    <- значение для формата в одном регионе
+    ...
+
+Значение параметра для пары (регион, формат) берётся из строки региона, затем
+из шаблона формата (регион "*"), затем из assumptions.csv, поэтому в файле
+перечисляются только отличия формата. Базовый набор из assumptions.csv
+рассматривается как формат BASE_FORMAT.
+
+Кроме параметров assumptions.csv формат задаёт параметры FORMAT_PARAMS,
+которых в assumptions.csv нет: вместимость (детей в месяц), начальные
+инвестиции, паушальный взнос и роялти франшизы. Они передаются в
+calculate_financials_batch() столбцами SCENARIO_COLUMNS; без них формат
+считается с базовыми 60 детьми и 500 000 ₽ вложений.
+
+Все пары регионы × форматы рассчитываются пакетно: на каждый формат -
+один вызов calculate_financials_batch() по столбцам всех регионов. Столбцы
+regions.csv и businesses.csv (аренда, дети, ИП) и столбцы параметров,
+которые формат не меняет, - общие объекты array для всех форматов, а не
+копии; новый столбец строится только для изменённого параметра, и строки
+регионов с отдельными значениями обновляются по индексу без перебора всех
+регионов.
+"""
+
+import csv
+from array import array
+from itertools import repeat
+from operator import add
+
+from batch_financials import ASSUMPTION_SOURCES, INITIAL_INVESTMENT, MONTHLY_SALES_VOLUME, calculate_financials_batch
+from columnar_loaders import ASSUMPTION_PARAMS, AssumptionColumns, iter_region_lines
+from create_table import format_fancy_table
+
+FORMATS_FILE = 'formats.csv'
+BASE_FORMAT = 'базовый'   # набор параметров из assumptions.csv
+ALL_REGIONS = '*'   # регион строки шаблона формата
+
+# Параметры формата сверх assumptions.csv: {параметр: (значение по умолчанию, минимум, максимум)}
+FORMAT_PARAMS = {
+    'monthly_sales_volume': (MONTHLY_SALES_VOLUME, 1, None),   # вместимость: детей в месяц
+    'initial_investment': (INITIAL_INVESTMENT, 0, None),   # начальные инвестиции
+    'franchise_fee': (0, 0, None),   # паушальный взнос франшизы (входит во вложения)
+    'royalty_percent': (0, 0, 99),   # роялти франшизы, % месячной выручки
+}
+FORMAT_COLUMN_PARAMS = ASSUMPTION_PARAMS + tuple(FORMAT_PARAMS)
+
+
+class FormatAssumptions:
+    """Параметры форматов центра из formats.csv.
+
+    Attributes:
+        formats (list): Названия форматов в порядке первого появления в файле.
+        templates (dict): Шаблоны форматов {формат: {параметр: значение}}.
+        overrides (dict): Значения для отдельных регионов {формат: AssumptionColumns}.
+        skipped_rows (list): Пропущенные строки в виде (номер строки, причина);
+            номер None, если строки отбирались по регионам до разбора.
+    """
+
+    __slots__ = ('formats', 'templates', 'overrides', 'skipped_rows')
+
+    def __init__(self):
+        self.formats = []
+        self.templates = {}
+        self.overrides = {}
+        self.skipped_rows = []
+
+    def add_format(self, name):
+        """Регистрирует формат при первом появлении."""
+        if name not in self.templates:
+            self.formats.append(name)
+            self.templates[name] = {}
+            self.overrides[name] = AssumptionColumns(FORMAT_COLUMN_PARAMS)
+
+
+def load_formats(filename=FORMATS_FILE, regions=None):
+    """Загружает параметры форматов из CSV-файла.
+
+    Args:
+        filename (str, optional): Путь к файлу. По умолчанию 'formats.csv'.
+        regions (iterable, optional): Загрузить только эти регионы (и шаблоны
+            форматов). По умолчанию None - все регионы.
+
+    Returns:
+        FormatAssumptions: Шаблоны и значения форматов по регионам.
+
+    Исключения:
+        FileNotFoundError: Если файл не найден.
+        ValueError: Если в заголовке нет столбцов region, format, param и value.
+    """
+    table = FormatAssumptions()
+    selected = None if regions is None else {*regions, ALL_REGIONS}
+    known = set(FORMAT_COLUMN_PARAMS)
+
+    with open(filename, encoding='utf-8', newline='') as file:
+        reader = csv.reader(iter_region_lines(file, selected), delimiter=';')
+        header = next(reader, [])
+        try:
+            i_region, i_format, i_param, i_value = (header.index(name) for name in ('region', 'format', 'param', 'value'))
+        except ValueError:
+            raise ValueError(f'{filename}: ожидаются столбцы region;format;param;value, получено {header}') from None
+        width = max(i_region, i_format, i_param, i_value) + 1
+        numbered = selected is None
+        for row in reader:
+            line_no = reader.line_num if numbered else None
+            if not row:
+                continue   # пустая строка
+            if len(row) < width:
+                table.skipped_rows.append((line_no, 'недостаточно полей'))
+                continue
+            region, name, param = row[i_region], row[i_format], row[i_param]
+            if selected is not None and region not in selected:
+                continue
+            if param not in known:
+                table.skipped_rows.append((line_no, f'неизвестный параметр {param!r}'))
+                continue
+            try:
+                value = int(row[i_value])
+            except ValueError:
+                table.skipped_rows.append((line_no, f'некорректное значение {row[i_value]!r}'))
+                continue
+            if param in FORMAT_PARAMS:
+                _, low, high = FORMAT_PARAMS[param]
+                if value < low or (high is not None and value > high):
+                    table.skipped_rows.append((line_no, f'значение {param} вне допустимого диапазона: {value}'))
+                    continue
+            table.add_format(name)
+            if region == ALL_REGIONS:
+                table.templates[name][param] = value
+            else:
+                table.overrides[name].set(region, param, value)
+    return table
+
+
+def format_columns(regions, columns, formats):
+    """Входные столбцы calculate_financials_batch() для каждого формата.
+
+    Args:
+        regions (list): Названия регионов (в порядке столбцов).
+        columns (dict): Базовые входные столбцы (см. batch_financials.build_input_columns()).
+        formats (FormatAssumptions): Результат load_formats().
+
+    Returns:
+        dict: {формат: столбцы}; первым идёт BASE_FORMAT с базовыми столбцами.
+            Неизменённые столбцы - те же объекты, что в columns. Если формат
+            задаёт параметры FORMAT_PARAMS, добавляются столбцы 'volume',
+            'investment' (инвестиции + паушальный взнос) и 'royalty'.
+    """
+    position = None   # {регион: номер строки}, строится при первой необходимости
+
+    def own_column(name, param, base):
+        """Столбец параметра формата или None, если формат его не меняет."""
+        nonlocal position
+        template = formats.templates[name]
+        override = formats.overrides[name]
+        present = override.present[param]
+        overridden = present.find(1) != -1
+        if param not in template and not overridden:
+            return None
+        if param in template:
+            column = array('q', repeat(template[param], len(regions)))
+        elif isinstance(base, int):
+            column = array('q', repeat(base, len(regions)))
+        else:
+            column = array('q', base)
+        if overridden:
+            if position is None:
+                position = {region: i for i, region in enumerate(regions)}
+            values = override.columns[param]
+            for j, region in enumerate(override.regions):
+                i = position.get(region)
+                if i is not None and present[j]:
+                    column[i] = values[j]
+        return column
+
+    result = {BASE_FORMAT: columns}
+    for name in formats.formats:
+        own = dict(columns)
+        for column_name, param in ASSUMPTION_SOURCES.items():
+            column = own_column(name, param, columns[column_name])
+            if column is not None:
+                own[column_name] = column   # иначе формат не меняет параметр - столбец общий
+        scenario = {param: own_column(name, param, default) for param, (default, _, _) in FORMAT_PARAMS.items()}
+        if scenario['monthly_sales_volume'] is not None:
+            own['volume'] = scenario['monthly_sales_volume']
+        investment, fee = scenario['initial_investment'], scenario['franchise_fee']
+        if investment is not None or fee is not None:
+            if investment is None:
+                investment = repeat(INITIAL_INVESTMENT, len(regions))
+            own['investment'] = array('q', map(add, investment, fee)) if fee is not None else investment
+        if scenario['royalty_percent'] is not None:
+            own['royalty'] = scenario['royalty_percent']
+        result[name] = own
+    return result
+
+
+def evaluate_formats(regions, columns_by_format):
+    """Рассчитывает показатели всех пар регионы × форматы (пакет на формат).
+
+    Returns:
+        dict: {формат: результат calculate_financials_batch()}.
+    """
+    return {name: calculate_financials_batch(regions, columns) for name, columns in columns_by_format.items()}
+
+
+def best_formats(batches):
+    """Номер формата с наибольшей прибылью для каждого региона.
+
+    При равной прибыли выбирается формат, указанный раньше (базовый - первым).
+
+    Returns:
+        list: Номера форматов в порядке batches по регионам.
+    """
+    profits = [batch['profit'] for batch in batches.values()]
+    best = [0] * len(profits[0]) if profits else []
+    top = list(profits[0]) if profits else []
+    for k, profit in enumerate(profits[1:], 1):
+        for i, value in enumerate(profit):
+            if value > top[i]:
+                top[i] = value
+                best[i] = k
+    return best
+
+
+def write_formats_csv(batches, best, path):
+    """Записывает показатели всех пар регион × формат в CSV (потоково).
+
+    Столбец best равен 1 у лучшего формата региона.
+    """
+    names = list(batches)
+    fields = ('monthly_revenue', 'total_costs', 'profit', 'profitability', 'profitability_level',
+              'break_even_children', 'payback_period_month')
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(['region', 'format', *fields, 'best'])
+        for k, name in enumerate(names):
+            batch = batches[name]
+            writer.writerows(zip(batch['region'], repeat(name), *(batch[field] for field in fields),
+                                 (int(b == k) for b in best)))
+
+
+def _format_terms(formats, names):
+    """Строки таблицы параметров FORMAT_PARAMS по форматам (значения шаблонов)."""
+    rows = []
+    for name in names:
+        template = formats.templates.get(name, {})
+        override = formats.overrides.get(name)
+        by_region = override is not None and any(override.present[param].find(1) != -1 for param in FORMAT_PARAMS)
+        volume, investment, fee, royalty = (template.get(param, default) for param, (default, _, _) in FORMAT_PARAMS.items())
+        rows.append([name, volume, investment, fee, f'{royalty}%', 'да' if by_region else 'нет'])
+    return rows
+
+
+def generate_formats_report(batches, best, formats=None):
+    """Генерирует текстовый отчёт: лучший формат в каждом регионе и прибыль всех форматов.
+
+    Args:
+        batches (dict): Результат evaluate_formats().
+        best (list): Результат best_formats().
+        formats (FormatAssumptions, optional): Результат load_formats() для
+            таблицы вместимости, вложений и условий франшизы по форматам.
+
+    Returns:
+        str: Текст отчёта.
+    """
+    names = list(batches)
+    batch_list = list(batches.values())
+    regions = batch_list[0]['region']
+    rows = []
+    for i, region in enumerate(regions):
+        chosen = batch_list[best[i]]
+        payback = chosen['payback_period_month'][i]
+        rows.append([region, names[best[i]], f"{chosen['profitability'][i]:.1f}%",
+                     f'{payback} мес.' if isinstance(payback, int) else 'нет',
+                     *(batch['profit'][i] for batch in batch_list)])
+    headers = ["РЕГИОН", "ЛУЧШИЙ ФОРМАТ", "РЕНТАБ.", "ОКУПАЕМОСТЬ", *(f'ПРИБЫЛЬ: {name.upper()}' for name in names)]
+    table_output = format_fancy_table(headers, rows, currency_columns=list(range(4, 4 + len(names))))
+
+    wins = [0] * len(names)
+    for k in best:
+        wins[k] += 1
+    summary_rows = [[name, wins[k], sum(p > 0 for p in batch_list[k]['profit'])] for k, name in enumerate(names)]
+    summary = format_fancy_table(["ФОРМАТ", "ЛУЧШИЙ В РЕГИОНАХ", "ПРИБЫЛЕН В РЕГИОНАХ"], summary_rows)
+    if formats is not None:
+        terms = format_fancy_table(["ФОРМАТ", "ДЕТЕЙ В МЕСЯЦ", "ВЛОЖЕНИЯ", "ПАУШАЛЬНЫЙ ВЗНОС", "РОЯЛТИ", "ПО РЕГИОНАМ"],
+                                   _format_terms(formats, names), currency_columns=[2, 3])
+        summary = terms + '\n' + summary
+    losing = sum(batch_list[best[i]]['profit'][i] <= 0 for i in range(len(regions)))
+    return f"""ФОРМАТЫ ЦЕНТРА ПО {len(regions)} РЕГИОНАМ
+• Форматы:                   {', '.join(names)}
+• Убыточны во всех форматах: {losing} регионов
+
+{summary}
+
+{table_output}
+Лучший формат - с наибольшей месячной прибылью (роялти входит в затраты); прибыль
+всех форматов приведена для сравнения, окупаемость - с вложениями формата, включая
+паушальный взнос. Параметры формата: formats.csv поверх assumptions.csv.
+"""
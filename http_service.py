@@ -0,0 +1,357 @@
+"""Долгоживущий HTTP-сервис анализа регионов на asyncio (только стандартная библиотека).
+
+Внешние инструменты планирования вызывали main_pro.py отдельным процессом на
+каждый запрос: три CSV-файла читались заново, а регионы выбирались через
+stdin. Сервис загружает таблицы один раз, держит их в памяти и отвечает на
+запросы по HTTP/1.1 (с поддержкой keep-alive):
+
+    GET /health                          - проверка работоспособности
+    GET /regions                         - список регионов (JSON)
+    GET /financials?regions=A,B          - показатели calculate_financials() (JSON)
+    GET /report/single?region=A          - отчёт по региону (текст)
+    GET /report/compare?regions=A,B      - сравнение двух регионов (текст)
+    GET /report/overview?regions=A,B,C   - сводный отчёт (текст; top, page - постранично)
+
+Параметры volume (объём продаж в месяц) и investment (начальные инвестиции)
+задают сценарий расчёта; по умолчанию - как в calculate_financials(). Без
+regions в /financials и /report/overview берутся все регионы.
+
+Готовые ответы хранятся в LRU-кэше с ключом (путь, набор регионов,
+параметры), ограниченном и числом ответов, и их суммарным размером, поэтому
+повторные запросы не пересчитываются, а большие сводные отчёты не
+вытесняют память.
+
+Расчёт и формирование отчётов выполняются в отдельном потоке (по одному
+запросу за раз), поэтому цикл событий продолжает принимать соединения и
+отдавать готовые ответы. Непредвиденная ошибка обработчика возвращается
+клиенту как 500 Internal Server Error.
+"""
+
+import asyncio
+import json
+import sys
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from batch_financials import (INITIAL_INVESTMENT, MONTHLY_SALES_VOLUME, FinancialTable, build_input_columns,
+                              calculate_financials_batch)
+from columnar_loaders import DEFAULT_OKVED
+from results_export import export_record
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_CACHE_SIZE = 1024   # ответов в LRU-кэше
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024   # суммарный размер тел ответов в LRU-кэше
+MAX_HEADER_LINES = 100   # защита от бесконечных заголовков
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error'}
+
+
+class LRUCache:
+    """Ограниченный кэш с вытеснением давно не использованных записей.
+
+    Attributes:
+        maxsize (int): Максимальное число записей (0 - кэш отключён).
+        maxbytes (int): Максимальный суммарный размер записей в байтах.
+        nbytes (int): Текущий суммарный размер записей.
+        hits (int): Число попаданий.
+        misses (int): Число промахов.
+    """
+
+    __slots__ = ('maxsize', 'maxbytes', 'nbytes', 'hits', 'misses', '_data', '_sizes')
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE, maxbytes=DEFAULT_CACHE_BYTES):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._sizes = {}
+
+    def get(self, key):
+        """Возвращает значение по ключу или None и отмечает запись как недавно использованную."""
+        value = self._data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value, size=0):
+        """Сохраняет значение размером size байт, вытесняя давно использованные записи при переполнении.
+
+        Значение больше maxbytes не сохраняется.
+        """
+        if self.maxsize <= 0 or size > self.maxbytes:
+            return
+        self.nbytes += size - self._sizes.get(key, 0)
+        self._data[key] = value
+        self._sizes[key] = size
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize or self.nbytes > self.maxbytes:
+            evicted, _ = self._data.popitem(last=False)
+            self.nbytes -= self._sizes.pop(evicted)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RequestError(Exception):
+    """Ошибка запроса с HTTP-статусом ответа."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class AnalysisService:
+    """Обработчик запросов над загруженными в память таблицами.
+
+    Args:
+        tables (tuple): (regions_dict, businesses_dict, assumptions_dict) из main_pro.load_data().
+        cache_size (int, optional): Размер LRU-кэша ответов.
+        okved (tuple, optional): Коды ОКВЭД, с которыми загружены таблицы (для
+            подписи числа ИП в отчётах). По умолчанию DEFAULT_OKVED.
+        cache_bytes (int, optional): Суммарный размер ответов в LRU-кэше.
+        render_report (callable, optional): Функция формирования отчёта
+            (main_pro.render_report). По умолчанию импортируется из main_pro
+            при первом отчёте: при запуске через main_pro.py её передаёт
+            вызывающий модуль, чтобы main_pro не выполнялся второй раз.
+    """
+
+    def __init__(self, tables, cache_size=DEFAULT_CACHE_SIZE, okved=DEFAULT_OKVED,
+                 cache_bytes=DEFAULT_CACHE_BYTES, render_report=None):
+        self.tables = tables
+        self.okved = okved
+        self.cache = LRUCache(cache_size, cache_bytes)
+        self.requests = 0
+        self._render_report = render_report
+
+    def _regions(self, query, name='regions', default_all=True):
+        """Список регионов из параметра запроса (через запятую или повторением параметра)."""
+        values = [part for value in query.get(name, []) for part in value.split(',') if part]
+        if not values:
+            if not default_all:
+                raise RequestError(400, f'не задан параметр {name}')
+            return sorted(self.tables[0])
+        unknown = [r for r in values if r not in self.tables[0]]
+        if unknown:
+            raise RequestError(400, f'неизвестные регионы: {", ".join(unknown)}')
+        return sorted(set(values))
+
+    @staticmethod
+    def _int(query, name, default=None):
+        """Целочисленный параметр запроса."""
+        values = query.get(name)
+        if not values:
+            return default
+        try:
+            return int(values[-1])
+        except ValueError:
+            raise RequestError(400, f'параметр {name} должен быть целым числом') from None
+
+    def financials(self, regions, volume=MONTHLY_SALES_VOLUME, investment=INITIAL_INVESTMENT):
+        """Показатели регионов при заданном сценарии (FinancialTable {регион: результат})."""
+        try:
+            columns = build_input_columns(regions, *self.tables)
+        except KeyError as error:
+            raise RequestError(400, f'неполные исходные данные: {error}') from None
+        batch = calculate_financials_batch(regions, columns, volume, investment)
+        return FinancialTable.from_batch(batch)
+
+    def handle(self, target):
+        """Обрабатывает GET-запрос.
+
+        Args:
+            target (str): Путь запроса с параметрами.
+
+        Returns:
+            tuple: (статус, тип содержимого, тело ответа в байтах).
+        """
+        self.requests += 1
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        try:
+            return self._dispatch(url.path.rstrip('/') or '/', query)
+        except RequestError as error:
+            return error.status, 'text/plain; charset=utf-8', f'{error}\n'.encode('utf-8')
+        except Exception:
+            # Ошибка обработчика не должна обрывать соединение без ответа
+            print(f'Ошибка обработки {target}:', file=sys.stderr)
+            traceback.print_exc()
+            return 500, 'text/plain; charset=utf-8', 'внутренняя ошибка сервиса\n'.encode('utf-8')
+
+    def render_report(self, kind, regions, results, options):
+        """Формирует отчёт функцией render_report (см. main_pro.render_report())."""
+        if self._render_report is None:
+            from main_pro import render_report   # отложенный импорт: main_pro импортирует этот модуль
+            self._render_report = render_report
+        return self._render_report(kind, regions, results, options)
+
+    def _dispatch(self, path, query):
+        if path == '/health':
+            body = json.dumps({'status': 'ok', 'requests': self.requests, 'cached': len(self.cache),
+                               'cache_hits': self.cache.hits, 'cache_misses': self.cache.misses})
+            return 200, 'application/json', body.encode('utf-8')
+        if path == '/regions':
+            return 200, 'application/json', json.dumps(sorted(self.tables[0]), ensure_ascii=False).encode('utf-8')
+
+        if path == '/report/single':
+            regions = self._regions(query, 'region', default_all=False)
+            if len(regions) != 1:
+                raise RequestError(400, 'для отчёта по региону нужен ровно один регион')
+            kind, options = 'single', {} if self.okved == DEFAULT_OKVED else {'okved': self.okved}
+        elif path == '/report/compare':
+            regions = self._regions(query, default_all=False)
+            if len(regions) != 2:
+                raise RequestError(400, 'для сравнения нужно ровно два региона')
+            kind, options = 'compare', {}
+        elif path == '/report/overview':
+            regions = self._regions(query)
+            kind, options = 'overview', {}
+            top = self._int(query, 'top')
+            if top is not None:
+                options = {'top_n': top, 'page': self._int(query, 'page', 1)}
+        elif path == '/financials':
+            regions = self._regions(query)
+            kind, options = 'financials', {}
+        else:
+            raise RequestError(404, f'неизвестный путь {path}')
+
+        volume = self._int(query, 'volume', MONTHLY_SALES_VOLUME)
+        investment = self._int(query, 'investment', INITIAL_INVESTMENT)
+        if volume < 1 or investment < 0:
+            raise RequestError(400, 'volume должен быть положительным, investment - неотрицательным')
+
+        if kind == 'single':
+            # Подписи набора детей и вложений в отчёте - те, с которыми выполнен расчёт
+            options = dict(options, monthly_sales_volume=volume, initial_investment=investment)
+
+        key = (kind, tuple(regions), tuple(sorted(options.items())), volume, investment)
+        response = self.cache.get(key)
+        if response is None:
+            results = self.financials(regions, volume, investment)
+            if kind == 'financials':
+                # Без данных об ИП - null вместо -1 и Infinity (см. results_export.export_record())
+                body = json.dumps([export_record(result) for result in results.values()], ensure_ascii=False,
+                                  allow_nan=False)
+                response = (200, 'application/json', body.encode('utf-8'))
+            else:
+                try:
+                    _, report = self.render_report(kind, regions, results, options)
+                except ValueError as error:
+                    raise RequestError(400, str(error)) from None
+                response = (200, 'text/plain; charset=utf-8', report.encode('utf-8'))
+            self.cache.put(key, response, len(response[2]))
+        return response
+
+
+async def _read_request(reader):
+    """Читает запрос: (метод, путь, версия, заголовки) или None при закрытом соединении."""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, version = line.decode('latin-1').split()
+    except ValueError:
+        raise RequestError(400, 'некорректная строка запроса') from None
+    headers = {}
+    for _ in range(MAX_HEADER_LINES):
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise RequestError(400, 'слишком много заголовков')
+    # Тело запроса не используется, но должно быть вычитано для keep-alive
+    try:
+        length = int(headers.get('content-length') or 0)
+    except ValueError:
+        raise RequestError(400, 'некорректный заголовок Content-Length') from None
+    if length:
+        await reader.readexactly(length)
+    return method, target, version, headers
+
+
+def _response(status, content_type, body, keep_alive):
+    """Формирует байты HTTP-ответа."""
+    head = (f'HTTP/1.1 {status} {REASONS[status]}\r\n'
+            f'Content-Type: {content_type}\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n')
+    return head.encode('latin-1') + body
+
+
+async def _serve_connection(service, executor, reader, writer):
+    """Обслуживает одно соединение (несколько запросов при keep-alive)."""
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            try:
+                request = await _read_request(reader)
+            except RequestError as error:
+                writer.write(_response(error.status, 'text/plain; charset=utf-8',
+                                       f'{error}\n'.encode('utf-8'), False))
+                break
+            if request is None:
+                break
+            method, target, version, headers = request
+            connection = headers.get('connection', '').lower()
+            keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+            if method == 'GET':
+                # Расчёт и отчёты - в потоке executor, цикл событий не блокируется
+                status, content_type, body = await loop.run_in_executor(executor, service.handle, target)
+            else:
+                status, content_type, body = 405, 'text/plain; charset=utf-8', 'поддерживается только GET\n'.encode('utf-8')
+            writer.write(_response(status, content_type, body, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Запускает сервер и возвращает объект asyncio.Server (порт 0 - любой свободный).
+
+    Запросы обрабатываются в одном рабочем потоке по очереди: обработчик и
+    LRU-кэш не рассчитаны на одновременный доступ, а расчёт ограничен GIL.
+    """
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='http-service')
+    server = await asyncio.start_server(lambda r, w: _serve_connection(service, executor, r, w), host, port)
+    # Поток освобождается вместе с сервером
+    server.get_loop().create_task(_shutdown_executor(server, executor))
+    return server
+
+
+async def _shutdown_executor(server, executor):
+    try:
+        await server.wait_closed()
+    finally:
+        executor.shutdown(wait=False)
+
+
+def serve(tables, host=DEFAULT_HOST, port=DEFAULT_PORT, cache_size=DEFAULT_CACHE_SIZE, okved=DEFAULT_OKVED,
+          cache_bytes=DEFAULT_CACHE_BYTES, render_report=None):
+    """Запускает сервис и обслуживает запросы до прерывания (Ctrl+C)."""
+    service = AnalysisService(tables, cache_size, okved, cache_bytes, render_report)
+
+    async def run():
+        server = await start_server(service, host, port)
+        address = server.sockets[0].getsockname()
+        print(f'Сервис запущен: http://{address[0]}:{address[1]}/ (регионов: {len(tables[0])})')
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print('Сервис остановлен.')
@@ -0,0 +1,228 @@
+"""Обратная задача: какие параметры нужны региону для целевой рентабельности или окупаемости.
+
+Формулы calculate_financials() линейны по среднему чеку, объёму продаж и
+аренде, поэтому требуемые значения находятся в замкнутой форме:
+
+    прибыль        P = A·V − (R·S + F)
+    рентабельность P / (A·V) ≥ p      ⇔  A·V·(1 − p) ≥ R·S + F
+    окупаемость    ⌈I / P⌉ ≤ M        ⇔  P ≥ I / M
+
+где A - средний чек, V - объём продаж, R - аренда за кв. м, S - площадь,
+F - зарплаты, маркетинг и прочие расходы, I - начальные инвестиции.
+
+Для всех регионов сразу вычисляются: минимальный средний чек (при базовом
+объёме продаж), минимальный объём продаж (при текущем чеке) и максимальная
+аренда за кв. м (при текущих чеке и объёме). Значения округляются до целых и
+проверяются по тем же правилам, что в calculate_financials() (рентабельность
+с округлением до 0.1, уровни, срок окупаемости в полных месяцах), поэтому
+ответ точный, а не приближённый.
+"""
+
+import math
+from operator import add, mul
+
+from batch_financials import (INITIAL_INVESTMENT, MONTHLY_SALES_VOLUME,
+                              PROFITABILITY_BOUNDS, PROFITABILITY_LEVELS)
+from create_table import format_fancy_table
+
+# Максимальное число шагов уточнения целого решения (на практике 0-2)
+MAX_REFINE_STEPS = 1000
+
+# Отметка для региона с нулевой площадью: аренда не влияет на расходы
+UNLIMITED_RENT = 'no limit'
+
+
+def profitability_predicate(target_profitability=None, target_level=None):
+    """Строит условие на рентабельность (в процентах, округлённую до 0.1).
+
+    Args:
+        target_profitability (float, optional): Рентабельность не ниже заданной.
+        target_level (str, optional): Уровень рентабельности не ниже заданного
+            ('regular' или 'high'), границы как в calculate_financials().
+
+    Returns:
+        tuple: (условие или None, приближённая доля p для замкнутой формы).
+
+    Исключения:
+        ValueError: Если цель недостижима или уровень неизвестен.
+    """
+    conditions = []
+    share = None
+    if target_profitability is not None:
+        if target_profitability >= 100:
+            raise ValueError('рентабельность 100% и выше недостижима')
+        conditions.append(lambda x, t=target_profitability: x >= t)
+        share = target_profitability / 100
+    if target_level is not None:
+        if target_level not in PROFITABILITY_LEVELS[1:]:
+            raise ValueError(f'уровень рентабельности должен быть одним из: {", ".join(PROFITABILITY_LEVELS[1:])}')
+        bound = PROFITABILITY_BOUNDS[PROFITABILITY_LEVELS.index(target_level) - 1]
+        conditions.append(lambda x, b=bound: x > b)
+        # Строго больше границы после округления до 0.1 - примерно b + 0.05
+        share = max(share or 0, (bound + 0.05) / 100)
+    if not conditions:
+        return None, None
+    return (lambda x: all(c(x) for c in conditions)), share
+
+
+def _meets(check, volume, rent, area, fixed, predicate, investment, payback):
+    """Проверяет выполнение целей по правилам calculate_financials()."""
+    revenue = check * volume
+    if revenue <= 0:
+        return False
+    profit = revenue - (rent * area + fixed)
+    if predicate is not None and not predicate(round((profit / revenue) * 100, 1)):
+        return False
+    if payback is not None and (profit <= 0 or math.ceil(investment / profit) > payback):
+        return False
+    return True
+
+
+def _refine_min(start, meets, low=1):
+    """Минимальное целое x >= low, для которого meets(x) истинно, начиная с приближения start."""
+    x = max(low, start)
+    for _ in range(MAX_REFINE_STEPS):
+        if meets(x):
+            break
+        x += 1
+    else:
+        return None
+    while x > low and meets(x - 1):
+        x -= 1
+    return x
+
+
+def _refine_max(start, meets, low=0):
+    """Максимальное целое x >= low, для которого meets(x) истинно (None - если такого нет)."""
+    x = max(low, start)
+    for _ in range(MAX_REFINE_STEPS):
+        if x < low:
+            return None
+        if meets(x):
+            break
+        x -= 1
+    else:
+        return None
+    while meets(x + 1):
+        x += 1
+    return x
+
+
+def solve_targets(regions, columns, target_profitability=None, target_level=None, target_payback=None,
+                  monthly_sales_volume=MONTHLY_SALES_VOLUME, initial_investment=INITIAL_INVESTMENT):
+    """Вычисляет для всех регионов параметры, обеспечивающие заданные цели.
+
+    Цели можно сочетать: например, высокий уровень рентабельности и
+    окупаемость не дольше 12 месяцев.
+
+    Args:
+        regions (list): Названия регионов.
+        columns (dict): Входные столбцы (см. batch_financials.build_input_columns()).
+        target_profitability (float, optional): Рентабельность не ниже, %.
+        target_level (str, optional): Уровень рентабельности не ниже ('regular', 'high').
+        target_payback (int, optional): Срок окупаемости не дольше, месяцев.
+        monthly_sales_volume (int, optional): Базовый объём продаж. По умолчанию 60.
+        initial_investment (int, optional): Начальные инвестиции. По умолчанию 500000.
+
+    Returns:
+        dict: Столбцы 'region', 'avg_check', 'required_avg_check', 'required_volume',
+            'rent', 'max_rent_per_sqm'. None означает, что цель недостижима
+            изменением только этого параметра; UNLIMITED_RENT - что при нулевой
+            площади цель выполняется при любой аренде.
+
+    Исключения:
+        ValueError: Если не задана ни одна цель или цель недостижима в принципе.
+    """
+    predicate, share = profitability_predicate(target_profitability, target_level)
+    if predicate is None and target_payback is None:
+        raise ValueError('не задана ни одна цель (рентабельность, уровень или срок окупаемости)')
+    if target_payback is not None and target_payback < 1:
+        raise ValueError('срок окупаемости должен быть не меньше 1 месяца')
+
+    share = share or 0.0
+    # Минимальная прибыль, при которой срок окупаемости укладывается в цель
+    min_profit = initial_investment / target_payback if target_payback else 0.0
+
+    checks, rents, areas = columns['avg_check'], columns['rent'], columns['area']
+    fixed = list(map(add, map(mul, columns['teachers'], columns['salary']),
+                     map(add, columns['marketing'], columns['other_costs'])))
+    costs = [r * s + f for r, s, f in zip(rents, areas, fixed)]
+    volume = monthly_sales_volume
+
+    # Замкнутая форма для всех регионов одним проходом по столбцам. Нулевой
+    # чек (выручка не растёт с объёмом) и нулевая площадь (аренда не влияет
+    # на расходы) обрабатываются отдельно ниже, приближение для них не нужно
+    approx_check = [max(c / (volume * (1 - share)), (c + min_profit) / volume) for c in costs]
+    approx_volume = [max(c / (a * (1 - share)), (c + min_profit) / a) if a > 0 else None
+                     for c, a in zip(costs, checks)]
+    approx_rent = [min(a * volume * (1 - share) - f, a * volume - f - min_profit) / s if s > 0 else None
+                   for a, f, s in zip(checks, fixed, areas)]
+
+    # Уточнение до точного целого решения по правилам calculate_financials()
+    def meets(a, v, r, s, f):
+        return _meets(a, v, r, s, f, predicate, initial_investment, target_payback)
+
+    required_check, required_volume, max_rent = [], [], []
+    for i in range(len(regions)):
+        a, r, s, f = checks[i], rents[i], areas[i], fixed[i]
+        required_check.append(_refine_min(math.ceil(approx_check[i]), lambda x: meets(x, volume, r, s, f)))
+        if approx_volume[i] is None:
+            required_volume.append(None)
+        else:
+            required_volume.append(_refine_min(math.ceil(approx_volume[i]), lambda x: meets(a, x, r, s, f)))
+        if approx_rent[i] is None:
+            max_rent.append(UNLIMITED_RENT if meets(a, volume, 0, s, f) else None)
+        else:
+            max_rent.append(_refine_max(math.floor(approx_rent[i]), lambda x: meets(a, volume, x, s, f)))
+
+    return {
+        'region': list(regions),
+        'avg_check': list(checks),
+        'required_avg_check': required_check,
+        'required_volume': required_volume,
+        'rent': list(rents),
+        'max_rent_per_sqm': max_rent,
+    }
+
+
+def generate_targets_report(solution, targets_text, monthly_sales_volume=MONTHLY_SALES_VOLUME):
+    """Генерирует текстовый отчёт с требуемыми параметрами по регионам.
+
+    Args:
+        solution (dict): Результат solve_targets().
+        targets_text (str): Описание целей для заголовка отчёта.
+        monthly_sales_volume (int, optional): Базовый объём продаж.
+
+    Returns:
+        str: Текст отчёта.
+    """
+    headers = ["РЕГИОН", "ЧЕК", "НУЖЕН ЧЕК", "ДЕТЕЙ (ПРИ ТЕКУЩЕМ ЧЕКЕ)", "АРЕНДА М²", "МАКС. АРЕНДА М²"]
+    rows = []
+    for i, region in enumerate(solution['region']):
+        volume = solution['required_volume'][i]
+        max_rent = solution['max_rent_per_sqm'][i]
+        if max_rent is None:
+            max_rent = 'недостижимо'
+        elif max_rent == UNLIMITED_RENT:
+            max_rent = 'не ограничена'
+        rows.append([
+            region,
+            solution['avg_check'][i],
+            '—' if solution['required_avg_check'][i] is None else solution['required_avg_check'][i],
+            '—' if volume is None else f'{volume}',
+            solution['rent'][i],
+            max_rent,
+        ])
+    table_output = format_fancy_table(headers, rows, currency_columns=[1, 2, 4, 5])
+    unlimited_note = ''
+    if UNLIMITED_RENT in solution['max_rent_per_sqm']:
+        unlimited_note = 'Не ограничена - площадь равна нулю, аренда не влияет на расходы.\n'
+
+    return f"""ТРЕБУЕМЫЕ ПАРАМЕТРЫ ДЛЯ ДОСТИЖЕНИЯ ЦЕЛИ
+Цель: {targets_text}
+
+{table_output}
+Нужен чек - минимальный средний чек при наборе {monthly_sales_volume} детей.
+Детей - минимальный набор в месяц при текущем среднем чеке.
+Макс. аренда - наибольшая аренда за кв. м при текущих чеке и наборе {monthly_sales_volume} детей.
+{unlimited_note}"""
@@ -5,9 +5,37 @@
 финансовые показатели для выбранных регионов.
 """
 
+import argparse
 import csv
+import functools
+import heapq
+import itertools
 import math
-from create_table import print_fancy_table, format_fancy_table
+import os
+import sys
+from collections import Counter
+from create_table import print_fancy_table, format_fancy_table, iter_fancy_table, cell_width
+from batch_financials import (build_input_columns, calculate_financials_batch, FinancialTable, NO_IP_DATA,
+                              UNKNOWN_LEVEL, MONTHLY_SALES_VOLUME, INITIAL_INVESTMENT)
+from columnar_loaders import (load_assumptions_columns, load_businesses_columns, describe_load_problems,
+                              incomplete_regions, iter_region_lines, load_region_names, DEFAULT_OKVED)
+from data_cache import load_tables
+from region_table import RegionTable
+from ranking import RankingIndex
+from region_index import RegionIndex
+import skyline
+import build_manifest
+import results_export
+import http_service
+import profiling
+import scenario_sweep
+import monte_carlo
+import inverse_solver
+import cashflow
+import portfolio
+import vintage_diff
+import formats
+import sqlite_store
 
 # Вспомогательные функции и данные
 def format_currency(amount):
@@ -27,10 +55,11 @@ profitability_labels = {
 competition_labels = {
     'low': 'низкий',
     'medium': 'умеренный',
-    'high': 'высокий'
+    'high': 'высокий',
+    UNKNOWN_LEVEL: 'нет данных'
 }
 
-def load_regions(filename='regions.csv'):
+def load_regions(filename='regions.csv', regions=None):
     """Загружает демографические данные по регионам из CSV-файла.
     
     Формат файла:
@@ -40,9 +69,12 @@ def load_regions(filename='regions.csv'):
         
     Args:
         filename (str, optional): Путь к CSV-файлу с данными. По умолчанию 'regions.csv'.
+        regions (iterable, optional): Загрузить только эти регионы; строки других
+            регионов отсеиваются до разбора CSV. По умолчанию None - все регионы.
         
     Returns:
-        dict: Словарь вида:
+        RegionTable: Таблица в столбцах array (см. region_table.py), которая
+            читается как словарь вида:
             {
                 "Казань": {"children_5_7": 41800, "avg_rent_per_sqm": 1050},
                 ...
@@ -52,40 +84,51 @@ def load_regions(filename='regions.csv'):
         FileNotFoundError: Если файл не найден.
         KeyError, ValueError, TypeError: При некорректных данных в файле.
     """
-    regions_data = {} # Словарь для хранения данных по регионам
+    regions_data = RegionTable(("children_5_7", "avg_rent_per_sqm")) # Таблица для хранения данных по регионам
+    selected = None if regions is None else set(regions) # Выбранные регионы (None - все)
     
     with open(filename, "r", encoding="utf-8") as file: # Открываем файл с помощью контекстного менеджера
-        # Указываем delimiter=';', так как используется точка с запятой
-        reader = csv.DictReader(file, delimiter=";") # Создаем итератор из файла - каждая строка в виде словаря
+        # Указываем delimiter=';', так как используется точка с запятой; строки
+        # невыбранных регионов отсеиваются по префиксу ещё до разбора на поля
+        reader = csv.DictReader(iter_region_lines(file, selected), delimiter=";") # Каждая строка в виде словаря
         for row in reader:
             try:
                 region = row["region"]
+                if selected is not None and region not in selected:
+                    continue
                 children = int(row["children_5_7"]) # Преобразуем строку в целое число
                 rent = int(row["avg_rent_per_sqm"]) # Преобразуем строку в целое число
-                # Добавляем данные в словарь
-                regions_data[region] = {
-                    "children_5_7": children,
-                    "avg_rent_per_sqm": rent
-                }
+                # Добавляем данные в таблицу
+                regions_data.set(region, (children, rent))
             except (KeyError, ValueError, TypeError): # Объединение нескольких исключений в одно
                 # Пропускаем строки с отсутствующими колонками или некорректными значениями
+                profiling.count('load', skipped=1)
                 continue
+        profiling.count('load', rows=reader.line_num - 1)
     
     return regions_data
 
-def load_businesses(filename='businesses.csv'):
+def load_businesses(filename='businesses.csv', okved=DEFAULT_OKVED, regions=None):
     """Загружает данные о бизнесах из CSV-файла.
     
     Формат файла:
-        region;ip_count
-        Казань;376
+        region;okved;ip_count
+        Казань;85.59;376
         ...
         
+    Строки с кодами ОКВЭД не из okved пропускаются, а число ИП по нескольким
+    строкам одного региона суммируется. Если столбца okved в файле нет,
+    учитываются все строки.
+        
     Args:
         filename (str, optional): Путь к CSV-файлу с данными. По умолчанию 'businesses.csv'.
+        okved (iterable, optional): Коды ОКВЭД для подсчёта ИП; None - все коды.
+            По умолчанию DEFAULT_OKVED (85.59).
+        regions (iterable, optional): Загрузить только эти регионы. По умолчанию все.
         
     Returns:
-        dict: Словарь, где ключи - названия регионов, значения - словари с данными:
+        RegionTable: Таблица в столбцах array, которая читается как словарь,
+            где ключи - названия регионов, значения - словари с данными:
             {
                 "Казань": {"ip_count": 376},
                 ...
@@ -95,26 +138,36 @@ def load_businesses(filename='businesses.csv'):
         FileNotFoundError: Если файл не найден.
         KeyError, ValueError, TypeError: При некорректных данных в файле.
     """
-    businesses_data = {} # Словарь для хранения данных о бизнесов по регионам и ОКВЕД
+    businesses_data = RegionTable(("ip_count",)) # Таблица для хранения данных о бизнесах по регионам
+    codes = None if okved is None else set(okved) # Коды ОКВЭД, по которым считаются ИП
+    selected = None if regions is None else set(regions) # Выбранные регионы (None - все)
     
     with open(filename, "r", encoding="utf-8") as file: # Открываем файл с помощью контекстного менеджера
-        # Указываем delimiter=';', так как используется точка с запятой
-        reader = csv.DictReader(file, delimiter=";") # Создаем итератор из файла - каждая строка в виде словаря
+        # Указываем delimiter=';', так как используется точка с запятой; строки
+        # невыбранных регионов отсеиваются по префиксу ещё до разбора на поля
+        reader = csv.DictReader(iter_region_lines(file, selected), delimiter=";") # Каждая строка в виде словаря
         for row in reader:
             try:
                 region = row["region"]  # Получаем регион
+                if selected is not None and region not in selected:
+                    continue
+                if codes is not None and "okved" in row and row["okved"] not in codes:
+                    continue   # ИП с другим кодом ОКВЭД не учитываются
                 ip_count = int(row["ip_count"])  # Преобразуем строку в целое число
-                # Добавляем данные в словарь
-                businesses_data[region] = {
-                    "ip_count": ip_count,
-                }   
+                # Суммируем ИП по всем строкам региона и добавляем данные в таблицу
+                previous = businesses_data.get(region)
+                if previous is not None:
+                    ip_count += previous["ip_count"]
+                businesses_data.set(region, (ip_count,))
             except (KeyError, ValueError, TypeError): # Объединение нескольких исключений в одно
                 # Пропускаем строки с отсутствующими колонками или некорректными значениями
+                profiling.count('load', skipped=1)
                 continue
+        profiling.count('load', rows=reader.line_num - 1)
             
     return businesses_data                  
 
-def load_assumptions(filename='assumptions.csv'):
+def load_assumptions(filename='assumptions.csv', regions=None):
     """Загружает данные о предположениях из CSV-файла.
     
     Формат файла:
@@ -124,6 +177,7 @@ def load_assumptions(filename='assumptions.csv'):
         
     Args:
         filename (str, optional): Путь к CSV-файлу с данными. По умолчанию 'assumptions.csv'.
+        regions (iterable, optional): Загрузить только эти регионы. По умолчанию все.
         
     Returns:
         dict: Словарь, где ключи - названия регионов, значения - словари с параметрами:
@@ -137,13 +191,17 @@ def load_assumptions(filename='assumptions.csv'):
         KeyError, ValueError, TypeError: При некорректных данных в файле.
     """
     assumptions_data = {} # Словарь для хранения данных о предположениях по регионам
+    selected = None if regions is None else set(regions) # Выбранные регионы (None - все)
 
     with open(filename, "r", encoding="utf-8") as file: # Открываем файл с помощью контекстного менеджера
-        # Указываем delimiter=';', так как используется точка с запятой
-        reader = csv.DictReader(file, delimiter=";") # Создаем итератор из файла - каждая строка в виде словаря
+        # Указываем delimiter=';', так как используется точка с запятой; строки
+        # невыбранных регионов отсеиваются по префиксу ещё до разбора на поля
+        reader = csv.DictReader(iter_region_lines(file, selected), delimiter=";") # Каждая строка в виде словаря
         for row in reader:
             try:
                 region = row["region"]
+                if selected is not None and region not in selected:
+                    continue
                 param=row["param"]
                 value=int(row["value"]) # Преобразуем строку в целое число
                 # Создаем подсловарь для региона, если региона нет в словаре для хранения данных о предположениях
@@ -154,18 +212,66 @@ def load_assumptions(filename='assumptions.csv'):
                 
             except (KeyError, ValueError, TypeError): # Объединение нескольких исключений в одно
                 # Пропускаем строки с отсутствующими колонками или некорректными значениями
+                profiling.count('load', skipped=1)
                 continue
+        profiling.count('load', rows=reader.line_num - 1)
 
     return assumptions_data 
 
+REGION_MATCHES_SHOWN = 10   # вариантов, выводимых при неоднозначном вводе региона
+
+def ask_region(index, prompt):
+    """Запрашивает у пользователя один регион до получения однозначного ответа.
+    
+    Принимается название (без учёта регистра и ё/е), начало названия, если
+    ему соответствует ровно один регион, или номер в алфавитном списке.
+    При неоднозначном вводе выводятся подходящие варианты, при опечатке -
+    похожие названия; весь список регионов не выводится.
+    
+    Args:
+        index (RegionIndex): Индекс названий регионов.
+        prompt (str): Текст приглашения.
+        
+    Returns:
+        str: Название выбранного региона.
+    """
+    while True:
+        text = input(prompt).strip()
+        if not text:
+            continue
+        if text.isdigit():
+            # Номер в алфавитном списке (как в прежнем меню)
+            if 1 <= int(text) <= len(index):
+                return index.regions[int(text) - 1]
+            print(f'\nНомер должен быть от 1 до {len(index)}. Повторите выбор.\n')
+            continue
+        found = index.find(text)
+        if len(found) == 1 or text in found:
+            return text if text in found else found[0]
+        count = len(found) or index.count_prefix(text)
+        if count == 1:
+            return index.prefix(text)[0]
+        if count > 1:
+            # Несколько регионов с таким началом (или различающихся только ё/е)
+            shown = found or index.prefix(text, REGION_MATCHES_SHOWN)
+            more = f' и ещё {count - len(shown)}' if count > len(shown) else ''
+            print(f'\nПодходят регионы: {", ".join(shown)}{more}. Уточните название.\n')
+            continue
+        hints = index.suggest(text)
+        print(f'\nРегион {text!r} не найден.' + (f' Возможно: {", ".join(hints)}.' if hints else '') + '\n')
+
 def select_regions(regions_dict):
     """Позволяет пользователю выбрать регионы для анализа через интерактивное меню.
     
-    Функция выводит список всех доступных регионов и предлагает выбрать режим анализа:
+    Функция предлагает выбрать режим анализа:
     - S: Анализ одного региона
     - D: Сравнение двух регионов
+    - M: Анализ нескольких регионов (названия, шаблоны, @файл через запятую)
     - A: Анализ всех регионов
     
+    Регионы выбираются по названию через индекс (см. region_index.py и
+    ask_region()), поэтому список регионов не выводится целиком.
+    
     Args:
         regions_dict (dict): Словарь с данными по регионам в формате:
             {
@@ -175,24 +281,17 @@ def select_regions(regions_dict):
             
     Returns:
         list: Список выбранных регионов для анализа.
-        
-    Raises:
-        SystemExit: Если пользователь сделал некорректный выбор.
     """
-    regions_list = sorted(regions_dict.keys()) # Список всех регионов
-    # Основная логика: вывод списка регионов, выбор режима анализа и обработка выбора пользователя.
-    selected_regions = [] # Список для хранения выбранных регионов
+    index = RegionIndex(regions_dict) # Индекс названий регионов
     
-    # Выводим список всех доступных регионов
-    print('\nДля дальнейшего анализа можно выбрать следующие регионы:')
-    for index, region in enumerate(regions_list, 1):
-        print(f'{index}. {region}')
-    print(f'Всего в списке {len(regions_list)} регионов.\n')
+    print(f'\nДоступно регионов: {len(index)}. Регион можно указать названием (регистр и ё/е не важны),')
+    print('началом названия или номером в алфавитном списке.\n')
     
     # Предлагаем пользователю выбрать режим анализа
     print('Введите код режима анализа:')
     print('S - Анализ одного региона')
     print('D - Сравнение двух регионов')
+    print('M - Анализ нескольких регионов (названия, шаблоны вида Моск*, файл списка @файл через запятую)')
     print('A - Анализ всех регионов')
     
     # Основной цикл обработки выбора режима анализа
@@ -201,33 +300,34 @@ def select_regions(regions_dict):
         match mode:
             # Обработка выбора одного региона
             case 'S' | 's':
-                while True:
-                    choise_region = int(input('Введите номер региона: '))
-                    # Проверяем, что номер региона в допустимом диапазоне
-                    if choise_region in range(1, len(regions_list)+1):
-                        selected_regions.append(regions_list[choise_region-1])
-                        print(f'\nВы выбрали для анализа {selected_regions[0]}')
-                        return selected_regions
-                    else:
-                        print('\nНеверно. Повторите выбор региона.\n')
+                region = ask_region(index, 'Введите регион: ')
+                print(f'\nВы выбрали для анализа {region}')
+                return [region]
             # Обработка выбора двух регионов для сравнения
             case 'D' | 'd':
                 while True:
-                    choise_region1 = int(input('Введите номер первого региона: '))
-                    choise_region2 = int(input('Введите номер второго региона: '))
-                    # Проверяем, что оба номера регионов в допустимом диапазоне и не равны друг другу
-                    if choise_region1 in range(1, len(regions_list)+1) and\
-                    choise_region2 in range(1, len(regions_list)+1) and\
-                    choise_region1 != choise_region2:
-                        selected_regions.append(regions_list[choise_region1-1])
-                        selected_regions.append(regions_list[choise_region2-1])
-                        print(f'\nВы выбрали для сравнительного анализа {selected_regions[0]} и {selected_regions[1]}')
+                    region1 = ask_region(index, 'Введите первый регион: ')
+                    region2 = ask_region(index, 'Введите второй регион: ')
+                    # Проверяем, что регионы не совпадают
+                    if region1 != region2:
+                        print(f'\nВы выбрали для сравнительного анализа {region1} и {region2}')
+                        return [region1, region2]
+                    print('\nНеверно. Выберите два разных региона.\n')
+            # Обработка выбора нескольких регионов по описаниям
+            case 'M' | 'm':
+                while True:
+                    specs = [spec.strip() for spec in input('Введите регионы через запятую: ').split(',') if spec.strip()]
+                    try:
+                        selected_regions = index.resolve_many(specs)
+                    except (ValueError, OSError) as error:
+                        print(f'\n{error}. Повторите выбор.\n')
+                        continue
+                    if selected_regions:
+                        print(f'\nВы выбрали для анализа регионов: {len(selected_regions)}')
                         return selected_regions
-                    else:
-                        print('\nНеверно. Повторите выбор регионов.\n')
             # Обработка выбора всех регионов
             case 'A' | 'a':
-                selected_regions = regions_list
+                selected_regions = index.regions
                 print(f'\nВы выбрали для анализа все регионы')
                 return selected_regions
             # Обработка некорректного ввода
@@ -274,15 +374,20 @@ def calculate_financials(region, reg_data, bus_data, ass_data):
             profitability_level = 'high'   # высокий уровень рентабельности
     
     break_even_children = math.ceil(total_costs / ass_data['avg_check'])   # точка безубыточности
-    competition_density = round(bus_data['ip_count'] / (reg_data['children_5_7'] / 1000), 1)   # плотность конкуренции
-    
-    match competition_density:
-        case x if x <= 8:
-            competition_level = 'low'   # низкий уровень конкуренции
-        case x if x <= 12:
-            competition_level = 'medium'   # умеренный уровень конкуренции
-        case x if x > 12:
-            competition_level = 'high'   # высокий уровень конкуренции
+    if bus_data['ip_count'] == NO_IP_DATA:
+        # Нет данных об ИП: конкуренция не оценивается (последнее место в рейтингах)
+        competition_density = math.inf
+        competition_level = UNKNOWN_LEVEL
+    else:
+        competition_density = round(bus_data['ip_count'] / (reg_data['children_5_7'] / 1000), 1)   # плотность конкуренции
+        
+        match competition_density:
+            case x if x <= 8:
+                competition_level = 'low'   # низкий уровень конкуренции
+            case x if x <= 12:
+                competition_level = 'medium'   # умеренный уровень конкуренции
+            case x if x > 12:
+                competition_level = 'high'   # высокий уровень конкуренции
     
     if profit > 0:
         payback_period_month = math.ceil(initial_investment / profit)   # срок окупаемости в полных месяцах
@@ -304,7 +409,12 @@ def calculate_financials(region, reg_data, bus_data, ass_data):
         'payback_period_month': payback_period_month
     }    
 
-def generate_single_report(result):
+def okved_label(okved):
+    """Подпись набора кодов ОКВЭД для отчётов: "ОКВЭД 85.59", "ОКВЭД 85.59, 85.41" или "все ОКВЭД"."""
+    return f"ОКВЭД {', '.join(okved)}" if okved is not None else 'все ОКВЭД'
+
+def generate_single_report(result, okved=DEFAULT_OKVED, monthly_sales_volume=MONTHLY_SALES_VOLUME,
+                           initial_investment=INITIAL_INVESTMENT):
     """
     Генерирует текстовый отчёт для одного региона на основе финансовых показателей.
     
@@ -314,8 +424,9 @@ def generate_single_report(result):
     Отчёт включает динамическую рекомендацию по запуску бизнеса.
     
     Args:
-        result (dict): Словарь с финансовыми показателями региона, полученный из
-            функции calculate_financials(). Должен содержать следующие ключи:
+        result (dict | FinancialResult): Словарь с финансовыми показателями региона,
+            полученный из функции calculate_financials(), или строка FinancialTable.
+            Должен содержать следующие ключи:
             - 'region': Название региона (str)
             - 'children_5_7': Количество детей 5-7 лет (int)
             - 'ip_count': Количество действующих ИП (int)
@@ -328,6 +439,12 @@ def generate_single_report(result):
             - 'competition_density': Плотность конкуренции (float)
             - 'competition_level': Уровень конкуренции ('low', 'medium', 'high') (str)
             - 'payback_period_month': Срок окупаемости в месяцах (int или str)
+        okved (tuple, optional): Коды ОКВЭД, по которым посчитано число ИП
+            (None - все коды). По умолчанию DEFAULT_OKVED (85.59).
+        monthly_sales_volume (int, optional): Набор детей, с которым рассчитан
+            result (для подписи выручки). По умолчанию 60.
+        initial_investment (int, optional): Начальные инвестиции, с которыми
+            рассчитан срок окупаемости. По умолчанию 500000.
         
     Returns:
         str: Сформированный текстовый отчёт с анализом финансовой эффективности
@@ -362,12 +479,24 @@ def generate_single_report(result):
     # Получение текстовой метки для конкуренции
     comp_label = competition_labels.get(result['competition_level'], 'неизвестный')
     
+    # Строки о конкурентах: подпись с выбранными кодами ОКВЭД; без данных об ИП
+    # конкуренция не оценивается
+    ip_label = f'• Действующих ИП ({okved_label(okved)}):'
+    if result['competition_level'] == UNKNOWN_LEVEL:
+        ip_text = competition_text = 'нет данных'
+    else:
+        ip_text = result.get('ip_count', '—')
+        competition_text = f"{result['competition_density']} ИП на 1000 детей ({comp_label} уровень)"
+    
+    # Подписи с параметрами расчёта выровнены по тому же столбцу, что и остальные
+    revenue_label = f'• Месячная выручка ({monthly_sales_volume} детей):'
+    
     # Формирование отчёта
     report = f"""АНАЛИЗ ФИНАНСОВОЙ ЭФФЕКТИВНОСТИ
 Детский центр развития в г. {region}
 
 📊 ОСНОВНЫЕ ПОКАЗАТЕЛИ:
-• Месячная выручка (60 детей):     {format_currency(result['monthly_revenue'])} ₽
+{revenue_label:<34} {format_currency(result['monthly_revenue'])} ₽
 • Месячные расходы:                {format_currency(result['total_costs'])} ₽
 • Чистая прибыль:                   {format_currency(result['profit'])} ₽
 • Рентабельность:                   {result['profitability']}% ({profit_label} уровень)
@@ -375,11 +504,11 @@ def generate_single_report(result):
 
 📈 РЫНОК И КОНКУРЕНЦИЯ:
 • Детей 5–7 лет в городе:           {format_currency(int(result.get('children_5_7', 0)))} чел.
-• Действующих ИП (ОКВЭД 85.59):     {result.get('ip_count', '—')}
-• Конкуренция:                      {result['competition_density']} ИП на 1000 детей ({comp_label} уровень)
+{ip_label:<35} {ip_text}
+• Конкуренция:                      {competition_text}
 
 💰 ИНВЕСТИЦИИ:
-• Начальные вложения:               500 000 ₽
+• Начальные вложения:               {format_currency(initial_investment)} ₽
 • Срок окупаемости:                 {result['payback_period_month']} месяцев
 
 РЕКОМЕНДАЦИЯ:
@@ -412,8 +541,8 @@ def generate_comparison_report(financials_list):
     и аналитический вывод с рекомендацией по выбору региона для запуска бизнеса.
     
     Args:
-        financials_list (list): Список из двух словарей — результатов calculate_financials.
-            Каждый словарь должен содержать следующие ключи:
+        financials_list (list): Список из двух словарей — результатов calculate_financials
+            (или строк FinancialTable). Каждый словарь должен содержать следующие ключи:
             - 'region': Название региона (str)
             - 'profit': Чистая прибыль в месяц (int)
             - 'profitability': Рентабельность в процентах (float)
@@ -471,13 +600,18 @@ def generate_comparison_report(financials_list):
     profit_labels = profitability_labels
     comp_labels = competition_labels
     
+    def competition_cell(r):
+        if r['competition_level'] == UNKNOWN_LEVEL:
+            return 'нет данных'
+        return f"{r['competition_density']:.1f} ({comp_labels[r['competition_level']]})"
+    
     # Формирование таблицы сравнения показателей с использованием print_fancy_table
     headers = ["ПОКАЗАТЕЛЬ", region1, region2]
     rows = [
         ["Месячная прибыль", r1['profit'], r2['profit']],
         ["Рентабельность", f"{r1['profitability']:.1f}% ({profit_labels[r1['profitability_level']]})", f"{r2['profitability']:.1f}% ({profit_labels[r2['profitability_level']]})"],
         ["Точка безубыточности", f"{r1['break_even_children']} детей", f"{r2['break_even_children']} детей"],
-        ["Конкуренция", f"{r1['competition_density']:.1f} ({comp_labels[r1['competition_level']]})", f"{r2['competition_density']:.1f} ({comp_labels[r2['competition_level']]})"],
+        ["Конкуренция", competition_cell(r1), competition_cell(r2)],
         ["Срок окупаемости", f"{r1['payback_period_month']} мес.", f"{r2['payback_period_month']} мес."]
     ]
     
@@ -496,9 +630,14 @@ def generate_comparison_report(financials_list):
     be_children_diff = r2['break_even_children'] - r1['break_even_children']
     be_better = region1 if be_children_diff > 0 else (region2 if be_children_diff < 0 else 'равны')
     
-    # Конкуренция: сравниваем плотность конкуренции (меньшее значение лучше)
-    comp_diff = r2['competition_density'] - r1['competition_density']
-    comp_better = region1 if comp_diff > 0 else (region2 if comp_diff < 0 else 'равны')
+    # Конкуренция: сравниваем плотность конкуренции (меньшее значение лучше);
+    # без данных об ИП хотя бы по одному региону сравнение не проводится
+    no_competition_data = [r['region'] for r in (r1, r2) if r['competition_level'] == UNKNOWN_LEVEL]
+    if no_competition_data:
+        comp_better = None
+    else:
+        comp_diff = r2['competition_density'] - r1['competition_density']
+        comp_better = region1 if comp_diff > 0 else (region2 if comp_diff < 0 else 'равны')
     
     # Определение более выгодного региона по прибыли
     if profit_diff > 0:
@@ -538,7 +677,9 @@ def generate_comparison_report(financials_list):
             advantage_lines.append(f'{be_better} имеет более низкую точку безубыточности ({r1["break_even_children"]} vs {r2["break_even_children"]} детей)')
         
         # Добавляем информацию о конкуренции
-        if comp_better not in ['равны', better_region]:
+        if comp_better is None:
+            advantage_lines.append(f'Конкуренцию сравнить нельзя: нет данных об ИП ({", ".join(no_competition_data)})')
+        elif comp_better not in ['равны', better_region]:
             advantage_lines.append(f'{comp_better} имеет слабее конкуренцию ({r1["competition_density"]:.1f} vs {r2["competition_density"]:.1f} ИП/1000 детей)')
         elif comp_better == 'равны':
             advantage_lines.append('Уровень конкуренции сопоставим')
@@ -558,36 +699,27 @@ def generate_comparison_report(financials_list):
         # Только первый регион рентабелен
         recommendation = f'Только {region1} является рентабельным. Рекомендуется выбрать его.'
     else:
-        # Оба региона рентабельны, рекомендуем более выгодный с учетом всех показателей
-        # Подсчитываем "победы" по показателям
-        wins = {region1: 0, region2: 0}
-        if profit_diff > 0:
-            wins[region2] += 1
-        elif profit_diff < 0:
-            wins[region1] += 1
-            
-        if be_children_diff > 0:  # r1 имеет более высокую точку безубыточности
-            wins[region2] += 1
-        elif be_children_diff < 0:
-            wins[region1] += 1
-            
-        if comp_diff > 0:  # r1 имеет более высокую конкуренцию
-            wins[region2] += 1
-        elif comp_diff < 0:
-            wins[region1] += 1
-        
-        # Определяем победителя по большинству показателей
-        if wins[region1] > wins[region2]:
-            overall_better = region1
-        elif wins[region2] > wins[region1]:
-            overall_better = region2
+        # Оба региона рентабельны: предпочтение отдаётся региону, который
+        # доминирует другой - не хуже по всем ключевым показателям и лучше хотя бы
+        # по одному (см. skyline.py). Без данных об ИП конкуренция не сравнивается
+        criteria = None
+        if no_competition_data:
+            criteria = {metric: sign for metric, sign in skyline.PARETO_CRITERIA.items() if metric != 'competition_density'}
+        if skyline.dominates(r1, r2, criteria):
+            overall_better, other_region = region1, region2
+        elif skyline.dominates(r2, r1, criteria):
+            overall_better, other_region = region2, region1
         else:
-            overall_better = 'Оба региона сопоставимы по ключевым показателям'
+            overall_better = None
         
-        if overall_better == 'Оба региона сопоставимы по ключевым показателям':
+        if overall_better is not None:
+            recommendation = f'При прочих равных условиях предпочтение стоит отдать {overall_better}: он не уступает региону {other_region} ни по одному из ключевых показателей.'
+        elif skyline.criteria_key(criteria)(r1) == skyline.criteria_key(criteria)(r2):   # совпадают по всем показателям
             recommendation = 'Регионы сопоставимы по ключевым показателям. Выбор зависит от локальных факторов (личные связи, помещение и т.д.).'
         else:
-            recommendation = f'При прочих равных условиях предпочтение стоит отдать {overall_better}, который лидирует по {wins[overall_better]} из 3 ключевых показателей.'
+            recommendation = 'Ни один из регионов не превосходит другой по всем ключевым показателям. Выбор зависит от приоритетов (прибыль, точка безубыточности или конкуренция) и локальных факторов.'
+        if no_competition_data:
+            recommendation += ' Конкуренция не учитывалась: нет данных об ИП.'
     
     # Формирование финального отчёта
     report = f"""СРАВНИТЕЛЬНЫЙ АНАЛИЗ
@@ -602,7 +734,36 @@ def generate_comparison_report(financials_list):
 """
     return report
 
-def generate_overview_report(financials_list):
+OVERVIEW_TIERS = 5   # ярусов Парето в сводном отчёте
+TIER_NAMES_SHOWN = 5   # названий регионов в описании яруса
+
+def _region_list(names, total):
+    """Перечень регионов через запятую с указанием числа неназванных из total."""
+    text = ', '.join(names)
+    return text + (f' и ещё {total - len(names)}' if total > len(names) else '')
+
+def _overview_widths(headers, regions, tiers, comp_labels):
+    """Ширина столбцов таблицы сводного отчёта без форматирования всех ячеек.
+
+    Самое длинное представление числа - у наибольшего или наименьшего
+    значения, у остальных столбцов значений немного (уровни, сроки окупаемости),
+    поэтому хватает одного прохода по показателям без хранения строк.
+    """
+    profits = [max(r['profit'] for r in regions), min(r['profit'] for r in regions)]
+    shares = [max(r['profitability'] for r in regions), min(r['profitability'] for r in regions)]
+    levels = {r['competition_level'] for r in regions}
+    paybacks = {r['payback_period_month'] for r in regions}
+    cells = [
+        max(len(r['region']) for r in regions),
+        max(cell_width(p, currency=True) for p in profits),
+        max(len(f'{x:.1f}%') for x in shares),
+        max(len(comp_labels[level]) for level in levels),
+        max(len(f'{m} мес.') for m in paybacks),
+        max(cell_width(tiers[r['region']]) for r in regions),
+    ]
+    return [max(len(header), width) for header, width in zip(headers, cells)]
+
+def generate_overview_report(financials_list, top_n=None, page=1):
     """
     Генерирует сводный отчёт по всем регионам (3 и более) на основе финансовых показателей.
     
@@ -611,8 +772,8 @@ def generate_overview_report(financials_list):
     топ-рейтинги по различным критериям и общий вывод с рекомендацией.
     
     Args:
-        financials_list (list): Список словарей — результатов calculate_financials для каждого региона.
-            Каждый словарь должен содержать следующие ключи:
+        financials_list (list): Список словарей — результатов calculate_financials для каждого региона
+            (или строк FinancialTable). Каждый словарь должен содержать следующие ключи:
             - 'region': Название региона (str)
             - 'profit': Чистая прибыль в месяц (int)
             - 'profitability': Рентабельность в процентах (float)
@@ -621,13 +782,17 @@ def generate_overview_report(financials_list):
             - 'competition_density': Плотность конкуренции (float)
             - 'competition_level': Уровень конкуренции ('low', 'medium', 'high') (str)
             - 'payback_period_month': Срок окупаемости в месяцах (int или str)
+        top_n (int, optional): Число регионов на странице таблицы. По умолчанию
+            None - в таблице все регионы.
+        page (int, optional): Номер страницы таблицы (с 1) при заданном top_n.
         
     Returns:
         str: Сформированный текстовый отчёт со сводным анализом финансовой
             эффективности детских центров развития по всем заданным регионам.
             
     Raises:
-        ValueError: Если в списке financials_list содержится менее двух элементов.
+        ValueError: Если в списке financials_list содержится менее двух элементов
+            или страница вне допустимого диапазона.
         
     Example:
         >>> financials_list = [
@@ -667,47 +832,96 @@ def generate_overview_report(financials_list):
         СВОДНЫЙ АНАЛИЗ ПО 3 РЕГИОНАМ
         
     """
+    return ''.join(iter_overview_report(financials_list, top_n, page))
+
+def iter_overview_report(financials_list, top_n=None, page=1):
+    """Формирует сводный отчёт частями для потоковой записи в файл.
+    
+    Параметры и исключения - как у generate_overview_report(); проверки и
+    рейтинги выполняются сразу, а строки таблицы форматируются по мере
+    перебора, поэтому текст отчёта целиком в памяти не собирается.
+    
+    Returns:
+        iterator: Части текста отчёта по порядку (строки таблицы - с переводом строки).
+    """
     # Формирование сводного отчета по нескольким регионам.
     # Проверка, что в списке минимум два элемента
     if len(financials_list) < 2:
         raise ValueError('Для сводного отчёта нужно минимум 2 региона.')
     
-    # Сортируем по прибыли (от большей к меньшей) для красивой таблицы
-    sorted_regions = sorted(financials_list, key=lambda x: x['profit'], reverse=True)
+    # Рейтинги по всем показателям за один проход (см. ranking.py). При
+    # постраничном выводе нужны лучшие page * top_n регионов по прибыли, а не
+    # полная сортировка списка
+    if top_n is not None:
+        if top_n < 1:
+            raise ValueError('Число регионов на странице должно быть положительным.')
+        pages = math.ceil(len(financials_list) / top_n)
+        if not 1 <= page <= pages:
+            raise ValueError(f'Страница {page} вне диапазона 1–{pages}.')
+        index = RankingIndex(page * top_n, financials_list)
+        sorted_regions = index.top('profit')[(page - 1) * top_n:]
+        rank_offset = (page - 1) * top_n
+    else:
+        index = RankingIndex(1, financials_list)
+        # Сортируем по прибыли (от большей к меньшей) для красивой таблицы
+        sorted_regions = sorted(financials_list, key=lambda x: x['profit'], reverse=True)
+    
+    # Ярусы Парето по прибыли, точке безубыточности, конкуренции и окупаемости
+    # (см. skyline.py): ярус 1 - регионы, которые никто не превосходит по всем
+    # показателям сразу
+    layers = skyline.pareto_layers(financials_list)
+    tiers = {r['region']: layer + 1 for r, layer in zip(financials_list, layers)}
+    tier_counts = Counter(layers)
+    tier_results = {}   # регионы первых ярусов для описания
+    for r, layer in zip(financials_list, layers):
+        if layer < OVERVIEW_TIERS:
+            tier_results.setdefault(layer, []).append(r)
+    # Первые регионы яруса по прибыли (как в таблице)
+    tier_leaders = {layer: [r['region'] for r in heapq.nlargest(TIER_NAMES_SHOWN, members, key=lambda x: x['profit'])]
+                    for layer, members in tier_results.items()}
     
     # Получение текстовых меток для рентабельности и конкуренции
     profit_labels = profitability_labels
     comp_labels = competition_labels
     
-    # Формирование таблицы с использованием print_fancy_table
-    headers = ["РЕГИОН", "ПРИБЫЛЬ", "РЕНТАБ.", "КОНКУРЕНЦИЯ", "ОКУПАЕМОСТЬ"]
-    rows = []
+    # Строки таблицы формируются лениво, при выводе, а ширина столбцов известна
+    # заранее: таблица пишется построчно без хранения ячеек (режим widths
+    # create_table.iter_fancy_table)
+    headers = ["РЕГИОН", "ПРИБЫЛЬ", "РЕНТАБ.", "КОНКУРЕНЦИЯ", "ОКУПАЕМОСТЬ", "ЯРУС"]
+    rows = ([r['region'], r['profit'], f'{r['profitability']:.1f}%', f'{comp_labels[r['competition_level']]}',
+             f'{r['payback_period_month']} мес.', tiers[r['region']]] for r in sorted_regions)
+    widths = _overview_widths(headers, sorted_regions, tiers, comp_labels)
     
-    for r in sorted_regions:
-        rentab_str = f'{r['profitability']:.1f}%'
-        comp_str = f'{comp_labels[r['competition_level']]}'
-        payback_str = f'{r['payback_period_month']} мес.'
-        rows.append([r['region'], r['profit'], rentab_str, comp_str, payback_str])
-    
-    # Создаем строковое представление таблицы
-    # Форматируем таблицу с указанием, что второй столбец содержит денежные значения
-    table_output = format_fancy_table(headers, rows, currency_columns=[1])
+    # Второй столбец содержит денежные значения
+    head = f'СВОДНЫЙ АНАЛИЗ ПО {len(financials_list)} РЕГИОНАМ\n\n'
+    if top_n is None:
+        table_lines = iter_fancy_table(headers, rows, currency_columns=[1], widths=widths)
+    else:
+        # На странице добавляется столбец с местом региона в рейтинге по прибыли
+        head += f'Страница {page} из {pages} (по {top_n} регионов, по убыванию прибыли)\n'
+        rows = ([rank_offset + i + 1, *row] for i, row in enumerate(rows))
+        widths = [max(len("№"), cell_width(rank_offset + len(sorted_regions))), *widths]
+        table_lines = iter_fancy_table(["№", *headers], rows, currency_columns=[2], widths=widths)
     
     # --- Рейтинги ---
     # Лучшая прибыль
-    best_profit = max(financials_list, key=lambda x: x['profit'])
+    best_profit = index.best('profit')
     
     # Самая высокая рентабельность
-    best_profitability = max(financials_list, key=lambda x: x['profitability'])
+    best_profitability = index.best('profitability')
     
     # Наименьшая конкуренция
-    best_competition = min(financials_list, key=lambda x: x['competition_density'])
+    best_competition = index.best('competition_density')
+    if best_competition['competition_level'] != UNKNOWN_LEVEL:
+        competition_line = f"{best_competition['region']} ({best_competition['competition_density']} ИП/1000 детей)"
+    else:
+        # Регионы без данных об ИП стоят в рейтинге последними
+        competition_line = 'нет данных об ИП'
     
     # Быстрейшая окупаемость (только числовые значения)
-    profitable_regions = [r for r in financials_list if isinstance(r['payback_period_month'], int)]
-    if profitable_regions:
-        # Находим регион с минимальным сроком окупаемости среди рентабельных
-        best_payback = min(profitable_regions, key=lambda x: x['payback_period_month'])
+    best_payback = index.best('payback_period_month')
+    if best_payback is not None:
+        # Регион с минимальным сроком окупаемости среди рентабельных
         payback_line = f'🏆 Быстрейшая окупаемость: {best_payback['region']} ({best_payback['payback_period_month']} месяцев)'
     else:
         # Нет рентабельных регионов
@@ -715,85 +929,734 @@ def generate_overview_report(financials_list):
     
     # --- Общий вывод ---
     # Проверяем, есть ли хотя бы один рентабельный регион
-    profitable_count = len(profitable_regions)
+    profitable_count = index.profitable_count
     if profitable_count == 0:
         # Все регионы убыточны
         conclusion = 'Все регионы убыточны при текущих параметрах. Запуск не рекомендуется без пересмотра бизнес-модели.'
     else:
-        # Ищем регион, который лидирует по максимальному числу номинаций
-        leaders = {}
-        for r in financials_list:
-            leaders[r['region']] = 0
-        
-        # Подсчет побед в каждой номинации
-        leaders[best_profit['region']] += 1
-        leaders[best_profitability['region']] += 1
-        leaders[best_competition['region']] += 1
-        if profitable_regions:
-            leaders[best_payback['region']] += 1
-        
-        # Определение общего лидера
-        overall_leader = max(leaders, key=leaders.get)
-        if leaders[overall_leader] >= 2:
-            # Регион лидирует как минимум в двух номинациях
-            conclusion = f'{overall_leader} является наиболее привлекательным регионом для запуска\nмини-центра развития по совокупности финансовых и рыночных показателей.'
+        # Лидер - единственный регион первого яруса: тогда он превосходит
+        # каждый из остальных регионов по всем ключевым показателям
+        if tier_counts[0] == 1:
+            conclusion = f'{tier_leaders[0][0]} является наиболее привлекательным регионом для запуска\nмини-центра развития по совокупности финансовых и рыночных показателей.'
         else:
             # Нет явного лидера
-            conclusion = 'Лидер по совокупности показателей не выявлен. Рекомендуется детальный анализ каждого региона.'
+            conclusion = f'Лидер по совокупности показателей не выявлен. В первом ярусе - регионы, ни один из которых\nне уступает другому по всем показателям сразу: {_region_list(tier_leaders[0], tier_counts[0])}.\nРекомендуется детальный анализ этих регионов.'
         
         # Добавляем информацию о наименее привлекательном регионе
-        worst_region = min(financials_list, key=lambda x: x['profit'])
+        worst_region = index.worst('profit')
         if worst_region['competition_level'] == 'high' and worst_region['profitability_level'] == 'low':
             # Высокая конкуренция и низкая рентабельность
             conclusion += f'\n{worst_region['region']} — наименее привлекателен из-за высокой конкуренции и низкой рентабельности.'
     
-    # --- Формируем итоговый отчёт ---
-    report = f"""СВОДНЫЙ АНАЛИЗ ПО {len(financials_list)} РЕГИОНАМ
-
-{table_output}
-ТОП-РЕЙТИНГИ:
+    # --- Ярусы Парето ---
+    tier_lines = '\n'.join(f'• Ярус {layer + 1} — регионов: {tier_counts[layer]} '
+                           f'({_region_list(tier_leaders[layer], tier_counts[layer])})'
+                           for layer in sorted(tier_leaders))
+    if len(tier_counts) > OVERVIEW_TIERS:
+        tier_lines += f'\n• Всего ярусов: {len(tier_counts)}'
+    
+    # --- Формируем итоговый отчёт: заголовок, строки таблицы и выводы ---
+    tail = f"""ТОП-РЕЙТИНГИ:
 🏆 Лучшая прибыль:         {best_profit['region']} ({format_currency(best_profit['profit'])} ₽)
 🏆 Самая высокая рентабельность: {best_profitability['region']} ({best_profitability['profitability']:.1f}%)
-🏆 Наименьшая конкуренция: {best_competition['region']} ({best_competition['competition_density']} ИП/1000 детей)
+🏆 Наименьшая конкуренция: {competition_line}
 {payback_line}
 
+ЯРУСЫ ПАРЕТО (по прибыли, точке безубыточности, конкуренции и окупаемости):
+{tier_lines}
+
 ОБЩИЙ ВЫВОД:
 {conclusion}
 """
-    return report
+    return itertools.chain((head,), (line + '\n' for line in table_lines), (tail,))
 
 # === ОСНОВНАЯ ЛОГИКА ВЫПОЛНЕНИЯ ПРОГРАММЫ ===
-#  загружаем данные
-regions_dict = load_regions()   # о регионах
-businesses_dict = load_businesses()   # о бизнесах
-assumptions_dict = load_assumptions()   # о предположениях
-
-#  выбираем регионы для расчета
-selected_regions = sorted(select_regions(regions_dict))
-
-#  расчет финансовых показателей для каждого выбранного региона
-results = {}
-for region in selected_regions:
-    regions_data = regions_dict[region]
-    businesses_data = businesses_dict[region]
-    assumptions_data = assumptions_dict[region]
-    results[region] = calculate_financials(region, regions_data, businesses_data, assumptions_data)
-
-# Генерация отчета в зависимости от количества выбранных регионов
-if len(selected_regions) == 1:
-    # Для одного региона генерируем одиночный отчет
-    report = generate_single_report(results[selected_regions[0]])
-    filename = f'report_single_{selected_regions[0]}.txt'
-elif len(selected_regions) == 2:
-    # Для двух регионов генерируем сравнительный отчет
-    report = generate_comparison_report([results[r] for r in selected_regions])
-    filename = f'report_compare_{selected_regions[0]}_{selected_regions[1]}.txt'
-else:
-    # Для трех и более регионов генерируем сводный отчет
-    report = generate_overview_report(list(results.values()))
-    filename = 'report_overview_all.txt'
-
-# Сохранение отчета в файл и вывод сообщения об успешном сохранении
-with open(filename, 'w', encoding='utf-8') as f:
-    f.write(report)
-print(f'Отчёт сохранён: {filename}/')
+# Имена исходных файлов внутри директории с данными
+DATA_FILES = ('regions.csv', 'businesses.csv', 'assumptions.csv')
+
+def load_data(data_dir='.', use_cache=True, okved=DEFAULT_OKVED, regions=None, use_sqlite=False):
+    """Загружает данные о регионах, бизнесах и предположениях.
+    
+    Повторные запуски читают двоичный кэш (см. data_cache.py), если исходные
+    файлы не изменились. Предупреждения о пропущенных строках и неполных
+    регионах в assumptions.csv выводятся на экран.
+    
+    Число ИП в businesses.csv суммируется по кодам ОКВЭД из okved; строки
+    других кодов отбрасываются до разбора CSV (см. load_business_index()).
+    Регионам без строк с выбранными кодами назначается NO_IP_DATA: конкуренция
+    для них не оценивается (в отчётах - «нет данных»), а не считается нулевой.
+    
+    С use_sqlite таблицы читаются из локальной базы SQLite (см.
+    sqlite_store.py): CSV импортируются в неё один раз, а выборка регионов
+    читается по индексам.
+    
+    Args:
+        data_dir (str, optional): Директория с CSV-файлами. По умолчанию текущая.
+        use_cache (bool, optional): Использовать двоичный кэш. По умолчанию True.
+        okved (tuple, optional): Коды ОКВЭД для плотности конкуренции; None -
+            все коды. По умолчанию DEFAULT_OKVED (85.59).
+        regions (iterable, optional): Нужные регионы, если они известны до
+            загрузки: строки остальных регионов отсеиваются до разбора CSV
+            (при действительном кэше он читается целиком). По умолчанию None - все.
+        use_sqlite (bool, optional): Читать таблицы из базы SQLite в
+            .basepro/store вместо CSV и двоичного кэша. По умолчанию False.
+        
+    Регионы из regions.csv без полного набора параметров в assumptions.csv
+    (в том числе без единой строки) перечисляются в предупреждении и в
+    regions_dict не попадают.
+    
+    Returns:
+        tuple: (regions_dict, businesses_dict, assumptions_dict).
+        
+    Исключения:
+        FileNotFoundError: Если один из файлов не найден.
+    """
+    filenames = tuple(os.path.join(data_dir, name) for name in DATA_FILES)
+    load_businesses_okved = functools.partial(load_businesses_columns, okved=okved)
+    with profiling.stage('load'):
+        if use_sqlite:
+            tables = sqlite_store.load_tables(load_regions, filenames, okved=okved, regions=regions)
+        elif use_cache:
+            # Таблица бизнесов зависит от набора кодов - у каждого набора свой кэш
+            variant = 'okved=' + (','.join(sorted(okved)) if okved is not None else '*')
+            tables = load_tables(load_regions, load_businesses_okved, load_assumptions_columns, filenames,
+                                 variant=variant, regions=regions)
+        else:
+            tables = (load_regions(filenames[0], regions=regions), load_businesses_okved(filenames[1], regions=regions),
+                      load_assumptions_columns(filenames[2], regions=regions))
+    # Регионы без полного набора предположений не рассчитываются: о них
+    # сообщается, и они исключаются из таблицы регионов
+    for warning in describe_load_problems(tables[2], filenames[2], regions=tables[0]):
+        print(warning)
+    incomplete = incomplete_regions(tables[2], tables[0])
+    if incomplete:
+        regions_dict = tables[0].subset(region for region in tables[0] if region not in incomplete)
+        tables = (regions_dict, *tables[1:])
+    missing = [region for region in tables[0] if region not in tables[1]]
+    if missing:
+        print(f'{filenames[1]}: нет данных об ИП ({okved_label(okved)}) для регионов: {len(missing)} '
+              f'(конкуренция не оценивается): {", ".join(missing[:10])}')
+        for region in missing:
+            tables[1].set(region, (NO_IP_DATA,))
+    return tables
+
+def compute_financials(regions, regions_dict, businesses_dict, assumptions_dict):
+    """Рассчитывает финансовые показатели сразу для всех переданных регионов (столбцами).
+    
+    Args:
+        regions (list): Названия регионов.
+        regions_dict (dict): Данные о регионах.
+        businesses_dict (dict): Данные о бизнесах.
+        assumptions_dict (dict): Предположения по регионам.
+        
+    Returns:
+        FinancialTable: Таблица {регион: показатели} в порядке regions; строки
+            читаются так же, как словари calculate_financials().
+    """
+    with profiling.stage('calculate') as span:
+        input_columns = build_input_columns(regions, regions_dict, businesses_dict, assumptions_dict)
+        batch = calculate_financials_batch(regions, input_columns)
+        span.add(rows=len(regions))
+        return FinancialTable.from_batch(batch)
+
+def build_report(selected_regions, results, okved=DEFAULT_OKVED, stream=False, **single_options):
+    """Формирует отчёт для выбранных регионов в зависимости от их количества.
+    
+    Args:
+        selected_regions (list): Отсортированный список выбранных регионов.
+        results (dict): Результаты расчёта {регион: финансовые показатели}.
+        okved (tuple, optional): Коды ОКВЭД для подписи числа ИП в отчёте по
+            одному региону. По умолчанию DEFAULT_OKVED.
+        stream (bool, optional): Сводный отчёт вернуть частями для потоковой
+            записи через save_report() (см. iter_overview_report()). По умолчанию False.
+        **single_options: Параметры расчёта для отчёта по одному региону
+            (monthly_sales_volume, initial_investment, см. generate_single_report()).
+        
+    Returns:
+        tuple: (имя файла отчёта, текст отчёта или итератор его частей).
+    """
+    if len(selected_regions) == 1:
+        # Для одного региона генерируем одиночный отчет
+        report = generate_single_report(results[selected_regions[0]], okved, **single_options)
+        filename = f'report_single_{selected_regions[0]}.txt'
+    elif len(selected_regions) == 2:
+        # Для двух регионов генерируем сравнительный отчет
+        report = generate_comparison_report([results[r] for r in selected_regions])
+        filename = f'report_compare_{selected_regions[0]}_{selected_regions[1]}.txt'
+    else:
+        # Для трех и более регионов генерируем сводный отчет
+        overview = iter_overview_report if stream else generate_overview_report
+        report = overview([results[r] for r in selected_regions])
+        filename = 'report_overview_all.txt'
+    return filename, report
+
+def plan_reports(regions, single=True, compare=True, overview=True, overview_options=None, okved=DEFAULT_OKVED):
+    """Составляет список отчётов для пакетной генерации.
+    
+    Args:
+        regions (list): Названия регионов.
+        single (bool, optional): Отчёты по каждому региону (report_single_*).
+        compare (bool, optional): Сравнения всех пар регионов (report_compare_*_*).
+        overview (bool, optional): Сводный отчёт (report_overview_all.txt).
+        overview_options (dict, optional): Параметры generate_overview_report()
+            (top_n, page) для сводного отчёта.
+        okved (tuple, optional): Коды ОКВЭД, по которым посчитано число ИП: для
+            набора, отличного от DEFAULT_OKVED, передаются отчётам по регионам
+            в параметре 'okved'.
+        
+    Returns:
+        list: Задания вида (тип отчёта, список регионов, параметры), где тип -
+            'single', 'compare' или 'overview'. Порядок заданий детерминирован.
+    """
+    regions = sorted(regions)
+    jobs = []
+    single_options = {} if okved == DEFAULT_OKVED else {'okved': okved}
+    if single:
+        jobs.extend(('single', [region], dict(single_options)) for region in regions)
+    if compare:
+        jobs.extend(('compare', list(pair), {}) for pair in itertools.combinations(regions, 2))
+    if overview and len(regions) >= 2:
+        jobs.append(('overview', regions, dict(overview_options or {})))
+    return jobs
+
+def render_report(kind, regions, results, options=None, stream=False):
+    """Формирует один отчёт из задания plan_reports().
+    
+    Параметры отчёта по одному региону, кроме 'okved', - monthly_sales_volume
+    и initial_investment, с которыми рассчитаны results (см. generate_single_report()).
+    При stream=True сводный отчёт возвращается частями (см. iter_overview_report()).
+    
+    Returns:
+        tuple: (имя файла отчёта, текст отчёта или итератор его частей).
+    """
+    options = dict(options or {})
+    okved = options.pop('okved', DEFAULT_OKVED)
+    with profiling.stage('render') as span:
+        span.add(rows=len(regions))
+        if kind == 'overview':
+            overview = iter_overview_report if stream else generate_overview_report
+            return 'report_overview_all.txt', overview([results[r] for r in regions], **options)
+        return build_report(regions, results, okved, stream, **options)
+
+def iter_all_reports(results, single=True, compare=True, overview=True):
+    """Последовательно формирует все отчёты по уже рассчитанным показателям.
+    
+    Args:
+        results (dict): Результаты расчёта {регион: финансовые показатели}.
+        single (bool, optional): Отчёты по каждому региону (report_single_*).
+        compare (bool, optional): Сравнения всех пар регионов (report_compare_*_*).
+        overview (bool, optional): Сводный отчёт (report_overview_all.txt).
+        
+    Yields:
+        tuple: (имя файла отчёта, текст отчёта).
+    """
+    for kind, regions, options in plan_reports(results, single, compare, overview):
+        yield render_report(kind, regions, results, options)
+
+def save_report(filename, report, output_dir='.'):
+    """Сохраняет отчёт в файл и возвращает путь к нему.
+    
+    report - текст отчёта или итерируемый набор его частей (см.
+    iter_overview_report()): части записываются по мере формирования.
+    """
+    path = os.path.join(output_dir, filename)
+    chunks = (report,) if isinstance(report, str) else report
+    with profiling.stage('write') as span, open(path, 'w', encoding='utf-8') as f:
+        written = 0
+        for chunk in chunks:
+            f.write(chunk)
+            written += len(chunk.encode('utf-8'))
+        span.add(rows=1, bytes=written)
+    return path
+
+def parse_okved(text):
+    """Разбирает набор кодов ОКВЭД из аргумента "85.59,85.41" ("all" - все коды)."""
+    if text.strip().lower() == 'all':
+        return None
+    codes = tuple(dict.fromkeys(code.strip() for code in text.split(',') if code.strip()))
+    if not codes:
+        raise argparse.ArgumentTypeError('ожидается список кодов ОКВЭД через запятую или all')
+    return codes
+
+# Описание выборки регионов в справке команд
+PROFILE_TRACE = 'profile_trace.json'   # файл трассы --profile по умолчанию
+REGIONS_HELP = 'названия без учёта регистра и ё/е, шаблоны вида "Моск*" или @файл со списком'
+
+def build_parser():
+    """Создаёт парсер аргументов командной строки."""
+    parser = argparse.ArgumentParser(
+        description='Анализ финансовой эффективности детских центров развития.',
+        epilog='Без аргументов запускается интерактивный выбор регионов.')
+    parser.add_argument('--data-dir', default='.', help='директория с CSV-файлами (по умолчанию текущая)')
+    parser.add_argument('--no-cache', action='store_true', help='не использовать двоичный кэш данных')
+    parser.add_argument('--sqlite', action='store_true',
+                        help='читать данные из локальной базы SQLite с индексами по регионам '
+                             '(.basepro/store); CSV импортируются в неё при первом запуске и при изменении')
+    parser.add_argument('--okved', type=parse_okved, default=DEFAULT_OKVED, metavar='КОДЫ',
+                        help='коды ОКВЭД конкурентов через запятую, например 85.59,85.41, или all '
+                             '(по умолчанию 85.59)')
+    parser.add_argument('--profile', action='store_true',
+                        help='замерить этапы: сводная таблица на экран и JSON-трасса (см. --profile-output)')
+    parser.add_argument('--profile-output', default=PROFILE_TRACE, metavar='ФАЙЛ',
+                        help=f'файл JSON-трассы для --profile (по умолчанию {PROFILE_TRACE})')
+    commands = parser.add_subparsers(dest='command', metavar='КОМАНДА')
+
+    report = commands.add_parser('report', help='сформировать отчёты без интерактивного меню')
+    report.add_argument('--regions', nargs='+', metavar='РЕГИОН',
+                        help='регионы для анализа (по умолчанию все); ' + REGIONS_HELP)
+    report.add_argument('--single', action='store_true', help='отчёт по каждому региону')
+    report.add_argument('--compare', action='store_true', help='сравнение каждой пары регионов')
+    report.add_argument('--overview', action='store_true', help='сводный отчёт по всем регионам')
+    report.add_argument('--all', action='store_true', help='все отчёты: --single --compare --overview')
+    report.add_argument('--output-dir', default='.', help='директория для отчётов (по умолчанию текущая)')
+    report.add_argument('--workers', type=int, default=1,
+                        help='процессов для формирования отчётов (0 - по числу ядер, по умолчанию 1)')
+    report.add_argument('--io-workers', type=int, default=0,
+                        help='потоков для записи файлов (0 - запись в основном потоке)')
+    report.add_argument('--force', action='store_true',
+                        help='пересчитать все регионы и пересобрать все отчёты, игнорируя манифест сборки')
+    report.add_argument('--export', nargs='+', choices=list(results_export.EXPORT_FILES), metavar='ФОРМАТ',
+                        help='выгрузить показатели всех регионов: csv, jsonl и/или bin (results.*)')
+    report.add_argument('--top', type=int, metavar='N',
+                        help='в таблице сводного отчёта только N регионов на страницу (по убыванию прибыли)')
+    report.add_argument('--page', type=int, default=1, help='номер страницы сводной таблицы при --top (по умолчанию 1)')
+
+    sweep = commands.add_parser('sweep', help='перебор сценариев по сетке параметров')
+    sweep.add_argument('--regions', nargs='+', metavar='РЕГИОН', help='регионы (по умолчанию все); ' + REGIONS_HELP)
+    sweep.add_argument('--volumes', default=scenario_sweep.DEFAULT_VOLUMES,
+                       help='объёмы продаж: список "50,60" или диапазон "40:90:1" (по умолчанию 60)')
+    sweep.add_argument('--check-factors', default=scenario_sweep.DEFAULT_FACTORS,
+                       help='множители среднего чека, например "0.8:1.2:0.01" (по умолчанию 1)')
+    sweep.add_argument('--rent-factors', default=scenario_sweep.DEFAULT_FACTORS,
+                       help='множители аренды, например "0.8:1.2:0.05" (по умолчанию 1)')
+    sweep.add_argument('--investments', default=scenario_sweep.DEFAULT_INVESTMENTS,
+                       help='начальные инвестиции (по умолчанию 500000)')
+    sweep.add_argument('--per-region', action='store_true',
+                       help='записать подробную таблицу сценарий × регион (sweep_details.csv)')
+    sweep.add_argument('--output-dir', default='.', help='директория для результатов')
+
+    risk = commands.add_parser('risk', help='моделирование рисков методом Монте-Карло')
+    risk.add_argument('--regions', nargs='+', metavar='РЕГИОН', help='регионы (по умолчанию все); ' + REGIONS_HELP)
+    risk.add_argument('--trials', type=int, default=monte_carlo.DEFAULT_TRIALS,
+                      help='испытаний на регион (по умолчанию 1 000 000)')
+    risk.add_argument('--seed', type=int, default=0, help='зерно генератора случайных чисел')
+    risk.add_argument('--enrollment', metavar='РАСПРЕДЕЛЕНИЕ',
+                      help='множитель набора детей, например "normal:1:0.15" или "triangular:0.6:1:1.1"')
+    risk.add_argument('--avg-check', metavar='РАСПРЕДЕЛЕНИЕ', help='множитель среднего чека, например "normal:1:0.05"')
+    risk.add_argument('--rent', metavar='РАСПРЕДЕЛЕНИЕ', help='множитель аренды, например "uniform:0.9:1.3"')
+    risk.add_argument('--output-dir', default='.', help='директория для отчётов')
+
+    solve = commands.add_parser('solve', help='требуемые чек, набор детей и аренда для целевой рентабельности или окупаемости')
+    solve.add_argument('--regions', nargs='+', metavar='РЕГИОН', help='регионы (по умолчанию все); ' + REGIONS_HELP)
+    solve.add_argument('--level', choices=['regular', 'high'], help='целевой уровень рентабельности')
+    solve.add_argument('--profitability', type=float, help='целевая рентабельность не ниже, %%')
+    solve.add_argument('--payback', type=int, help='целевой срок окупаемости не дольше, месяцев')
+    solve.add_argument('--output-dir', default='.', help='директория для отчёта')
+
+    flows = commands.add_parser('cashflow', help='помесячный прогноз денежного потока: NPV, IRR, фактическая окупаемость')
+    flows.add_argument('--regions', nargs='+', metavar='РЕГИОН', help='регионы (по умолчанию все); ' + REGIONS_HELP)
+    flows.add_argument('--horizon', type=int, default=cashflow.DEFAULT_HORIZON,
+                       help='горизонт прогноза, месяцев (по умолчанию 60)')
+    flows.add_argument('--start-month', type=int, default=cashflow.DEFAULT_START_MONTH,
+                       help='календарный месяц открытия (по умолчанию 9)')
+    flows.add_argument('--ramp', default=cashflow.DEFAULT_RAMP,
+                       help='разгон набора: "linear:6:0.3", список долей "0.3,0.5,0.8" или "none"')
+    flows.add_argument('--season', default=cashflow.DEFAULT_SEASON,
+                       help='множители набора по месяцам года, например "6:0.7,7:0.5,8:0.6", или "none"')
+    flows.add_argument('--rent-indexation', type=float, default=cashflow.DEFAULT_RENT_INDEXATION,
+                       help='годовая индексация аренды (по умолчанию 0.05)')
+    flows.add_argument('--discount-rate', type=float, default=cashflow.DEFAULT_DISCOUNT_RATE,
+                       help='годовая ставка дисконтирования (по умолчанию 0.15)')
+    flows.add_argument('--output-dir', default='.', help='директория для результатов')
+
+    pick = commands.add_parser('portfolio', help='портфель центров с наибольшей прибылью при заданном бюджете')
+    pick.add_argument('--regions', nargs='+', metavar='РЕГИОН', help='регионы (по умолчанию все); ' + REGIONS_HELP)
+    pick.add_argument('--budget', type=int, required=True, help='бюджет на вложения, ₽')
+    pick.add_argument('--centers', type=int, default=portfolio.DEFAULT_CENTERS,
+                      help='не более стольких центров в регионе (по умолчанию 1)')
+    pick.add_argument('--cannibalization', type=float, default=portfolio.DEFAULT_CANNIBALIZATION,
+                      help='доля продаж, которую теряет каждый следующий центр региона (по умолчанию 0.25)')
+    pick.add_argument('--deposit-months', type=int, default=portfolio.DEFAULT_DEPOSIT_MONTHS,
+                      help='залог за аренду в месяцах, входит во вложения центра (по умолчанию 0)')
+    pick.add_argument('--max-payback', type=int, metavar='МЕСЯЦЕВ',
+                      help='не включать центры с окупаемостью дольше заданной')
+    pick.add_argument('--method', choices=portfolio.METHODS, default='auto',
+                      help='dp - точное решение, greedy - жадный выбор с верхней границей, '
+                           'auto - точное, если таблица решения не слишком велика (по умолчанию)')
+    pick.add_argument('--cost-step', type=int, default=portfolio.DEFAULT_COST_STEP,
+                      help='шаг вложений в точном решении, ₽: вложения округляются вверх (по умолчанию 1000)')
+    pick.add_argument('--output-dir', default='.', help='директория для отчёта')
+
+    diff = commands.add_parser('diff', help='изменения показателей и уровней по сравнению с прежним снимком данных')
+    diff.add_argument('--old-dir', required=True, help='директория с прежними CSV-файлами (новые - в --data-dir)')
+    diff.add_argument('--regions', nargs='+', metavar='РЕГИОН', help='регионы (по умолчанию все); ' + REGIONS_HELP)
+    diff.add_argument('--levels-only', action='store_true',
+                      help='только регионы со сменой уровня рентабельности или конкуренции')
+    diff.add_argument('--top', type=int, default=vintage_diff.DIFF_TOP,
+                      help='регионов с наибольшим изменением прибыли в отчёте (по умолчанию 20)')
+    diff.add_argument('--output-dir', default='.', help='директория для результатов')
+
+    fmt = commands.add_parser('formats', help='сравнение форматов центра в каждом регионе (см. formats.py)')
+    fmt.add_argument('--regions', nargs='+', metavar='РЕГИОН', help='регионы (по умолчанию все); ' + REGIONS_HELP)
+    fmt.add_argument('--formats-file', metavar='ФАЙЛ',
+                     help='параметры форматов region;format;param;value (по умолчанию formats.csv в --data-dir)')
+    fmt.add_argument('--formats', nargs='+', metavar='ФОРМАТ',
+                     help=f'сравнивать только эти форматы (базовый набор из assumptions.csv - "{formats.BASE_FORMAT}")')
+    fmt.add_argument('--output-dir', default='.', help='директория для результатов')
+
+    serve = commands.add_parser('serve', help='HTTP-сервис с загруженными в память данными (см. http_service.py)')
+    serve.add_argument('--host', default=http_service.DEFAULT_HOST, help='адрес (по умолчанию 127.0.0.1)')
+    serve.add_argument('--port', type=int, default=http_service.DEFAULT_PORT, help='порт (по умолчанию 8765)')
+    serve.add_argument('--cache-size', type=int, default=http_service.DEFAULT_CACHE_SIZE,
+                       help='число ответов в LRU-кэше (по умолчанию 1024, 0 - без кэша)')
+    serve.add_argument('--cache-mb', type=int, default=http_service.DEFAULT_CACHE_BYTES >> 20,
+                       help='суммарный размер ответов в LRU-кэше, МБ (по умолчанию 64)')
+    return parser
+
+def run_interactive(args):
+    """Интерактивный режим: выбор регионов через меню и сохранение одного отчёта.
+    
+    Меню строится по regions.csv, а остальные таблицы загружаются после выбора
+    и только для выбранных регионов (отчёт по одному региону не разбирает
+    национальные файлы целиком).
+    """
+    with profiling.stage('load'):
+        regions_dict = load_regions(os.path.join(args.data_dir, DATA_FILES[0]))
+    #  выбираем регионы для расчета
+    with profiling.stage('select') as span:
+        selected_regions = sorted(select_regions(regions_dict))
+        span.add(rows=len(selected_regions))
+    subset = selected_regions if len(selected_regions) < len(regions_dict) else None
+    tables = load_data(args.data_dir, use_cache=not args.no_cache, okved=args.okved, regions=subset,
+                       use_sqlite=args.sqlite)
+    #  регионы без полного набора предположений исключены при загрузке
+    selected_regions = [region for region in selected_regions if region in tables[0]]
+    if not selected_regions:
+        print('Нет регионов с полными данными для расчёта.')
+        return
+    #  расчет финансовых показателей сразу для всех выбранных регионов (столбцами)
+    results = compute_financials(selected_regions, *tables)
+    # Генерация отчета в зависимости от количества выбранных регионов. Таблица
+    # сводного отчёта форматируется при записи, строка за строкой
+    with profiling.stage('render') as span:
+        filename, report = build_report(selected_regions, results, args.okved, stream=True)
+        span.add(rows=len(selected_regions))
+    # Сохранение отчета в файл и вывод сообщения об успешном сохранении
+    save_report(filename, report)
+    print(f'Отчёт сохранён: {filename}/')
+
+def expand_region_specs(args, parser):
+    """Заменяет описания в --regions (названия без учёта регистра и ё/е, шаблоны,
+    @файл) точными названиями регионов из regions.csv.
+    
+    Выполняется до загрузки данных, чтобы таблицы загружались только для
+    выбранных регионов; читается только столбец названий regions.csv (или
+    индекс названий базы SQLite при --sqlite). В режиме diff описания
+    сопоставляются с регионами обоих снимков (--data-dir и --old-dir), чтобы
+    можно было выбрать и выбывшие регионы.
+    """
+    if not getattr(args, 'regions', None):
+        return
+    with profiling.stage('select') as span:
+        directories = [args.data_dir]
+        if getattr(args, 'old_dir', None):
+            directories.append(args.old_dir)
+        names = {}
+        for data_dir in directories:
+            if args.sqlite:
+                filenames = tuple(os.path.join(data_dir, name) for name in DATA_FILES)
+                names.update(dict.fromkeys(sqlite_store.load_region_names(load_regions, filenames)))
+            else:
+                names.update(dict.fromkeys(load_region_names(os.path.join(data_dir, DATA_FILES[0]))))
+        if set(args.regions).issubset(names):
+            # Все описания - точные названия: индекс не нужен
+            args.regions = sorted(set(args.regions))
+        else:
+            try:
+                args.regions = RegionIndex(names).resolve_many(args.regions)
+            except (ValueError, OSError) as error:
+                parser.error(str(error))
+        span.add(rows=len(args.regions))
+
+def resolve_regions(args, parser, regions_dict):
+    """Возвращает отсортированный список регионов из аргумента --regions (по умолчанию все).
+    
+    Описания в --regions к этому моменту заменены точными названиями
+    (см. expand_region_specs()).
+    """
+    with profiling.stage('select') as span:
+        if args.regions:
+            unknown = [r for r in args.regions if r not in regions_dict]
+            if unknown:
+                parser.error(f'нет данных по регионам: {", ".join(unknown)}')
+            selected = sorted(set(args.regions))
+        else:
+            selected = sorted(regions_dict)
+        span.add(rows=len(selected))
+        return selected
+
+def run_report(args, parser, tables):
+    """Пакетный режим: все запрошенные отчёты за один запуск с однократным расчётом.
+    
+    Пересчитываются только регионы с изменившимися входными данными и
+    перезаписываются только изменившиеся отчёты (см. build_manifest.py).
+    """
+    selected_regions = resolve_regions(args, parser, tables[0])
+
+    overview_options = {}
+    if args.top is not None:
+        if args.top < 1:
+            parser.error('--top должно быть положительным')
+        pages = math.ceil(len(selected_regions) / args.top)
+        if not 1 <= args.page <= pages:
+            parser.error(f'--page вне диапазона 1–{pages}')
+        overview_options = {'top_n': args.top, 'page': args.page}
+
+    if args.all or args.single or args.compare or args.overview:
+        jobs = plan_reports(selected_regions,
+                            single=args.all or args.single,
+                            compare=args.all or args.compare,
+                            overview=args.all or args.overview,
+                            overview_options=overview_options, okved=args.okved)
+    else:
+        # Без флагов - как в интерактивном режиме: тип отчёта зависит от числа регионов
+        kind = {1: 'single', 2: 'compare'}.get(len(selected_regions), 'overview')
+        jobs = plan_reports(selected_regions, single=kind == 'single', compare=kind == 'compare',
+                            overview=kind == 'overview', overview_options=overview_options, okved=args.okved)
+
+    # Рендеринг в пуле процессов и запись в пуле потоков (по умолчанию последовательно)
+    # Без --regions загружены все регионы: записи об удалённых из данных убираются из манифеста
+    results, stats = build_manifest.build_reports(selected_regions, tables, jobs, compute_financials, args.output_dir,
+                                         workers=args.workers, io_workers=args.io_workers, force=args.force,
+                                         all_regions=None if args.regions else tables[0])
+    print(f"Пересчитано регионов: {stats['recomputed']} из {stats['regions']}, "
+          f"сформировано отчётов: {stats['rendered']} из {stats['reports']}")
+    print(f"Сохранено отчётов: {stats['written']} (директория {args.output_dir})")
+    # Машиночитаемая выгрузка показателей в том же запуске
+    for path in results_export.export_results(results, args.export or [], args.output_dir):
+        print(f'Выгрузка сохранена: {path}')
+
+def run_sweep(args, parser, tables):
+    """Режим перебора сценариев по сетке параметров (см. scenario_sweep.py)."""
+    selected_regions = resolve_regions(args, parser, tables[0])
+    try:
+        volumes = scenario_sweep.parse_range(args.volumes, int)
+        check_factors = scenario_sweep.parse_range(args.check_factors)
+        rent_factors = scenario_sweep.parse_range(args.rent_factors)
+        investments = scenario_sweep.parse_range(args.investments, int)
+    except ValueError as error:
+        parser.error(str(error))
+
+    columns = build_input_columns(selected_regions, *tables)
+    summary = scenario_sweep.run_sweep(selected_regions, columns, volumes, check_factors, rent_factors,
+                                       investments, args.output_dir, per_region=args.per_region)
+    report = scenario_sweep.generate_sweep_report(summary, volumes, check_factors, rent_factors, investments)
+    path = save_report('report_sweep.txt', report, args.output_dir)
+    print(f'Отчёт сохранён: {path}')
+
+def run_risk(args, parser, tables):
+    """Режим моделирования рисков методом Монте-Карло (см. monte_carlo.py)."""
+    selected_regions = resolve_regions(args, parser, tables[0])
+    if args.trials < 1:
+        parser.error('число испытаний должно быть положительным')
+    try:
+        distributions = {name: monte_carlo.parse_distribution(text)
+                         for name, text in (('enrollment', args.enrollment), ('avg_check', args.avg_check),
+                                            ('rent', args.rent)) if text}
+    except ValueError as error:
+        parser.error(str(error))
+
+    results = compute_financials(selected_regions, *tables)
+    columns = build_input_columns(selected_regions, *tables)
+    risks = monte_carlo.simulate_regions(selected_regions, columns, trials=args.trials, seed=args.seed,
+                                         distributions=distributions)
+    os.makedirs(args.output_dir, exist_ok=True)
+    for region in selected_regions:
+        # Раздел рисков размещается сразу после обычного отчёта по региону
+        report = generate_single_report(results[region], args.okved) + '\n\n' + monte_carlo.generate_risk_report(risks[region]) + '\n'
+        path = save_report(f'report_risk_{region}.txt', report, args.output_dir)
+        print(f'Отчёт сохранён: {path}')
+
+def run_solve(args, parser, tables):
+    """Режим обратной задачи: требуемые чек, набор детей и аренда для цели (см. inverse_solver.py)."""
+    selected_regions = resolve_regions(args, parser, tables[0])
+    columns = build_input_columns(selected_regions, *tables)
+    try:
+        solution = inverse_solver.solve_targets(selected_regions, columns,
+                                                target_profitability=args.profitability,
+                                                target_level=args.level, target_payback=args.payback)
+    except ValueError as error:
+        parser.error(str(error))
+
+    # Описание целей для заголовка отчёта
+    targets = []
+    if args.profitability is not None:
+        targets.append(f'рентабельность не ниже {args.profitability}%')
+    if args.level is not None:
+        targets.append(f'{profitability_labels[args.level]} уровень рентабельности')
+    if args.payback is not None:
+        targets.append(f'окупаемость не дольше {args.payback} мес.')
+
+    report = inverse_solver.generate_targets_report(solution, ', '.join(targets))
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = save_report('report_targets.txt', report, args.output_dir)
+    print(report)
+    print(f'Отчёт сохранён: {path}')
+
+def run_cashflow(args, parser, tables):
+    """Режим помесячного прогноза денежного потока (см. cashflow.py)."""
+    selected_regions = resolve_regions(args, parser, tables[0])
+    try:
+        assumptions = cashflow.make_assumptions(args.horizon, args.start_month, args.ramp, args.season,
+                                                args.rent_indexation, args.discount_rate)
+    except ValueError as error:
+        parser.error(str(error))
+
+    columns = build_input_columns(selected_regions, *tables)
+    with profiling.stage('calculate') as span:
+        projection = cashflow.project_cashflows(selected_regions, columns, assumptions)
+        span.add(rows=len(selected_regions))
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = os.path.join(args.output_dir, 'cashflow_regions.csv')
+    cashflow.write_cashflow_csv(projection, path)
+    print(f'Показатели сохранены: {path}')
+    path = save_report('report_cashflow.txt', cashflow.generate_cashflow_report(projection, assumptions),
+                       args.output_dir)
+    print(f'Отчёт сохранён: {path}')
+
+def run_portfolio(args, parser, tables):
+    """Режим выбора портфеля центров при ограниченном бюджете (см. portfolio.py)."""
+    selected_regions = resolve_regions(args, parser, tables[0])
+    columns = build_input_columns(selected_regions, *tables)
+    with profiling.stage('calculate') as span:
+        try:
+            items = portfolio.build_items(selected_regions, columns, args.centers, args.cannibalization,
+                                          args.deposit_months, args.max_payback)
+            solution = portfolio.optimize_portfolio(items, args.budget, args.method, args.cost_step)
+        except ValueError as error:
+            parser.error(str(error))
+        span.add(rows=len(items['cost']))
+    report = portfolio.generate_portfolio_report(items, solution, args.budget, len(selected_regions))
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = save_report('report_portfolio.txt', report, args.output_dir)
+    print(report)
+    print(f'Отчёт сохранён: {path}')
+
+def run_diff(args, parser, tables):
+    """Режим сравнения двух снимков входных данных (см. vintage_diff.py).
+    
+    Новый снимок - данные из --data-dir (уже загружены), прежний загружается
+    из --old-dir с теми же кодами ОКВЭД и выборкой регионов. Выборка
+    сопоставлена с регионами обоих снимков (см. expand_region_specs()):
+    регион, которого нет в одном из них, попадает в отчёт как новый или выбывший.
+    """
+    if args.top < 1:
+        parser.error('число регионов в отчёте должно быть положительным')
+    old_tables = load_data(args.old_dir, use_cache=not args.no_cache, okved=args.okved,
+                           regions=args.regions, use_sqlite=args.sqlite)
+    if args.regions:
+        new_regions = [r for r in args.regions if r in tables[0]]
+        old_regions = [r for r in args.regions if r in old_tables[0]]
+    else:
+        new_regions, old_regions = sorted(tables[0]), sorted(old_tables[0])
+    with profiling.stage('calculate') as span:
+        old = calculate_financials_batch(old_regions, build_input_columns(old_regions, *old_tables))
+        new = calculate_financials_batch(new_regions, build_input_columns(new_regions, *tables))
+        span.add(rows=len(old_regions) + len(new_regions))
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = os.path.join(args.output_dir, 'diff_regions.csv')
+    with profiling.stage('write') as span:
+        summary = vintage_diff.write_diff(vintage_diff.iter_changes(old, new, args.levels_only), path, args.top)
+        span.add(rows=sum(summary['counts'].values()))
+    print(f'Изменения сохранены: {path}')
+    labels = {'profitability_level': profitability_labels, 'competition_level': competition_labels}
+    report = vintage_diff.generate_diff_report(summary, args.old_dir, args.data_dir, len(old_regions),
+                                               len(new_regions), labels)
+    path = save_report('report_diff.txt', report, args.output_dir)
+    print(report)
+    print(f'Отчёт сохранён: {path}')
+
+def run_formats(args, parser, tables):
+    """Режим сравнения форматов центра: все пары регионы × форматы одним пакетом на формат."""
+    selected_regions = resolve_regions(args, parser, tables[0])
+    filename = args.formats_file or os.path.join(args.data_dir, formats.FORMATS_FILE)
+    with profiling.stage('load'):
+        try:
+            table = formats.load_formats(filename, regions=args.regions)
+        except (OSError, ValueError) as error:
+            parser.error(str(error))
+    if table.skipped_rows:
+        print(f'{filename}: пропущено строк: {len(table.skipped_rows)}')
+        for line_no, reason in table.skipped_rows[:10]:
+            print(f'  строка {line_no}: {reason}' if line_no is not None else f'  {reason}')
+
+    with profiling.stage('calculate') as span:
+        columns = formats.format_columns(selected_regions, build_input_columns(selected_regions, *tables), table)
+        if args.formats:
+            unknown = [name for name in args.formats if name not in columns]
+            if unknown:
+                parser.error(f'неизвестные форматы: {", ".join(unknown)} (есть: {", ".join(columns)})')
+            columns = {name: columns[name] for name in dict.fromkeys(args.formats)}
+        batches = formats.evaluate_formats(selected_regions, columns)
+        best = formats.best_formats(batches)
+        span.add(rows=len(selected_regions) * len(batches))
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = os.path.join(args.output_dir, 'formats_regions.csv')
+    formats.write_formats_csv(batches, best, path)
+    print(f'Показатели сохранены: {path}')
+    path = save_report('report_formats.txt', formats.generate_formats_report(batches, best, table), args.output_dir)
+    print(f'Отчёт сохранён: {path}')
+
+def main(argv=None):
+    """Точка входа командной строки.
+    
+    Args:
+        argv (list, optional): Аргументы командной строки. По умолчанию sys.argv[1:].
+        
+    Returns:
+        int: Код завершения.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.profile:
+        profiling.enable()
+    if args.okved != DEFAULT_OKVED:
+        print(f"Конкуренция рассчитана по ОКВЭД: {', '.join(args.okved) if args.okved else 'все коды'}")
+    if args.command is None:
+        #  интерактивный режим загружает данные после выбора регионов
+        run_interactive(args)
+    else:
+        #  загружаем данные один раз; при заданном --regions - только для этих регионов
+        expand_region_specs(args, parser)
+        tables = load_data(args.data_dir, use_cache=not args.no_cache, okved=args.okved,
+                           regions=getattr(args, 'regions', None), use_sqlite=args.sqlite)
+        if args.command == 'report':
+            run_report(args, parser, tables)
+        elif args.command == 'sweep':
+            run_sweep(args, parser, tables)
+        elif args.command == 'risk':
+            run_risk(args, parser, tables)
+        elif args.command == 'solve':
+            run_solve(args, parser, tables)
+        elif args.command == 'cashflow':
+            run_cashflow(args, parser, tables)
+        elif args.command == 'portfolio':
+            run_portfolio(args, parser, tables)
+        elif args.command == 'diff':
+            run_diff(args, parser, tables)
+        elif args.command == 'formats':
+            run_formats(args, parser, tables)
+        elif args.command == 'serve':
+            http_service.serve(tables, args.host, args.port, args.cache_size, args.okved,
+                               cache_bytes=args.cache_mb << 20, render_report=render_report)
+
+    if args.profile:
+        print(profiling.format_summary())
+        profiling.write_trace(args.profile_output)
+        print(f'Трасса сохранена: {args.profile_output}')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,325 @@
+"""Моделирование рисков методом Монте-Карло для отдельных регионов.
+
+Модель calculate_financials() детерминирована, а на практике набор детей,
+средний чек и аренда колеблются. Модуль разыгрывает эти величины как
+множители к базовым значениям региона по заданным распределениям и для каждого
+испытания вычисляет месячную прибыль и срок окупаемости.
+
+Испытания обрабатываются пакетами (по умолчанию 100 000) столбцами, а
+статистика накапливается потоково: гистограмма прибыли с фиксированной шириной
+корзины и гистограмма сроков окупаемости по месяцам. Поэтому память не
+зависит от числа испытаний. Генератор случайных чисел для каждого региона
+инициализируется от общего зерна и названия региона, так что результат
+воспроизводим и не зависит от порядка регионов.
+
+Розыгрыш и свёртка пакета не содержат цикла Python по испытаниям. Множитель
+берётся из таблицы QUANTILE_LEVELS квантилей распределения (обратная функция
+распределения в серединах равных по вероятности интервалов), а номер квантиля -
+из случайных битов, полученных одним вызовом getrandbits() и разобранных в
+array('H'). Дальше прибыль, корзины гистограммы и сроки окупаемости считаются
+через map() с функциями из operator и math, а подсчёт - через Counter.
+Погрешность квантования множителя - тысячные доли процента в центре
+распределения, то есть доли рубля прибыли при ширине корзины 100 ₽.
+"""
+
+import functools
+import hashlib
+import math
+import random
+import sys
+from array import array
+from collections import Counter, namedtuple
+from itertools import repeat
+from operator import mul, sub, truediv
+from statistics import NormalDist
+
+from batch_financials import INITIAL_INVESTMENT, MONTHLY_SALES_VOLUME
+
+DEFAULT_TRIALS = 1_000_000   # испытаний на регион
+DEFAULT_CHUNK_SIZE = 100_000   # испытаний в одном пакете
+PROFIT_BIN_WIDTH = 100   # ширина корзины гистограммы прибыли, ₽
+PERCENTILES = (5, 25, 50, 75, 95)
+QUANTILE_BITS = 16   # случайных битов на номер квантиля
+QUANTILE_LEVELS = 1 << QUANTILE_BITS   # квантилей в таблице распределения
+
+# Распределение множителя: вид и параметры
+Distribution = namedtuple('Distribution', 'kind params')
+
+# Число параметров для каждого вида распределения
+DISTRIBUTION_KINDS = {
+    'fixed': 1,   # fixed:значение
+    'normal': 2,   # normal:среднее:стандартное отклонение
+    'uniform': 2,   # uniform:минимум:максимум
+    'triangular': 3,   # triangular:минимум:мода:максимум
+    'lognormal': 2,   # lognormal:mu:sigma (параметры логарифма)
+}
+
+# Распределения множителей по умолчанию
+DEFAULT_DISTRIBUTIONS = {
+    'enrollment': Distribution('normal', (1.0, 0.15)),   # набор детей
+    'avg_check': Distribution('normal', (1.0, 0.05)),   # средний чек
+    'rent': Distribution('normal', (1.0, 0.10)),   # аренда за кв. м
+}
+
+
+def parse_distribution(text):
+    """Разбирает описание распределения вида "normal:1:0.15".
+
+    Args:
+        text (str): Вид распределения и параметры через двоеточие.
+
+    Returns:
+        Distribution: Разобранное распределение.
+
+    Исключения:
+        ValueError: Если вид неизвестен или число параметров не совпадает.
+    """
+    kind, *params = text.split(':')
+    if kind not in DISTRIBUTION_KINDS:
+        raise ValueError(f'неизвестное распределение {kind!r} (допустимо: {", ".join(DISTRIBUTION_KINDS)})')
+    if len(params) != DISTRIBUTION_KINDS[kind]:
+        raise ValueError(f'распределение {kind} ожидает {DISTRIBUTION_KINDS[kind]} параметр(а), получено {text!r}')
+    try:
+        return Distribution(kind, tuple(float(p) for p in params))
+    except ValueError:
+        raise ValueError(f'некорректные параметры распределения {text!r}') from None
+
+
+def _quantile(distribution, u):
+    """Значение распределения с функцией распределения u (0 < u < 1)."""
+    kind, params = distribution
+    if kind == 'fixed':
+        return params[0]
+    if kind == 'normal':
+        mu, sigma = params
+        return NormalDist(mu, abs(sigma)).inv_cdf(u) if sigma else mu
+    if kind == 'uniform':
+        low, high = params
+        return low + (high - low) * u
+    if kind == 'triangular':
+        low, mode, high = params
+        if high == low:
+            return low
+        # Обратная функция распределения треугольного закона (как random.triangular)
+        c = (mode - low) / (high - low)
+        if u < c:
+            return low + math.sqrt(u * (high - low) * (mode - low))
+        return high - math.sqrt((1 - u) * (high - low) * (high - mode))
+    mu, sigma = params   # lognormal
+    return math.exp(NormalDist(mu, abs(sigma)).inv_cdf(u) if sigma else mu)
+
+
+@functools.lru_cache(maxsize=None)
+def quantile_table(distribution):
+    """Неотрицательные квантили распределения в серединах QUANTILE_LEVELS интервалов.
+
+    Таблица строится один раз на распределение и используется всеми регионами.
+    """
+    return tuple(max(_quantile(distribution, (i + 0.5) / QUANTILE_LEVELS), 0.0)
+                 for i in range(QUANTILE_LEVELS))
+
+
+def random_indices(rnd, count):
+    """count равновероятных номеров квантилей одним вызовом генератора."""
+    indices = array('H')
+    indices.frombytes(rnd.getrandbits(QUANTILE_BITS * count).to_bytes(2 * count, 'little'))
+    if sys.byteorder == 'big':
+        indices.byteswap()   # результат не зависит от порядка байтов платформы
+    return indices
+
+
+def draw(distribution, rnd, count):
+    """Разыгрывает count неотрицательных значений множителя (по таблице квантилей)."""
+    return list(map(quantile_table(distribution).__getitem__, random_indices(rnd, count)))
+
+
+def region_rng(seed, region):
+    """Генератор случайных чисел региона: зависит только от зерна и названия региона."""
+    digest = hashlib.sha256(f'{seed}:{region}'.encode('utf-8')).digest()
+    return random.Random(int.from_bytes(digest[:8], 'little'))
+
+
+class RiskAccumulator:
+    """Потоковое накопление статистики по испытаниям одного региона.
+
+    Attributes:
+        trials (int): Число учтённых испытаний.
+        losses (int): Число испытаний с прибылью <= 0.
+        profit_sum (float): Сумма прибыли (для среднего).
+        profit_hist (Counter): Гистограмма прибыли {номер корзины: количество};
+            корзина k содержит значения, ближайшие к k * bin_width.
+        payback_hist (Counter): Гистограмма сроков окупаемости {месяцев: количество}.
+    """
+
+    __slots__ = ('investment', 'bin_width', 'trials', 'losses', 'profit_sum',
+                 'profit_hist', 'payback_hist')
+
+    def __init__(self, investment=INITIAL_INVESTMENT, bin_width=PROFIT_BIN_WIDTH):
+        self.investment = investment
+        self.bin_width = bin_width
+        self.trials = 0
+        self.losses = 0
+        self.profit_sum = 0.0
+        self.profit_hist = Counter()
+        self.payback_hist = Counter()
+
+    def add(self, profits):
+        """Учитывает пакет значений прибыли (без цикла Python по значениям)."""
+        positive = list(filter((0.0).__lt__, profits))
+        self.trials += len(profits)
+        self.losses += len(profits) - len(positive)
+        self.profit_sum += math.fsum(profits)
+        self.profit_hist.update(map(round, map(truediv, profits, repeat(self.bin_width))))
+        self.payback_hist.update(map(math.ceil, map(truediv, repeat(self.investment), positive)))
+
+    def profit_percentile(self, q):
+        """Перцентиль прибыли по гистограмме (центр корзины, точность ± половина корзины)."""
+        target = q / 100 * self.trials
+        cumulative = 0
+        for key in sorted(self.profit_hist):
+            cumulative += self.profit_hist[key]
+            if cumulative >= target:
+                return key * self.bin_width
+        return None
+
+    def payback_percentile(self, q):
+        """Перцентиль срока окупаемости в месяцах (None - окупаемость не достигается)."""
+        target = q / 100 * self.trials
+        cumulative = 0
+        for months in sorted(self.payback_hist):
+            cumulative += self.payback_hist[months]
+            if cumulative >= target:
+                return months
+        return None
+
+    def payback_share(self, low, high=None):
+        """Доля испытаний со сроком окупаемости от low до high месяцев включительно."""
+        count = sum(n for m, n in self.payback_hist.items() if m >= low and (high is None or m <= high))
+        return count / self.trials
+
+    def summary(self):
+        """Сводка статистики в виде словаря."""
+        return {
+            'trials': self.trials,
+            'loss_probability': self.losses / self.trials,
+            'mean_profit': round(self.profit_sum / self.trials),
+            'profit_percentiles': {q: self.profit_percentile(q) for q in PERCENTILES},
+            'payback_percentiles': {q: self.payback_percentile(q) for q in (25, 50, 75, 90)},
+            'payback_buckets': {
+                'до 6 мес.': self.payback_share(1, 6),
+                '7–12 мес.': self.payback_share(7, 12),
+                '13–24 мес.': self.payback_share(13, 24),
+                '25–36 мес.': self.payback_share(25, 36),
+                'более 36 мес.': self.payback_share(37),
+                'не окупается': self.losses / self.trials,
+            },
+        }
+
+
+def simulate_region(region, inputs, trials=DEFAULT_TRIALS, seed=0, distributions=None,
+                    chunk_size=DEFAULT_CHUNK_SIZE,
+                    monthly_sales_volume=MONTHLY_SALES_VOLUME,
+                    initial_investment=INITIAL_INVESTMENT):
+    """Моделирует месячную прибыль и срок окупаемости одного региона.
+
+    В каждом испытании набор детей (monthly_sales_volume, округляется до
+    целого), средний чек и аренда за кв. м умножаются на случайные множители;
+    остальные расходы берутся из предположений региона.
+
+    Args:
+        region (str): Название региона (используется для инициализации генератора).
+        inputs (dict): Входные значения региона с ключами из batch_financials.INPUT_COLUMNS.
+        trials (int, optional): Число испытаний. По умолчанию 1 000 000.
+        seed (int, optional): Зерно генератора. По умолчанию 0.
+        distributions (dict, optional): Распределения множителей 'enrollment',
+            'avg_check' и 'rent'. Незаданные берутся из DEFAULT_DISTRIBUTIONS.
+        chunk_size (int, optional): Испытаний в одном пакете.
+        monthly_sales_volume (int, optional): Базовый набор детей. По умолчанию 60.
+        initial_investment (int, optional): Начальные инвестиции. По умолчанию 500000.
+
+    Returns:
+        dict: Сводка RiskAccumulator.summary() с добавленным ключом 'region'.
+    """
+    dists = dict(DEFAULT_DISTRIBUTIONS, **(distributions or {}))
+    rnd = region_rng(seed, region)
+    accumulator = RiskAccumulator(initial_investment)
+
+    avg_check = inputs['avg_check']
+    rent = inputs['rent']
+    area = inputs['area']
+    fixed = inputs['teachers'] * inputs['salary'] + inputs['marketing'] + inputs['other_costs']
+
+    # Слагаемые прибыли для каждого квантиля множителя: в пакете остаются
+    # только выборка по номерам, умножение и вычитание
+    volumes = [round(monthly_sales_volume * f) for f in quantile_table(dists['enrollment'])]
+    revenues = [avg_check * c for c in quantile_table(dists['avg_check'])]
+    costs = [rent * r * area + fixed for r in quantile_table(dists['rent'])]
+
+    remaining = trials
+    while remaining > 0:
+        n = min(chunk_size, remaining)
+        volume = map(volumes.__getitem__, random_indices(rnd, n))
+        revenue = map(mul, volume, map(revenues.__getitem__, random_indices(rnd, n)))
+        accumulator.add(list(map(sub, revenue, map(costs.__getitem__, random_indices(rnd, n)))))
+        remaining -= n
+
+    summary = accumulator.summary()
+    summary['region'] = region
+    return summary
+
+
+def simulate_regions(regions, columns, **options):
+    """Моделирует риски для нескольких регионов.
+
+    Args:
+        regions (list): Названия регионов.
+        columns (dict): Входные столбцы (см. batch_financials.build_input_columns()).
+        **options: Параметры simulate_region().
+
+    Returns:
+        dict: Словарь {регион: сводка simulate_region()}.
+    """
+    names = list(columns)
+    return {region: simulate_region(region, {k: columns[k][i] for k in names}, **options)
+            for i, region in enumerate(regions)}
+
+
+def _money(amount):
+    """Денежная сумма с пробелами между разрядами (как format_currency в main_pro)."""
+    return f'{amount:,}'.replace(',', ' ')
+
+
+def _format_months(value):
+    """Срок окупаемости для отчёта."""
+    return 'не окупается' if value is None else f'{value} мес.'
+
+
+def generate_risk_report(risk):
+    """Генерирует раздел отчёта с результатами моделирования рисков.
+
+    Раздел рассчитан на размещение после текста generate_single_report().
+
+    Args:
+        risk (dict): Результат simulate_region().
+
+    Returns:
+        str: Текст раздела.
+    """
+    profits = risk['profit_percentiles']
+    paybacks = risk['payback_percentiles']
+    lines = [
+        '⚠️ РИСКИ (МОДЕЛИРОВАНИЕ МОНТЕ-КАРЛО):',
+        f"• Испытаний:                        {_money(risk['trials'])}",
+        f"• Вероятность убытка:               {risk['loss_probability'] * 100:.1f}%",
+        f"• Средняя прибыль:                  {_money(risk['mean_profit'])} ₽",
+    ]
+    for q in PERCENTILES:
+        label = f'• Прибыль ({q}-й перцентиль):'
+        lines.append(f'{label:<35}{_money(profits[q])} ₽')
+    lines.append(f"• Срок окупаемости (медиана):       {_format_months(paybacks[50])}")
+    lines.append(f"• Срок окупаемости (90% испытаний): {_format_months(paybacks[90])}")
+    lines.append('')
+    lines.append('Распределение срока окупаемости:')
+    for bucket, share in risk['payback_buckets'].items():
+        lines.append(f'  {bucket:<15}{share * 100:5.1f}%')
+    return '\n'.join(lines)
@@ -0,0 +1,259 @@
+"""Портфель регионов: какие центры открыть при ограниченном капитале.
+
+Сводный отчёт выбирает одного лидера, но на практике решается, какие центры
+открыть на общий бюджет. Каждый центр - предмет задачи о рюкзаке с
+«весом» (вложения) и «ценностью» (месячная прибыль):
+
+    вложения  = начальные инвестиции + залог за аренду (deposit_months месяцев
+                аренды помещения региона);
+    прибыль   = как в calculate_financials(); k-й центр в одном регионе
+                теряет долю cannibalization объёма продаж (k-1)-го центра.
+
+Убыточные центры и центры с окупаемостью дольше max_payback в портфель не
+включаются. Вложения центров одного региона одинаковы, а прибыль убывает с
+номером центра, поэтому оптимальный портфель сам берёт центры региона по
+порядку и ограничение «k-й только после (k-1)-го» не нужно.
+
+    точное решение  - динамическое программирование по бюджету в единицах
+                      НОД вложений, округлённых вверх до cost_step (при
+                      одинаковых вложениях - в числе центров): O(n · B)
+                      операций над строками таблицы целиком (map по
+                      спискам), если n · B не больше DP_CELL_LIMIT;
+    приближённое    - жадный выбор по убыванию прибыли на рубль вложений с
+                      верхней границей линейной релаксации (граница Данцига):
+                      O(n log n), разрыв до границы выводится в отчёте.
+"""
+
+import math
+from functools import reduce
+from itertools import repeat
+from operator import add, gt
+
+from batch_financials import INITIAL_INVESTMENT, MONTHLY_SALES_VOLUME, calculate_financials_batch
+from create_table import format_fancy_table
+
+DEFAULT_CENTERS = 1   # центров в регионе
+DEFAULT_CANNIBALIZATION = 0.25   # доля продаж, которую каждый следующий центр региона теряет
+DEFAULT_DEPOSIT_MONTHS = 0   # месяцев аренды в залоге (входит во вложения центра)
+DEFAULT_COST_STEP = 1000   # шаг вложений в точном решении, ₽ (вложения округляются вверх)
+DP_CELL_LIMIT = 20_000_000   # максимальный размер таблицы динамического программирования (n · B)
+METHODS = ('auto', 'dp', 'greedy')
+
+
+def build_items(regions, columns, centers=DEFAULT_CENTERS, cannibalization=DEFAULT_CANNIBALIZATION,
+                deposit_months=DEFAULT_DEPOSIT_MONTHS, max_payback=None,
+                monthly_sales_volume=MONTHLY_SALES_VOLUME, initial_investment=INITIAL_INVESTMENT):
+    """Строит предметы задачи: центры регионов с вложениями и месячной прибылью.
+
+    Args:
+        regions (list): Названия регионов.
+        columns (dict): Входные столбцы (см. batch_financials.build_input_columns()).
+        centers (int, optional): Не более centers центров в регионе. По умолчанию 1.
+        cannibalization (float, optional): Доля объёма продаж, которую теряет
+            каждый следующий центр региона. По умолчанию 0.25.
+        deposit_months (int, optional): Залог за аренду в месяцах. По умолчанию 0.
+        max_payback (int, optional): Не включать центры с окупаемостью дольше,
+            месяцев. По умолчанию без ограничения.
+        monthly_sales_volume (int, optional): Объём продаж первого центра. По умолчанию 60.
+        initial_investment (int, optional): Начальные инвестиции. По умолчанию 500000.
+
+    Returns:
+        dict: Столбцы предметов 'region', 'center' (номер центра с 1), 'cost',
+            'profit', 'payback_period_month'.
+
+    Исключения:
+        ValueError: При некорректных параметрах.
+    """
+    if centers < 1:
+        raise ValueError('число центров в регионе должно быть не меньше 1')
+    if not 0 <= cannibalization < 1:
+        raise ValueError('доля потерь продаж должна быть в диапазоне [0, 1)')
+    if deposit_months < 0:
+        raise ValueError('число месяцев залога не может быть отрицательным')
+    batch = calculate_financials_batch(regions, columns, monthly_sales_volume, initial_investment)
+    costs = [initial_investment + deposit_months * rent * area for rent, area in zip(columns['rent'], columns['area'])]
+    items = {'region': [], 'center': [], 'cost': [], 'profit': [], 'payback_period_month': []}
+    for center in range(1, centers + 1):
+        volume = round(monthly_sales_volume * (1 - cannibalization) ** (center - 1))
+        for region, cost, check, total_costs in zip(regions, costs, columns['avg_check'], batch['total_costs']):
+            profit = check * volume - total_costs
+            if profit <= 0:
+                continue
+            payback = math.ceil(cost / profit)
+            if max_payback is not None and payback > max_payback:
+                continue
+            items['region'].append(region)
+            items['center'].append(center)
+            items['cost'].append(cost)
+            items['profit'].append(profit)
+            items['payback_period_month'].append(payback)
+    return items
+
+
+def _knapsack_dp(weights, profits, capacity):
+    """Точное решение задачи о рюкзаке 0/1 динамическим программированием.
+
+    best[c] - наибольшая прибыль при суммарном весе не больше c; на каждый
+    предмет таблица обновляется целиком (map по спискам), решения «брать»
+    сохраняются по предметам в bytes для восстановления выбора.
+
+    Returns:
+        list: Номера выбранных предметов.
+    """
+    best = [0] * (capacity + 1)
+    decisions = []
+    for w, p in zip(weights, profits):
+        if w > capacity:
+            decisions.append(b'')
+            continue
+        taken = list(map(add, best[:capacity + 1 - w], repeat(p)))
+        take = bytes(map(gt, taken, best[w:]))
+        best[w:] = map(max, taken, best[w:])
+        decisions.append(take)
+    chosen = []
+    c = capacity
+    for i in range(len(weights) - 1, -1, -1):
+        w = weights[i]
+        if c >= w and decisions[i] and decisions[i][c - w]:
+            chosen.append(i)
+            c -= w
+    chosen.reverse()
+    return chosen
+
+
+def _greedy(costs, profits, budget):
+    """Жадный выбор по убыванию прибыли на рубль вложений и граница линейной релаксации.
+
+    Граница Данцига: префикс предметов по убыванию отношения, поместившийся в
+    бюджет, плюс дробная часть первого не поместившегося. После него
+    добавляются все поместившиеся предметы; если один предмет с наибольшей
+    прибылью лучше, выбирается он (гарантия не хуже половины оптимума).
+
+    Returns:
+        tuple: (номера выбранных предметов, верхняя граница прибыли).
+    """
+    order = sorted(range(len(costs)), key=lambda i: (-profits[i] / costs[i], costs[i]))
+    chosen = []
+    remaining = budget
+    bound = None
+    for i in order:
+        if costs[i] <= remaining:
+            chosen.append(i)
+            remaining -= costs[i]
+        elif bound is None:
+            bound = sum(profits[j] for j in chosen) + profits[i] * remaining / costs[i]
+    total = sum(profits[i] for i in chosen)
+    if bound is None:
+        bound = total   # поместились все предметы
+    fitting = [i for i in order if costs[i] <= budget]
+    if fitting:
+        single = max(fitting, key=profits.__getitem__)
+        if profits[single] > total:
+            chosen = [single]
+    return sorted(chosen), bound
+
+
+def optimize_portfolio(items, budget, method='auto', cost_step=DEFAULT_COST_STEP):
+    """Выбирает центры с наибольшей суммарной месячной прибылью в пределах бюджета.
+
+    Args:
+        items (dict): Результат build_items().
+        budget (int): Бюджет на вложения, ₽.
+        method (str, optional): 'dp' - точное решение, 'greedy' - жадный выбор
+            с верхней границей, 'auto' - точное решение, если таблица не больше
+            DP_CELL_LIMIT. По умолчанию 'auto'.
+        cost_step (int, optional): Шаг вложений в точном решении, ₽: вложения
+            округляются вверх до шага, поэтому портфель всегда укладывается в
+            бюджет, а оптимален с точностью до шага. По умолчанию 1000.
+
+    Returns:
+        dict: 'chosen' (номера предметов), 'method' ('dp' или 'greedy'),
+            'cost', 'profit', 'upper_bound' (верхняя граница прибыли; для 'dp'
+            совпадает с прибылью), 'rounded_to' (шаг, до которого вложения
+            округлялись в точном решении, или None).
+
+    Исключения:
+        ValueError: Если бюджет отрицательный, метод или шаг некорректны или
+            таблица для метода 'dp' слишком велика.
+    """
+    if budget < 0:
+        raise ValueError('бюджет не может быть отрицательным')
+    if method not in METHODS:
+        raise ValueError(f'метод должен быть одним из: {", ".join(METHODS)}')
+    if cost_step < 1:
+        raise ValueError('шаг вложений должен быть не меньше 1 ₽')
+    costs, profits = items['cost'], items['profit']
+    # Веса - вложения в шагах cost_step, делённые на их НОД: при одинаковых
+    # вложениях таблица имеет размер n · (бюджет // вложения)
+    weights = [-(-c // cost_step) for c in costs]
+    rounded_to = cost_step if any(c % cost_step for c in costs) else None
+    unit = reduce(math.gcd, weights, 0) or 1
+    weights = [w // unit for w in weights]
+    capacity = budget // cost_step // unit
+    cells = len(costs) * (capacity + 1)
+    if method == 'dp' and cells > DP_CELL_LIMIT:
+        raise ValueError(f'таблица точного решения слишком велика ({cells} ячеек, предел {DP_CELL_LIMIT}); '
+                         'используйте метод greedy')
+    if method == 'dp' or (method == 'auto' and cells <= DP_CELL_LIMIT):
+        chosen = _knapsack_dp(weights, profits, capacity)
+        method, bound = 'dp', None
+    else:
+        chosen, bound = _greedy(costs, profits, budget)
+        method, rounded_to = 'greedy', None
+    profit = sum(profits[i] for i in chosen)
+    return {
+        'chosen': chosen,
+        'method': method,
+        'cost': sum(costs[i] for i in chosen),
+        'profit': profit,
+        'upper_bound': profit if bound is None else bound,
+        'rounded_to': rounded_to,
+    }
+
+
+def _money(amount):
+    return f'{round(amount):,}'.replace(',', ' ')
+
+
+def generate_portfolio_report(items, solution, budget, candidates):
+    """Генерирует текстовый отчёт по портфелю.
+
+    Args:
+        items (dict): Результат build_items().
+        solution (dict): Результат optimize_portfolio().
+        budget (int): Бюджет на вложения.
+        candidates (int): Число рассмотренных регионов.
+
+    Returns:
+        str: Текст отчёта.
+    """
+    chosen = sorted(solution['chosen'], key=lambda i: (-items['profit'][i], items['region'][i], items['center'][i]))
+    headers = ["РЕГИОН", "ЦЕНТР", "ВЛОЖЕНИЯ", "ПРИБЫЛЬ/МЕС", "ОКУПАЕМОСТЬ"]
+    rows = [[items['region'][i], items['center'][i], items['cost'][i], items['profit'][i],
+             f"{items['payback_period_month'][i]} мес."] for i in chosen]
+    table_output = format_fancy_table(headers, rows, currency_columns=[2, 3]) if rows else 'Ни один центр не помещается в бюджет.\n'
+
+    cost, profit = solution['cost'], solution['profit']
+    payback = f'{math.ceil(cost / profit)} мес.' if profit > 0 else 'нет'
+    regions = len({items['region'][i] for i in chosen})
+    if solution['method'] == 'dp':
+        method = 'точное (динамическое программирование)'
+        quality = 'оптимальна'
+        if solution['rounded_to']:
+            quality += f' при вложениях, округлённых вверх до {_money(solution["rounded_to"])} ₽'
+    else:
+        method = 'жадный выбор с границей линейной релаксации'
+        gap = (solution['upper_bound'] - profit) / solution['upper_bound'] * 100 if solution['upper_bound'] else 0.0
+        quality = f'не ниже {100 - gap:.2f}% оптимума (граница {_money(solution["upper_bound"])} ₽)'
+    return f"""ПОРТФЕЛЬ ЦЕНТРОВ ПРИ БЮДЖЕТЕ {_money(budget)} ₽
+• Рассмотрено:               {candidates} регионов, {len(items['cost'])} центров с прибылью
+• Решение:                   {method}
+• Выбрано:                   {len(chosen)} центров в {regions} регионах
+• Вложения:                  {_money(cost)} ₽ (остаток {_money(budget - cost)} ₽)
+• Прибыль портфеля:          {_money(profit)} ₽ в месяц, {quality}
+• Окупаемость портфеля:      {payback}
+
+{table_output}
+Окупаемость портфеля - ceil(вложения / месячная прибыль) всех выбранных центров
+при полном наборе с первого месяца, как в обычных отчётах.
+"""
@@ -0,0 +1,157 @@
+"""Замеры времени и счётчики по этапам конвейера (флаг --profile).
+
+Этапы: load (загрузка CSV или кэша), select (выбор регионов), calculate
+(расчёт показателей), render (формирование отчётов), write (запись файлов).
+Для каждого этапа накапливаются число вызовов, суммарное время, обработанные
+строки, строки, пропущенные загрузчиками из-за некорректных данных, и
+записанные байты. Результат доступен в виде сводной таблицы и JSON-трассы в
+формате Chrome Trace Event (открывается в chrome://tracing или Perfetto).
+
+Пока замеры не включены через enable(), stage() возвращает общий пустой
+контекстный менеджер, а count() сразу возвращает управление, поэтому точки
+замеров в коде практически ничего не стоят.
+
+При рендеринге в пуле процессов (--workers > 1) этап render выполняется в
+процессах-исполнителях и в сводку основного процесса не попадает.
+"""
+
+import json
+import os
+import threading
+import time
+
+from create_table import format_fancy_table
+
+STAGES = ('load', 'select', 'calculate', 'render', 'write')   # порядок этапов в сводке
+COUNTERS = ('rows', 'skipped', 'bytes')   # счётчики, выводимые в сводной таблице
+
+_enabled = False
+_origin = 0   # момент включения замеров, нс
+_stats = {}   # {этап: {'calls', 'seconds', счётчик: значение}}
+_events = []   # события трассы
+_lock = threading.Lock()   # запись ведётся также из потоков пула записи
+
+
+class _NullSpan:
+    """Пустой замер: используется, когда профилирование выключено."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def add(self, **counters):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """Замер одного вызова этапа с его счётчиками."""
+
+    __slots__ = ('name', 'counters', 'start')
+
+    def __init__(self, name):
+        self.name = name
+        self.counters = {}
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        duration = time.perf_counter_ns() - self.start
+        _record(self.name, duration, self.counters, calls=1)
+        with _lock:
+            _events.append({'name': self.name, 'ph': 'X', 'pid': os.getpid(), 'tid': threading.get_ident(),
+                            'ts': (self.start - _origin) / 1000, 'dur': duration / 1000,
+                            'args': dict(self.counters)})
+        return False
+
+    def add(self, **counters):
+        """Увеличивает счётчики замера (rows=..., skipped=..., bytes=...)."""
+        for key, value in counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+
+
+def _record(name, duration_ns, counters, calls=0):
+    with _lock:
+        stats = _stats.setdefault(name, {'calls': 0, 'seconds': 0.0})
+        stats['calls'] += calls
+        stats['seconds'] += duration_ns / 1e9
+        for key, value in counters.items():
+            stats[key] = stats.get(key, 0) + value
+
+
+def enable():
+    """Включает замеры и сбрасывает накопленные данные."""
+    global _enabled, _origin
+    with _lock:
+        _stats.clear()
+        _events.clear()
+        _origin = time.perf_counter_ns()
+        _enabled = True
+
+
+def disable():
+    """Выключает замеры (накопленные данные сохраняются)."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    """Включены ли замеры."""
+    return _enabled
+
+
+def stage(name):
+    """Контекстный менеджер замера этапа.
+
+    Пример:
+        with profiling.stage('calculate') as span:
+            ...
+            span.add(rows=len(regions))
+    """
+    return _Span(name) if _enabled else _NULL_SPAN
+
+
+def count(name, **counters):
+    """Увеличивает счётчики этапа вне замера (например, пропущенные строки в загрузчике)."""
+    if not _enabled:
+        return
+    _record(name, 0, counters)
+
+
+def summary():
+    """Накопленные данные по этапам.
+
+    Returns:
+        dict: {этап: {'calls', 'seconds', 'rows', 'skipped', 'bytes', ...}} в порядке STAGES.
+    """
+    with _lock:
+        names = [s for s in STAGES if s in _stats] + [s for s in _stats if s not in STAGES]
+        return {name: dict(_stats[name]) for name in names}
+
+
+def format_summary():
+    """Сводная таблица по этапам."""
+    data = summary()
+    total = sum(stats['seconds'] for stats in data.values()) or 1.0
+    rows = [[name, stats['calls'], f"{stats['seconds'] * 1000:.1f} мс", f"{stats['seconds'] / total * 100:.1f}%",
+             *(stats.get(counter, 0) for counter in COUNTERS)] for name, stats in data.items()]
+    headers = ['ЭТАП', 'ВЫЗОВОВ', 'ВРЕМЯ', 'ДОЛЯ', 'СТРОК', 'ПРОПУЩЕНО', 'БАЙТ']
+    return format_fancy_table(headers, rows)
+
+
+def write_trace(path):
+    """Сохраняет трассу в формате Chrome Trace Event и сводку в otherData.summary."""
+    with _lock:
+        events = list(_events)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': {'summary': summary()}},
+                  f, ensure_ascii=False)
@@ -0,0 +1,101 @@
+"""Индекс рейтингов регионов на кучах (top-K / bottom-K по каждому показателю).
+
+Сводный отчёт по десяткам тысяч регионов не должен сортировать весь список и
+делать отдельный проход max/min для каждого рейтинга. RankingIndex за один
+проход поддерживает для каждого показателя K лучших и K худших регионов в
+кучах фиксированного размера (O(log K) на добавление региона) и допускает
+добавление регионов по одному.
+
+Порядок при равных значениях совпадает с sorted()/max()/min() по исходному
+списку: из равных выше стоит регион, добавленный раньше.
+"""
+
+from heapq import heappush, heapreplace
+
+# Показатели рейтинга: +1 - чем больше, тем лучше; -1 - чем меньше, тем лучше
+METRICS = {
+    'profit': 1,
+    'profitability': 1,
+    'competition_density': -1,
+    'payback_period_month': -1,   # учитываются только числовые сроки (прибыльные регионы)
+}
+
+
+class RankingIndex:
+    """Top-K и bottom-K регионов по каждому показателю с пополнением по одному.
+
+    Attributes:
+        k (int): Размер рейтингов.
+        count (int): Число добавленных регионов.
+        profitable_count (int): Число регионов с числовым сроком окупаемости.
+    """
+
+    __slots__ = ('k', 'count', 'profitable_count', '_best', '_worst')
+
+    def __init__(self, k=10, results=()):
+        if k < 1:
+            raise ValueError('размер рейтинга должен быть положительным')
+        self.k = k
+        self.count = 0
+        self.profitable_count = 0
+        # Кучи хранят записи (приоритет, -порядковый номер, номер, результат);
+        # в корне - худшая из сохранённых записей, она вытесняется первой
+        self._best = {metric: [] for metric in METRICS}
+        self._worst = {metric: [] for metric in METRICS}
+        self.add_many(results)
+
+    def _push(self, heap, entry):
+        if len(heap) < self.k:
+            heappush(heap, entry)
+        elif entry > heap[0]:
+            heapreplace(heap, entry)
+
+    def add(self, result):
+        """Добавляет результат calculate_financials() одного региона."""
+        seq = self.count
+        self.count += 1
+        for metric, sign in METRICS.items():
+            value = result[metric]
+            if metric == 'payback_period_month':
+                if not isinstance(value, int):
+                    continue   # 'no payback' не участвует в рейтинге окупаемости
+                self.profitable_count += 1
+            self._push(self._best[metric], (sign * value, -seq, seq, result))
+            self._push(self._worst[metric], (-sign * value, -seq, seq, result))
+
+    def add_many(self, results):
+        """Добавляет результаты нескольких регионов."""
+        for result in results:
+            self.add(result)
+
+    def top(self, metric, n=None):
+        """Лучшие регионы по показателю, от лучшего к худшему (не более k)."""
+        entries = sorted(self._best[metric], reverse=True)
+        return [entry[3] for entry in entries[:n]]
+
+    def bottom(self, metric, n=None):
+        """Худшие регионы по показателю, от худшего к лучшему (не более k)."""
+        entries = sorted(self._worst[metric], reverse=True)
+        return [entry[3] for entry in entries[:n]]
+
+    def best_entry(self, metric):
+        """Лучший регион по показателю в виде (порядковый номер добавления, результат).
+
+        Returns:
+            tuple | None: None, если подходящих регионов нет.
+        """
+        heap = self._best[metric]
+        if not heap:
+            return None
+        entry = max(heap)
+        return entry[2], entry[3]
+
+    def best(self, metric):
+        """Лучший регион по показателю или None, если подходящих регионов нет."""
+        entry = self.best_entry(metric)
+        return entry[1] if entry else None
+
+    def worst(self, metric):
+        """Худший регион по показателю или None, если подходящих регионов нет."""
+        heap = self._worst[metric]
+        return max(heap)[3] if heap else None
@@ -0,0 +1,181 @@
+"""Поиск регионов по названию: точное совпадение, префикс, шаблон и нечёткий поиск.
+
+Интерактивное меню выводило все регионы с номерами; при десятках тысяч
+муниципалитетов вывод занимает секунды, а выбрать нужный по номеру
+невозможно. RegionIndex хранит нормализованные названия (casefold, ё -> е,
+одиночные пробелы) в отсортированном списке:
+
+    точное совпадение   - словарь, O(1);
+    префикс             - два бинарных поиска, O(log n + k) для k совпадений;
+    шаблон (*, ?, [..]) - перебор только диапазона по буквальному началу шаблона;
+    нечёткий поиск      - индекс триграмм (строится при первом обращении) и
+                          уточнение сходства difflib для лучших кандидатов.
+
+Выборка задаётся описаниями (см. RegionIndex.resolve()): название, шаблон или
+@файл со списком описаний - одинаково в меню и в аргументе --regions.
+"""
+
+import difflib
+import fnmatch
+import os
+import re
+from bisect import bisect_left
+from collections import Counter
+from itertools import accumulate
+
+GLOB_CHARS = frozenset('*?[')   # символы шаблона fnmatch
+LIST_FILE_PREFIX = '@'   # описание "@файл" - список описаний из файла
+MAX_LIST_DEPTH = 16   # наибольшая вложенность списков "@файл"
+SUGGESTIONS = 5   # вариантов в подсказках
+FUZZY_CANDIDATES = 50   # кандидатов по триграммам, уточняемых difflib
+FUZZY_CUTOFF = 0.6   # минимальное сходство подсказки (difflib.SequenceMatcher.ratio)
+MAX_KEY = '\U0010ffff'   # больше любого символа: граница диапазона префикса
+
+
+def normalize(name):
+    """Нормализует название для поиска: регистр, ё/е и пробелы не различаются."""
+    return ' '.join(name.casefold().replace('ё', 'е').split())
+
+
+def _trigrams(key):
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class RegionIndex:
+    """Индекс названий регионов.
+
+    Attributes:
+        regions (list): Названия регионов в алфавитном порядке (номера в меню
+            отсчитываются по этому списку с 1).
+    """
+
+    __slots__ = ('regions', '_keys', '_by_key', '_offsets', '_trigrams')
+
+    def __init__(self, regions):
+        self.regions = sorted(regions)
+        self._by_key = {}   # {нормализованное название: [регионы]} (Орёл и Орел - один ключ)
+        for region in self.regions:
+            self._by_key.setdefault(normalize(region), []).append(region)
+        self._keys = sorted(self._by_key)
+        # Число регионов с ключами до i-го: подсчёт совпадений префикса без перебора
+        self._offsets = [0, *accumulate(len(self._by_key[key]) for key in self._keys)]
+        self._trigrams = None
+
+    def __len__(self):
+        return len(self.regions)
+
+    def find(self, name):
+        """Регионы, название которых совпадает с name без учёта регистра и ё/е."""
+        return list(self._by_key.get(normalize(name), ()))
+
+    def _prefix_range(self, prefix):
+        key = normalize(prefix)
+        return bisect_left(self._keys, key), bisect_left(self._keys, key + MAX_KEY)
+
+    def count_prefix(self, prefix):
+        """Число названий, начинающихся с prefix (без перебора совпадений)."""
+        start, end = self._prefix_range(prefix)
+        return self._offsets[end] - self._offsets[start]
+
+    def prefix(self, prefix, limit=None):
+        """Регионы, название которых начинается с prefix, в алфавитном порядке.
+
+        Args:
+            prefix (str): Начало названия.
+            limit (int, optional): Не более limit регионов. По умолчанию все.
+        """
+        start, end = self._prefix_range(prefix)
+        if limit is not None:
+            end = min(end, start + limit)
+        return [region for key in self._keys[start:end] for region in self._by_key[key]][:limit]
+
+    def glob(self, pattern):
+        """Регионы, название которых соответствует шаблону fnmatch (*, ?, [...]).
+
+        Перебирается только диапазон названий с буквальным началом шаблона.
+        """
+        key = normalize(pattern)
+        literal = re.split(r'[*?\[]', key, maxsplit=1)[0]
+        start, end = bisect_left(self._keys, literal), bisect_left(self._keys, literal + MAX_KEY)
+        match = re.compile(fnmatch.translate(key)).match
+        return [region for key in self._keys[start:end] if match(key) for region in self._by_key[key]]
+
+    def suggest(self, text, limit=SUGGESTIONS):
+        """Похожие названия для опечаток (нечёткий поиск).
+
+        Кандидаты отбираются по числу общих триграмм (редкие триграммы
+        просматриваются первыми), затем упорядочиваются по сходству difflib.
+
+        Returns:
+            list: Не более limit регионов со сходством не ниже FUZZY_CUTOFF.
+        """
+        key = normalize(text)
+        if self._trigrams is None:
+            self._trigrams = {}
+            for number, name in enumerate(self._keys):
+                for trigram in _trigrams(name):
+                    self._trigrams.setdefault(trigram, []).append(number)
+        postings = sorted((self._trigrams[t] for t in _trigrams(key) if t in self._trigrams), key=len)
+        counts = Counter()
+        for posting in postings:
+            # Частые триграммы (общие окончания и т.п.) учитываются, только
+            # пока кандидатов мало: иначе подсчёт стоит дольше, чем уточнение
+            if counts and len(posting) > FUZZY_CANDIDATES * 20:
+                break
+            counts.update(posting)
+        matcher = difflib.SequenceMatcher(b=key)
+        scored = []
+        for number, _ in counts.most_common(FUZZY_CANDIDATES):
+            matcher.set_seq1(self._keys[number])
+            if matcher.real_quick_ratio() >= FUZZY_CUTOFF and matcher.ratio() >= FUZZY_CUTOFF:
+                scored.append((-matcher.ratio(), self._keys[number]))
+        return [region for _, name in sorted(scored)[:limit] for region in self._by_key[name]][:limit]
+
+    def resolve(self, spec, _files=()):
+        """Регионы по одному описанию выборки.
+
+        Описание - название (без учёта регистра и ё/е), шаблон fnmatch
+        ("Московская*", "Регион-00??") или "@файл" со списком описаний по
+        одному в строке (пустые строки и строки с # пропускаются). Списки
+        могут ссылаться на другие списки, но не по кругу.
+
+        Returns:
+            list: Регионы в алфавитном порядке без повторов.
+
+        Исключения:
+            ValueError: Если название неизвестно (с подсказками похожих),
+                шаблон не соответствует ни одному региону, списки ссылаются
+                друг на друга по кругу или вложены глубже MAX_LIST_DEPTH.
+            OSError: Если файл списка не читается.
+        """
+        if spec.startswith(LIST_FILE_PREFIX):
+            path = spec[len(LIST_FILE_PREFIX):]
+            # Цепочка открытых списков: повтор файла в ней означает цикл
+            key = os.path.realpath(path)
+            chain = [name for name, _ in _files]
+            if key in (k for _, k in _files):
+                raise ValueError(f'списки регионов ссылаются друг на друга по кругу: {" -> ".join([*chain, path])}')
+            if len(_files) >= MAX_LIST_DEPTH:
+                raise ValueError(f'вложенность списков регионов больше {MAX_LIST_DEPTH}: {" -> ".join([*chain, path])}')
+            with open(path, encoding='utf-8') as f:
+                lines = [line.strip() for line in f]
+            return self.resolve_many((line for line in lines if line and not line.startswith('#')),
+                                     _files=(*_files, (path, key)))
+        if GLOB_CHARS.intersection(spec):
+            found = self.glob(spec)
+            if not found:
+                raise ValueError(f'шаблону {spec!r} не соответствует ни один регион')
+            return found
+        found = self.find(spec)
+        if not found:
+            hints = self.suggest(spec)
+            raise ValueError(f'неизвестный регион {spec!r}' + (f' (возможно: {", ".join(hints)})' if hints else ''))
+        return found
+
+    def resolve_many(self, specs, _files=()):
+        """Регионы по нескольким описаниям выборки (см. resolve()), в алфавитном порядке без повторов."""
+        selected = set()
+        for spec in specs:
+            selected.update(self.resolve(spec, _files))
+        return sorted(selected)
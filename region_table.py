@@ -0,0 +1,210 @@
+"""Компактная колоночная таблица регионов со строками-представлениями.
+
+Загрузчики изначально строили словарь словарей {регион: {поле: значение}}:
+на каждый регион приходился отдельный словарь и объекты int для каждого
+значения. RegionTable хранит каждое поле одним столбцом array, а названия
+регионов - списком с индексом {регион: номер строки}. Строка таблицы
+(RegionRow) - лёгкое представление со __slots__ (ссылка на таблицу и номер
+строки), которое создаётся при обращении и читается как словарь:
+
+    table['Казань']['children_5_7']   # как regions_dict['Казань']['children_5_7']
+
+Поэтому код, написанный для словаря словарей (генераторы отчётов, расчёт
+показателей), работает с таблицей без преобразования обратно в словари.
+"""
+
+from array import array
+from collections.abc import Mapping
+
+
+class RegionRow(Mapping):
+    """Строка RegionTable: представление без копирования данных, читается как словарь.
+
+    dict(row) возвращает обычный словарь {поле: значение} (например, для JSON).
+    """
+
+    __slots__ = ('_table', '_row')
+
+    def __init__(self, table, row):
+        self._table = table
+        self._row = row
+
+    def __getitem__(self, field):
+        return self._table._getters[field](self._row)
+
+    def get(self, field, default=None):
+        getter = self._table._getters.get(field)
+        return default if getter is None else getter(self._row)
+
+    def __iter__(self):
+        return iter(self._table.fields)
+
+    def __len__(self):
+        return len(self._table.fields)
+
+    def __contains__(self, field):
+        return field in self._table._getters
+
+    def to_dict(self):
+        """Значения строки в виде словаря {поле: значение}."""
+        row = self._row
+        return {field: getter(row) for field, getter in self._table._getters.items()}
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.to_dict()!r})'
+
+
+class RegionTable:
+    """Таблица регионов, разложенная по столбцам array.
+
+    Читается как словарь словарей: table[регион] возвращает RegionRow,
+    поддерживаются in, len, итерация по регионам, keys(), values(), items()
+    и get(). Повторная запись региона заменяет значения, сохраняя его место,
+    как при присваивании в словарь.
+
+    Attributes:
+        fields (tuple): Названия полей (столбцов).
+        regions (list): Названия регионов в порядке первого появления.
+        index (dict): Словарь {регион: номер строки}.
+        columns (dict): Словарь {поле: array}.
+    """
+
+    __slots__ = ('fields', 'regions', 'index', 'columns', '_getters')
+
+    row_type = RegionRow   # класс строк-представлений
+
+    def __init__(self, fields, typecode='q'):
+        self.fields = tuple(fields)
+        self.regions = []
+        self.index = {}
+        self.columns = {field: array(typecode) for field in self.fields}
+        self._getters = self._build_getters()
+
+    @classmethod
+    def from_columns(cls, regions, columns):
+        """Создаёт таблицу из готовых столбцов (без копирования).
+
+        Args:
+            regions (list): Названия регионов.
+            columns (dict): Словарь {поле: array} той же длины, что и regions.
+
+        Исключения:
+            ValueError: Если длина столбца не совпадает с числом регионов.
+        """
+        table = cls.__new__(cls)
+        table._assign(regions if isinstance(regions, list) else list(regions), dict(columns))
+        return table
+
+    @classmethod
+    def from_dict(cls, data, fields, typecode='q'):
+        """Создаёт таблицу из словаря словарей {регион: {поле: значение}}."""
+        regions = list(data)
+        columns = {field: array(typecode, [data[r][field] for r in regions]) for field in fields}
+        return cls.from_columns(regions, columns)
+
+    def _assign(self, regions, columns):
+        for field, column in columns.items():
+            if len(column) != len(regions):
+                raise ValueError(f'Столбец {field} содержит {len(column)} значений, ожидалось {len(regions)}.')
+        self.fields = tuple(columns)
+        self.regions = regions
+        self.index = {region: i for i, region in enumerate(regions)}
+        self.columns = columns
+        self._getters = self._build_getters()
+
+    def _build_getters(self):
+        """Функции чтения значения поля по номеру строки: {поле: getter(номер)}."""
+        return {field: self.columns[field].__getitem__ for field in self.fields}
+
+    # Функции чтения - связанные методы и замыкания, поэтому при сериализации
+    # (передача в пул процессов) сохраняются только данные
+    def __getstate__(self):
+        return self.regions, self.columns
+
+    def __setstate__(self, state):
+        self._assign(*state)
+
+    def set(self, region, values):
+        """Записывает значения полей региона (в порядке fields).
+
+        Исключения:
+            ValueError: Если число значений не совпадает с числом полей.
+        """
+        if len(values) != len(self.fields):
+            raise ValueError(f'Ожидалось {len(self.fields)} значений, получено {len(values)}.')
+        row = self.index.get(region)
+        if row is None:
+            self.index[region] = len(self.regions)
+            self.regions.append(region)
+            for column, value in zip(self.columns.values(), values):
+                column.append(value)
+        else:
+            for column, value in zip(self.columns.values(), values):
+                column[row] = value
+
+    def column(self, field, regions=None):
+        """Возвращает столбец поля, при необходимости только для части регионов.
+
+        Args:
+            field (str): Название поля.
+            regions (list, optional): Названия регионов. По умолчанию - все регионы.
+
+        Returns:
+            array: Значения поля в порядке регионов.
+
+        Исключения:
+            KeyError: Если поле или регион неизвестны.
+        """
+        column = self.columns[field]
+        if regions is None:
+            return array(column.typecode, column)
+        index = self.index
+        return array(column.typecode, [column[index[r]] for r in regions])
+
+    def subset(self, regions):
+        """Возвращает новую таблицу только с заданными регионами (в их порядке).
+
+        Исключения:
+            KeyError: Если регион неизвестен.
+        """
+        regions = list(regions)
+        return type(self).from_columns(regions, {field: self.column(field, regions) for field in self.fields})
+
+    def row(self, region):
+        """Возвращает строку региона (RegionRow).
+
+        Исключения:
+            KeyError: Если регион неизвестен.
+        """
+        return self.row_type(self, self.index[region])
+
+    # Чтение в стиле словаря словарей
+    def __getitem__(self, region):
+        return self.row_type(self, self.index[region])
+
+    def get(self, region, default=None):
+        row = self.index.get(region)
+        return default if row is None else self.row_type(self, row)
+
+    def __contains__(self, region):
+        return region in self.index
+
+    def __iter__(self):
+        return iter(self.regions)
+
+    def __len__(self):
+        return len(self.regions)
+
+    def keys(self):
+        return list(self.regions)
+
+    def values(self):
+        row_type = self.row_type
+        return (row_type(self, i) for i in range(len(self.regions)))
+
+    def items(self):
+        return zip(self.regions, self.values())
+
+    def to_dict(self):
+        """Преобразует таблицу в словарь словарей {регион: {поле: значение}}."""
+        return {region: row.to_dict() for region, row in self.items()}
@@ -0,0 +1,153 @@
+"""Параллельная генерация и запись отчётов.
+
+Генераторы отчётов из main_pro.py - чистые функции, строящие строки, поэтому
+их можно выполнять в отдельных процессах. Задания (см. main_pro.plan_reports)
+делятся на пакеты и отправляются в пул процессов; рассчитанные показатели
+передаются в каждый процесс один раз при его запуске. Готовые отчёты
+записываются на диск пулом потоков.
+
+Порядок выдачи отчётов совпадает с порядком заданий, а тексты формируются
+теми же функциями, что и в последовательном режиме, поэтому содержимое
+файлов побайтно совпадает с последовательной генерацией.
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import profiling
+
+DEFAULT_CHUNK_SIZE = 64   # заданий в одном пакете для процесса
+WINDOW_PER_WORKER = 4   # пакетов "в полёте" на один процесс (ограничивает память)
+
+# Показатели, переданные в процесс-исполнитель при его запуске
+_worker_results = None
+
+
+def _init_worker(results):
+    """Инициализатор процесса: сохраняет рассчитанные показатели в глобальной переменной."""
+    global _worker_results
+    _worker_results = results
+
+
+def _render_chunk(jobs):
+    """Формирует пакет отчётов в процессе-исполнителе."""
+    from main_pro import render_report   # импорт без побочных эффектов
+    return [render_report(kind, regions, _worker_results, options) for kind, regions, options in jobs]
+
+
+def _chunks(items, size):
+    """Разбивает список на последовательные части не длиннее size."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _ordered_window(submit, items, window):
+    """Выполняет submit(item) для элементов, держа в работе не более window задач.
+
+    Результаты выдаются строго в порядке элементов.
+    """
+    pending = deque()
+    for item in items:
+        pending.append(submit(item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def resolve_workers(workers):
+    """Приводит параметр количества процессов к числу (0 или None - по числу ядер)."""
+    if not workers:
+        return os.cpu_count() or 1
+    return max(1, workers)
+
+
+def render_reports(results, jobs, workers=1, chunk_size=DEFAULT_CHUNK_SIZE, stream=False):
+    """Формирует отчёты по списку заданий, при workers > 1 - в пуле процессов.
+
+    Args:
+        results (dict): Результаты расчёта {регион: финансовые показатели}.
+        jobs (list): Задания вида (тип отчёта, список регионов, параметры) из plan_reports().
+        workers (int, optional): Количество процессов. 1 - последовательно в
+            текущем процессе, 0 или None - по числу ядер. По умолчанию 1.
+        chunk_size (int, optional): Заданий в одном пакете. По умолчанию 64.
+        stream (bool, optional): При последовательном формировании сводный
+            отчёт выдавать частями (см. main_pro.iter_overview_report()); из
+            процессов отчёты всегда возвращаются текстом. По умолчанию False.
+
+    Yields:
+        tuple: (имя файла отчёта, текст отчёта или итератор его частей) в порядке заданий.
+    """
+    workers = resolve_workers(workers)
+    if workers == 1 or len(jobs) <= 1:
+        from main_pro import render_report
+        for kind, regions, options in jobs:
+            yield render_report(kind, regions, results, options, stream)
+        return
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(results,)) as pool:
+        submit = lambda chunk: pool.submit(_render_chunk, chunk)
+        for rendered in _ordered_window(submit, _chunks(jobs, chunk_size), workers * WINDOW_PER_WORKER):
+            yield from rendered
+
+
+def _write_report(item, output_dir):
+    """Записывает один отчёт (для пула потоков) и возвращает число байт."""
+    filename, report = item
+    chunks = (report,) if isinstance(report, str) else report
+    # Тот же режим открытия, что и в main_pro.save_report()
+    with profiling.stage('write') as span, open(os.path.join(output_dir, filename), 'w', encoding='utf-8') as f:
+        written = 0
+        for chunk in chunks:
+            f.write(chunk)
+            # tell() в текстовом режиме - непрозрачная позиция, а не число байт
+            written += len(chunk.encode('utf-8'))
+        span.add(rows=1, bytes=written)
+        return written
+
+
+def write_reports(reports, output_dir='.', io_workers=0):
+    """Записывает отчёты в файлы, при io_workers > 0 - через пул потоков.
+
+    Args:
+        reports (iterable): Пары (имя файла, текст отчёта или итератор его частей).
+        output_dir (str, optional): Директория для отчётов. По умолчанию текущая.
+        io_workers (int, optional): Количество потоков записи; 0 - запись в
+            текущем потоке. По умолчанию 0.
+
+    Returns:
+        tuple: (количество записанных отчётов, количество записанных байт).
+    """
+    count = total = 0
+    if io_workers <= 0:
+        for item in reports:
+            total += _write_report(item, output_dir)
+            count += 1
+        return count, total
+
+    with ThreadPoolExecutor(io_workers) as pool:
+        submit = lambda item: pool.submit(_write_report, item, output_dir)
+        for written in _ordered_window(submit, reports, io_workers * WINDOW_PER_WORKER):
+            total += written
+            count += 1
+    return count, total
+
+
+def run_report_pipeline(results, jobs, output_dir='.', workers=1, io_workers=0,
+                        chunk_size=DEFAULT_CHUNK_SIZE):
+    """Формирует и записывает отчёты: рендеринг в процессах, запись в потоках.
+
+    Args:
+        results (dict): Результаты расчёта {регион: финансовые показатели}.
+        jobs (list): Задания из plan_reports().
+        output_dir (str, optional): Директория для отчётов.
+        workers (int, optional): Количество процессов рендеринга (см. render_reports()).
+        io_workers (int, optional): Количество потоков записи (см. write_reports()).
+        chunk_size (int, optional): Заданий в одном пакете.
+
+    Returns:
+        tuple: (количество записанных отчётов, количество записанных байт).
+    """
+    reports = render_reports(results, jobs, workers, chunk_size)
+    return write_reports(reports, output_dir, io_workers)
@@ -0,0 +1,234 @@
+"""Машиночитаемая выгрузка результатов calculate_financials() по всем регионам.
+
+Текстовые отчёты report_*.txt предназначены для людей; разбирать из них числа
+медленно и ненадёжно. Модуль выгружает показатели всех регионов в трёх
+форматах:
+
+    csv   - results.csv, разделитель ';' (как у исходных CSV-файлов);
+    jsonl - results.jsonl, один JSON-объект на регион;
+    bin   - results.bin, двоичный колоночный формат (см. columnar_io.py),
+            который читается через mmap без разбора текста.
+
+CSV и JSONL пишутся потоково, по одному региону. В двоичном формате срок
+окупаемости хранится как int64 с маской наличия значения
+('payback_period_month.present'); при отсутствии окупаемости значение 0,
+а маска 0. У регионов без данных об ИП (NO_IP_DATA) число ИП и плотность
+конкуренции (в расчёте - math.inf) в CSV пустые, а в JSONL - null. load_results()
+восстанавливает словари того же вида, что возвращает calculate_financials(),
+из любого из трёх форматов.
+"""
+
+import csv
+import json
+import math
+import os
+from array import array
+
+from batch_financials import NO_IP_DATA, NO_PAYBACK
+from columnar_io import read_columns, write_columns
+
+EXPORT_VERSION = 1   # версия структуры выгрузки
+
+# Поля результата и коды типов столбцов двоичного формата ('str' - строки)
+RESULT_FIELDS = {
+    'region': 'str',
+    'children_5_7': 'q',
+    'ip_count': 'q',
+    'total_costs': 'q',
+    'monthly_revenue': 'q',
+    'profit': 'q',
+    'profitability': 'd',
+    'profitability_level': 'str',
+    'break_even_children': 'q',
+    'competition_density': 'd',
+    'competition_level': 'str',
+    'payback_period_month': 'q',
+}
+
+# Имена файлов для каждого формата
+EXPORT_FILES = {
+    'csv': 'results.csv',
+    'jsonl': 'results.jsonl',
+    'bin': 'results.bin',
+}
+
+
+# Поля, не определённые без данных об ИП: в текстовых форматах - пустое значение
+UNKNOWN_IP_FIELDS = {'ip_count': NO_IP_DATA, 'competition_density': math.inf}
+
+
+def export_record(result, fields=None):
+    """Показатели региона для текстовой выгрузки (CSV, JSON).
+
+    Без данных об ИП число ИП и плотность конкуренции заменяются на None:
+    служебное значение -1 и бесконечность не должны попадать в файлы (JSON
+    не допускает Infinity).
+
+    Args:
+        result (dict): Показатели calculate_financials().
+        fields (iterable, optional): Выгружаемые поля. По умолчанию все поля результата.
+
+    Returns:
+        dict: Новый словарь с полями fields.
+    """
+    record = {field: result[field] for field in (result if fields is None else fields)}
+    if result['ip_count'] == NO_IP_DATA:
+        record.update(dict.fromkeys(UNKNOWN_IP_FIELDS.keys() & record.keys()))
+    return record
+
+
+def _restore_unknown(record):
+    """Обратное к export_record(): None в полях UNKNOWN_IP_FIELDS - служебные значения расчёта."""
+    for field, value in UNKNOWN_IP_FIELDS.items():
+        if record.get(field, 0) is None:
+            record[field] = value
+    return record
+
+
+def export_csv(results, path):
+    """Потоково записывает результаты в CSV (разделитель ';').
+
+    Args:
+        results (iterable): Словари calculate_financials().
+        path (str): Путь к файлу.
+
+    Returns:
+        int: Количество записанных регионов.
+    """
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(RESULT_FIELDS)
+        for result in results:
+            writer.writerow(export_record(result, RESULT_FIELDS).values())   # None - пустая ячейка
+            count += 1
+    return count
+
+
+def export_jsonl(results, path):
+    """Потоково записывает результаты в JSONL (один объект на строку).
+
+    Args:
+        results (iterable): Словари calculate_financials().
+        path (str): Путь к файлу.
+
+    Returns:
+        int: Количество записанных регионов.
+    """
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for result in results:
+            f.write(json.dumps(export_record(result, RESULT_FIELDS), ensure_ascii=False, allow_nan=False))
+            f.write('\n')
+            count += 1
+    return count
+
+
+def export_binary(results, path):
+    """Записывает результаты в двоичный колоночный файл (атомарно).
+
+    Args:
+        results (iterable): Словари calculate_financials().
+        path (str): Путь к файлу.
+
+    Returns:
+        int: Количество записанных регионов.
+    """
+    columns = {field: [] if kind == 'str' else array(kind) for field, kind in RESULT_FIELDS.items()}
+    present = array('B')
+    payback = columns['payback_period_month']
+    for result in results:
+        for field, column in columns.items():
+            if field != 'payback_period_month':
+                column.append(result[field])
+        months = result['payback_period_month']
+        has_payback = isinstance(months, int)
+        payback.append(months if has_payback else 0)
+        present.append(has_payback)
+    columns['payback_period_month.present'] = present
+    write_columns(path, columns, {'version': EXPORT_VERSION, 'no_payback': NO_PAYBACK})
+    return len(present)
+
+
+# Функции записи для каждого формата
+EXPORTERS = {
+    'csv': export_csv,
+    'jsonl': export_jsonl,
+    'bin': export_binary,
+}
+
+
+def export_results(results, formats, output_dir='.'):
+    """Выгружает результаты в заданных форматах.
+
+    Args:
+        results (dict): Результаты расчёта {регион: показатели}.
+        formats (list): Форматы из EXPORT_FILES ('csv', 'jsonl', 'bin').
+        output_dir (str, optional): Директория для файлов. По умолчанию текущая.
+
+    Returns:
+        list: Пути к записанным файлам.
+
+    Исключения:
+        ValueError: Если формат неизвестен.
+    """
+    unknown = [f for f in formats if f not in EXPORTERS]
+    if unknown:
+        raise ValueError(f'неизвестные форматы выгрузки: {", ".join(unknown)}')
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for fmt in formats:
+        path = os.path.join(output_dir, EXPORT_FILES[fmt])
+        EXPORTERS[fmt](results.values(), path)
+        paths.append(path)
+    return paths
+
+
+def _parse_csv_value(field, text):
+    """Восстанавливает тип значения поля из текста CSV."""
+    kind = RESULT_FIELDS[field]
+    if field == 'payback_period_month' and text == NO_PAYBACK:
+        return NO_PAYBACK
+    if field in UNKNOWN_IP_FIELDS and text == '':
+        return None   # нет данных об ИП (см. _restore_unknown())
+    if kind == 'q':
+        return int(text)
+    if kind == 'd':
+        return float(text)
+    return text
+
+
+def load_results(path):
+    """Читает результаты из файла любого формата выгрузки (по расширению).
+
+    Args:
+        path (str): Путь к results.csv, results.jsonl или results.bin.
+
+    Returns:
+        dict: Словарь {регион: показатели} того же вида, что calculate_financials().
+
+    Исключения:
+        ValueError: Если расширение файла не соответствует ни одному формату.
+    """
+    extension = os.path.splitext(path)[1]
+    if extension == '.csv':
+        with open(path, encoding='utf-8', newline='') as f:
+            reader = csv.reader(f, delimiter=';')
+            header = next(reader)
+            rows = (_restore_unknown({field: _parse_csv_value(field, text) for field, text in zip(header, row)})
+                    for row in reader)
+            return {row['region']: row for row in rows}
+    if extension == '.jsonl':
+        with open(path, encoding='utf-8') as f:
+            rows = (_restore_unknown(json.loads(line)) for line in f if line.strip())
+            return {row['region']: row for row in rows}
+    if extension == '.bin':
+        with read_columns(path) as table:
+            columns = {field: table[field] if kind == 'str' else table[field].tolist()
+                       for field, kind in RESULT_FIELDS.items()}
+            present = table['payback_period_month.present'].tolist()
+        columns['payback_period_month'] = [m if p else NO_PAYBACK
+                                           for m, p in zip(columns['payback_period_month'], present)]
+        return {region: {field: columns[field][i] for field in RESULT_FIELDS}
+                for i, region in enumerate(columns['region'])}
+    raise ValueError(f'неизвестный формат выгрузки: {path}')
@@ -0,0 +1,251 @@
+"""Перебор сценариев: декартова сетка параметров для всех регионов.
+
+В calculate_financials() объём продаж (60 детей) и начальные инвестиции
+(500 000 ₽) зафиксированы. Модуль перебирает сетку значений объёма продаж,
+инвестиций и множителей среднего чека и аренды для всех регионов сразу.
+
+Расчёт ведётся столбцами: для каждого множителя чека один раз строится
+столбец чеков, для каждого множителя аренды - столбец затрат, после чего
+прибыль сценария - один проход по регионам. Сетка обрабатывается пакетами
+(все объёмы для одной пары множителей), поэтому память не зависит от размера
+сетки, а результаты сразу записываются в файлы.
+"""
+
+import csv
+import math
+import os
+from decimal import Decimal, InvalidOperation
+from operator import add, mul
+
+from batch_financials import INITIAL_INVESTMENT, MONTHLY_SALES_VOLUME
+from create_table import format_fancy_table
+
+# Значения сетки по умолчанию: базовый сценарий calculate_financials()
+DEFAULT_VOLUMES = str(MONTHLY_SALES_VOLUME)
+DEFAULT_FACTORS = '1'
+DEFAULT_INVESTMENTS = str(INITIAL_INVESTMENT)
+
+
+def parse_range(text, cast=float):
+    """Разбирает описание набора значений параметра.
+
+    Поддерживаются список через запятую ("50,60,70") и диапазон с шагом
+    "начало:конец:шаг" (конец включается). Значения диапазона вычисляются
+    в десятичной арифметике, поэтому "0.8:1.2:0.1" даёт ровно 0.8, 0.9, ... 1.2.
+    Все параметры сетки (объём продаж, множители, инвестиции) должны быть
+    положительными, в том числе после приведения к cast.
+
+    Args:
+        text (str): Описание набора значений.
+        cast (type, optional): Тип значений (int или float). По умолчанию float.
+
+    Returns:
+        list: Отсортированный список уникальных значений.
+
+    Исключения:
+        ValueError: Если описание некорректно или значение не больше нуля.
+    """
+    try:
+        if ':' in text:
+            start, stop, step = (Decimal(part) for part in text.split(':'))
+            if step <= 0 or stop < start:
+                raise ValueError(f'некорректный диапазон {text!r}')
+            count = int((stop - start) / step) + 1
+            values = [start + step * i for i in range(count)]
+        else:
+            values = [Decimal(part) for part in text.split(',') if part.strip()]
+    except (InvalidOperation, TypeError):
+        raise ValueError(f'некорректный набор значений {text!r}') from None
+    if not values:
+        raise ValueError(f'пустой набор значений {text!r}')
+    values = sorted({cast(v) for v in values})
+    if values[0] <= 0:
+        raise ValueError(f'значения должны быть больше нуля: {text!r}')
+    return values
+
+
+def fixed_costs(columns):
+    """Столбец месячных затрат без аренды: зарплаты + маркетинг + прочие."""
+    return list(map(add, map(mul, columns['teachers'], columns['salary']),
+                    map(add, columns['marketing'], columns['other_costs'])))
+
+
+def crossing_volume(check, costs):
+    """Минимальный объём продаж, при котором прибыль положительна (check * v > costs).
+
+    Returns:
+        int | None: Объём продаж или None, если чек после округления не больше
+            нуля и прибыль не становится положительной ни при каком объёме.
+    """
+    if check <= 0:
+        return None
+    return max(costs // check + 1, 0)
+
+
+def sweep_scenarios(regions, columns, volumes, check_factors, rent_factors):
+    """Перебирает сетку сценариев и выдаёт результаты пакетами.
+
+    Средний чек и аренда за кв. м умножаются на множители и округляются до
+    рубля. Каждый пакет - все объёмы продаж для одной пары множителей.
+
+    Args:
+        regions (list): Названия регионов.
+        columns (dict): Входные столбцы (см. batch_financials.build_input_columns()).
+        volumes (list): Объёмы продаж в месяц (детей).
+        check_factors (list): Множители среднего чека.
+        rent_factors (list): Множители аренды.
+
+    Yields:
+        tuple: (check_factor, rent_factor, [(volume, revenue, profit), ...]),
+            где revenue и profit - списки значений по регионам.
+    """
+    fixed = fixed_costs(columns)   # части затрат, не зависящие от множителей
+    area = columns['area']
+
+    for check_factor in check_factors:
+        checks = [round(c * check_factor) for c in columns['avg_check']]
+        for rent_factor in rent_factors:
+            costs = [round(r * rent_factor) * a + f
+                     for r, a, f in zip(columns['rent'], area, fixed)]
+            block = []
+            for volume in volumes:
+                revenue = [c * volume for c in checks]
+                block.append((volume, revenue, [r - c for r, c in zip(revenue, costs)]))
+            yield check_factor, rent_factor, block
+
+
+def _payback_stats(profit, investment):
+    """Медиана и максимум срока окупаемости среди прибыльных регионов."""
+    months = sorted(math.ceil(investment / p) for p in profit if p > 0)
+    if not months:
+        return '', ''
+    return months[(len(months) - 1) // 2], months[-1]
+
+
+def run_sweep(regions, columns, volumes, check_factors, rent_factors, investments,
+              output_dir='.', per_region=False):
+    """Выполняет перебор сценариев и записывает результаты в файлы.
+
+    Создаются файлы:
+        sweep_scenarios.csv - одна строка на сценарий со сводными показателями;
+        sweep_regions.csv   - для каждого региона доля прибыльных сценариев и
+                              объёмы продаж, при которых он выходит в прибыль;
+        sweep_details.csv   - (при per_region=True) строка на пару сценарий-регион.
+
+    Args:
+        regions (list): Названия регионов.
+        columns (dict): Входные столбцы (см. batch_financials.build_input_columns()).
+        volumes (list): Объёмы продаж в месяц.
+        check_factors (list): Множители среднего чека.
+        rent_factors (list): Множители аренды.
+        investments (list): Начальные инвестиции.
+        output_dir (str, optional): Директория для файлов. По умолчанию текущая.
+        per_region (bool, optional): Записывать подробную таблицу. По умолчанию False.
+
+    Returns:
+        dict: Сводка по регионам {регион: {...}} (то же, что в sweep_regions.csv).
+    """
+    n = len(regions)
+    profitable_counts = [0] * n   # число прибыльных точек сетки по регионам
+    grid_points = 0   # точек сетки без учёта инвестиций (от них прибыль не зависит)
+    scenario_count = 0
+    os.makedirs(output_dir, exist_ok=True)
+
+    details_file = open(os.path.join(output_dir, 'sweep_details.csv'), 'w', encoding='utf-8', newline='') \
+        if per_region else None
+    try:
+        details = csv.writer(details_file, delimiter=';') if details_file else None
+        if details:
+            details.writerow(['scenario', 'region', 'profit', 'profitability', 'payback_period_month'])
+
+        with open(os.path.join(output_dir, 'sweep_scenarios.csv'), 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f, delimiter=';')
+            writer.writerow(['scenario', 'monthly_sales_volume', 'check_factor', 'rent_factor',
+                             'initial_investment', 'profitable_regions', 'regions',
+                             'min_profit', 'mean_profit', 'max_profit',
+                             'median_payback_month', 'max_payback_month'])
+            for check_factor, rent_factor, block in sweep_scenarios(
+                    regions, columns, volumes, check_factors, rent_factors):
+                for volume, revenue, profit in block:
+                    flags = [p > 0 for p in profit]
+                    profitable = sum(flags)
+                    profitable_counts = list(map(add, profitable_counts, flags))
+                    grid_points += 1
+                    summary = [min(profit), round(sum(profit) / n), max(profit)]
+                    for investment in investments:
+                        scenario_count += 1
+                        writer.writerow([scenario_count, volume, check_factor, rent_factor, investment,
+                                         profitable, n, *summary, *_payback_stats(profit, investment)])
+                        if details:
+                            details.writerows(
+                                [scenario_count, region, p, round((p / r) * 100, 1) if r else '',
+                                 math.ceil(investment / p) if p > 0 else 'no payback']
+                                for region, p, r in zip(regions, profit, revenue))
+    finally:
+        if details_file:
+            details_file.close()
+
+    # Объёмы выхода в прибыль при самых благоприятных и самых неблагоприятных множителях
+    summary = {}
+    fixed = fixed_costs(columns)
+    for i, region in enumerate(regions):
+        best = crossing_volume(round(columns['avg_check'][i] * max(check_factors)),
+                               round(columns['rent'][i] * min(rent_factors)) * columns['area'][i] + fixed[i])
+        worst = crossing_volume(round(columns['avg_check'][i] * min(check_factors)),
+                                round(columns['rent'][i] * max(rent_factors)) * columns['area'][i] + fixed[i])
+        summary[region] = {
+            'profitable_share': round(profitable_counts[i] / grid_points * 100, 1),
+            'best_crossing_volume': best,
+            'worst_crossing_volume': worst,
+        }
+
+    with open(os.path.join(output_dir, 'sweep_regions.csv'), 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(['region', 'profitable_share', 'best_crossing_volume', 'worst_crossing_volume'])
+        for region, row in summary.items():
+            writer.writerow([region, row['profitable_share'], _blank(row['best_crossing_volume']),
+                             _blank(row['worst_crossing_volume'])])
+    return summary
+
+
+def _blank(value):
+    """Пустое значение CSV вместо None."""
+    return '' if value is None else value
+
+
+def _crossing_text(volume):
+    return 'нет' if volume is None else f'от {volume} детей'
+
+
+def generate_sweep_report(summary, volumes, check_factors, rent_factors, investments):
+    """Генерирует текстовый отчёт о выходе регионов в прибыль по результатам перебора.
+
+    Args:
+        summary (dict): Результат run_sweep().
+        volumes, check_factors, rent_factors, investments (list): Параметры сетки.
+
+    Returns:
+        str: Текст отчёта.
+    """
+    scenarios = len(volumes) * len(check_factors) * len(rent_factors) * len(investments)
+    headers = ["РЕГИОН", "ПРИБЫЛЬНЫХ СЦЕНАРИЕВ", "ВЫХОД В ПРИБЫЛЬ (ЛУЧШИЙ)", "ВЫХОД В ПРИБЫЛЬ (ХУДШИЙ)"]
+    rows = []
+    for region in sorted(summary, key=lambda r: (-summary[r]['profitable_share'], r)):
+        row = summary[region]
+        rows.append([region, f"{row['profitable_share']:.1f}%",
+                     _crossing_text(row['best_crossing_volume']), _crossing_text(row['worst_crossing_volume'])])
+    table_output = format_fancy_table(headers, rows)
+
+    return f"""ПЕРЕБОР СЦЕНАРИЕВ ПО {len(summary)} РЕГИОНАМ
+Сценариев: {scenarios}
+• Объём продаж:        {volumes[0]}–{volumes[-1]} детей ({len(volumes)} знач.)
+• Множитель чека:      {check_factors[0]}–{check_factors[-1]} ({len(check_factors)} знач.)
+• Множитель аренды:    {rent_factors[0]}–{rent_factors[-1]} ({len(rent_factors)} знач.)
+• Начальные вложения:  {', '.join(f'{i:,}'.replace(',', ' ') for i in investments)} ₽
+
+{table_output}
+Выход в прибыль - минимальный объём продаж, при котором прибыль положительна:
+лучший - при максимальном множителе чека и минимальном множителе аренды,
+худший - при минимальном множителе чека и максимальном множителе аренды;
+«нет» - средний чек при множителе округляется до нуля и прибыль не достигается.
+"""
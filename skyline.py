@@ -0,0 +1,221 @@
+"""Слои недоминируемости (skyline, граница Парето) для многокритериального сравнения регионов.
+
+Регион a доминирует регион b, если a не хуже b по всем критериям и строго
+лучше хотя бы по одному. Нулевой слой - граница Парето (регионы, которые никто
+не доминирует); слой k - граница Парето после удаления слоёв 0..k-1. Номер
+слоя точки равен длине самой длинной цепочки доминирующих её точек, поэтому
+слои строятся за один проход по точкам в лексикографическом порядке (в нём
+доминирующая точка всегда идёт раньше доминируемой) с бинарным поиском слоя:
+если точку доминирует слой k, её доминирует и каждый слой до k.
+
+    2 критерия  - в каждом слое хранится минимум второй координаты, проверка
+                  слоя O(1), итого O(n log n);
+    3 критерия  - в каждом слое хранится «лестница» минимальных точек по
+                  второй и третьей координатам, проверка - бинарный поиск,
+                  итого O(n log n · log L) для L слоёв;
+    4 и более   - блочный вложенный цикл (BNL): точка сравнивается со всеми
+                  точками проверяемого слоя.
+
+Все координаты точек минимизируются. Одинаковые точки друг друга не
+доминируют и попадают в один слой.
+"""
+
+from bisect import bisect_left, bisect_right
+from operator import le
+
+# Критерии сравнения регионов: +1 - чем больше, тем лучше; -1 - чем меньше, тем лучше
+PARETO_CRITERIA = {
+    'profit': 1,
+    'break_even_children': -1,
+    'competition_density': -1,
+    'payback_period_month': -1,   # 'no payback' - хуже любого числового срока
+}
+
+# Критерии, монотонно зависящие от другого критерия: срок окупаемости
+# ceil(инвестиции / прибыль) не возрастает с ростом прибыли (при одинаковых
+# инвестициях), поэтому при наличии прибыли он не меняет отношения
+# доминирования и не увеличивает размерность
+DERIVED_CRITERIA = {'payback_period_month': 'profit'}
+
+
+def _sorted_groups(points):
+    """Номера точек в лексикографическом порядке, сгруппированные по одинаковым точкам."""
+    order = sorted(range(len(points)), key=points.__getitem__)
+    groups = []
+    previous = None
+    for i in order:
+        if groups and points[i] == previous:
+            groups[-1].append(i)
+        else:
+            groups.append([i])
+            previous = points[i]
+    return groups
+
+
+def _layers_2d(points, groups):
+    layers = [0] * len(points)
+    tails = []   # минимум второй координаты по слоям (не убывает с номером слоя)
+    for group in groups:
+        _, y = points[group[0]]
+        layer = bisect_right(tails, y)
+        if layer == len(tails):
+            tails.append(y)
+        else:
+            tails[layer] = y
+        for i in group:
+            layers[i] = layer
+    return layers
+
+
+def _layers_3d(points, groups):
+    layers = [0] * len(points)
+    # Лестница слоя: минимальные по (y, z) точки слоя, y возрастает, z убывает.
+    # Точку (x, y, z) доминирует слой, если в лестнице есть точка с y' <= y и
+    # z' <= z: координата x у точек слоя не больше (они обработаны раньше)
+    stair_ys, stair_zs = [], []
+    for group in groups:
+        _, y, z = points[group[0]]
+        low, high = 0, len(stair_ys)
+        while low < high:
+            middle = (low + high) // 2
+            j = bisect_right(stair_ys[middle], y) - 1
+            if j >= 0 and stair_zs[middle][j] <= z:
+                low = middle + 1
+            else:
+                high = middle
+        if low == len(stair_ys):
+            stair_ys.append([y])
+            stair_zs.append([z])
+        else:
+            # Точка вытесняет из лестницы точки, которые она доминирует по (y, z)
+            ys, zs = stair_ys[low], stair_zs[low]
+            start = end = bisect_left(ys, y)
+            while end < len(ys) and zs[end] >= z:
+                end += 1
+            ys[start:end] = [y]
+            zs[start:end] = [z]
+        for i in group:
+            layers[i] = low
+    return layers
+
+
+def _dominated(point, window):
+    """Доминирует ли точку одна из точек окна; доминирующая точка переносится в начало окна.
+
+    Точки окна обработаны раньше и не равны point, поэтому доминирование -
+    это «не хуже по всем координатам». Точки, часто доминирующие другие,
+    оказываются в начале окна, и последующие проверки заканчиваются раньше.
+    """
+    for j, other in enumerate(window):
+        if all(map(le, other, point)):
+            if j:
+                window[j], window[0] = window[0], other
+            return True
+    return False
+
+
+def _layers_bnl(points, groups):
+    layers = [0] * len(points)
+    members = []   # точки каждого слоя (без повторов)
+    for group in groups:
+        point = points[group[0]]
+        low, high = 0, len(members)
+        while low < high:
+            middle = (low + high) // 2
+            if _dominated(point, members[middle]):
+                low = middle + 1
+            else:
+                high = middle
+        if low == len(members):
+            members.append([point])
+        else:
+            members[low].append(point)
+        for i in group:
+            layers[i] = low
+    return layers
+
+
+def skyline_layers(points):
+    """Номер слоя недоминируемости для каждой точки (0 - граница Парето).
+
+    Args:
+        points (list): Кортежи координат одинаковой длины; все координаты
+            минимизируются.
+
+    Returns:
+        list: Номера слоёв в порядке точек.
+
+    Исключения:
+        ValueError: Если точки разной размерности.
+    """
+    if not points:
+        return []
+    dimension = len(points[0])
+    if any(len(point) != dimension for point in points):
+        raise ValueError('Точки должны иметь одинаковое число координат.')
+    groups = _sorted_groups(points)
+    if dimension == 1:
+        # Слой - номер значения среди различных значений
+        layers = [0] * len(points)
+        for layer, group in enumerate(groups):
+            for i in group:
+                layers[i] = layer
+        return layers
+    if dimension == 2:
+        return _layers_2d(points, groups)
+    if dimension == 3:
+        return _layers_3d(points, groups)
+    return _layers_bnl(points, groups)
+
+
+def skyline(points):
+    """Номера точек границы Парето (нулевого слоя) в порядке точек."""
+    return [i for i, layer in enumerate(skyline_layers(points)) if layer == 0]
+
+
+def criteria_key(criteria=None):
+    """Функция, строящая по результату региона точку для skyline_layers().
+
+    Критерии, монотонно зависящие от другого выбранного критерия
+    (DERIVED_CRITERIA), в точку не включаются.
+
+    Args:
+        criteria (dict, optional): Критерии {показатель: +1 или -1}.
+            По умолчанию PARETO_CRITERIA.
+
+    Returns:
+        callable: Функция key(result) -> tuple.
+    """
+    criteria = PARETO_CRITERIA if criteria is None else criteria
+    used = [(metric, sign) for metric, sign in criteria.items() if DERIVED_CRITERIA.get(metric) not in criteria]
+
+    def key(result):
+        point = []
+        for metric, sign in used:
+            value = result[metric]
+            if not isinstance(value, (int, float)):
+                value = float('inf') if sign < 0 else float('-inf')   # 'no payback'
+            point.append(-sign * value)
+        return tuple(point)
+    return key
+
+
+def pareto_layers(results, criteria=None):
+    """Номера слоёв Парето для результатов calculate_financials() (0 - граница Парето).
+
+    Args:
+        results (list): Результаты регионов (словари или строки FinancialTable).
+        criteria (dict, optional): Критерии {показатель: +1 или -1}.
+            По умолчанию PARETO_CRITERIA.
+
+    Returns:
+        list: Номера слоёв в порядке results.
+    """
+    return skyline_layers(list(map(criteria_key(criteria), results)))
+
+
+def dominates(a, b, criteria=None):
+    """Доминирует ли результат региона a результат региона b по критериям."""
+    key = criteria_key(criteria)
+    point_a, point_b = key(a), key(b)
+    return point_a != point_b and all(map(le, point_a, point_b))
@@ -0,0 +1,327 @@
+"""Локальная база SQLite с данными regions/businesses/assumptions и индексами по регионам.
+
+Двоичный кэш (см. data_cache.py) хранит таблицы целиком и читается целиком:
+отчёт по одному региону национальной выгрузки всё равно отображает в память
+все строки. База SQLite заполняется из CSV один раз (и заново - при изменении
+исходных файлов) и хранит строки с индексами:
+
+    regions      - region (уникальный);
+    businesses   - (region, okved), число ИП по повторным строкам пары суммируется;
+    assumptions  - (region, param), повторное значение заменяет предыдущее.
+
+Входные данные calculate_financials() для выборки регионов читаются
+подготовленными запросами: названия выборки записываются во временную
+таблицу, и каждая таблица читается одним соединением с ней по индексу, без
+полного просмотра. Без выборки таблицы читаются целиком в порядке файлов.
+
+База открывается в режиме WAL: несколько процессов читают один файл
+одновременно, а импорт выполняется в одной транзакции с блокировкой записи
+(процесс, дождавшийся блокировки, повторно сверяет отпечатки файлов и не
+импортирует данные, уже импортированные другим процессом).
+"""
+
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+from array import array
+
+from columnar_loaders import ASSUMPTION_PARAMS, AssumptionColumns, load_assumptions_columns
+from data_cache import source_stamp, stamp_matches
+from region_table import RegionTable
+import profiling
+
+STORE_DIR = os.path.join('.basepro', 'store')   # служебная директория баз SQLite
+STORE_VERSION = 1   # версия схемы (PRAGMA user_version; при изменении база пересоздаётся)
+BUSY_TIMEOUT = 60.0   # секунд ожидания блокировки, пока другой процесс импортирует данные
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE regions (
+    id INTEGER PRIMARY KEY,
+    region TEXT NOT NULL,
+    children_5_7 INTEGER NOT NULL,
+    avg_rent_per_sqm INTEGER NOT NULL
+);
+CREATE TABLE businesses (
+    id INTEGER PRIMARY KEY,
+    region TEXT NOT NULL,
+    okved TEXT NOT NULL,
+    ip_count INTEGER NOT NULL
+);
+CREATE TABLE assumptions (
+    id INTEGER PRIMARY KEY,
+    region TEXT NOT NULL,
+    param TEXT NOT NULL,
+    value INTEGER NOT NULL
+);
+"""
+# Индексы строятся после вставки строк (быстрее, чем обновлять их при вставке)
+INDEXES = (
+    'CREATE UNIQUE INDEX regions_region ON regions (region)',
+    'CREATE UNIQUE INDEX businesses_region_okved ON businesses (region, okved)',
+    'CREATE UNIQUE INDEX assumptions_region_param ON assumptions (region, param)',
+)
+
+# Запросы выборки: без выборки - все строки в порядке файлов; с выборкой -
+# соединение с временной таблицей selected, которая всегда просматривается
+# первой (CROSS JOIN фиксирует порядок соединения в SQLite): иначе
+# планировщик может предпочесть просмотр всей таблицы ради ORDER BY id
+REGIONS_QUERY = 'SELECT region, children_5_7, avg_rent_per_sqm FROM {source} ORDER BY regions.id'
+BUSINESSES_QUERY = ('SELECT region, SUM(ip_count) FROM {source}{where} '
+                    'GROUP BY region ORDER BY MIN(businesses.id)')
+ASSUMPTIONS_QUERY = 'SELECT region, param, value FROM {source} ORDER BY assumptions.id'
+SELECTED_SOURCE = 'temp.selected CROSS JOIN {table} USING (region)'
+
+
+def store_path(filenames, store_dir=STORE_DIR):
+    """Возвращает путь к базе для набора исходных файлов (одна база на набор данных)."""
+    key = '\0'.join(os.path.abspath(f) for f in filenames)
+    name = hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(store_dir, f'data-{name}.sqlite3')
+
+
+def connect(path):
+    """Открывает базу в режиме WAL (общий файл для параллельных читателей)."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    return connection
+
+
+def _meta(connection):
+    """Служебные данные базы {ключ: значение} или None, если база пуста или другой версии."""
+    if connection.execute('PRAGMA user_version').fetchone()[0] != STORE_VERSION:
+        return None
+    return {key: json.loads(value) for key, value in connection.execute('SELECT key, value FROM meta')}
+
+
+def is_current(connection, filenames, verify_hash=False):
+    """Импортированы ли в базу текущие версии исходных файлов."""
+    meta = _meta(connection)
+    if meta is None:
+        return False
+    sources = meta.get('sources', [])
+    return (len(sources) == len(filenames)
+            and all(stamp_matches(f, s, verify_hash) for f, s in zip(filenames, sources)))
+
+
+def _business_totals(filename):
+    """Число ИП по парам (регион, код) из businesses.csv и признак наличия столбца okved.
+
+    Правила пропуска строк - как в load_business_index() без фильтра кодов;
+    повторные строки пары суммируются.
+
+    Returns:
+        tuple: ({(регион, код): число ИП}, has_okved).
+    """
+    totals = {}
+    with open(filename, encoding='utf-8', newline='') as file:
+        reader = csv.reader(file, delimiter=';')
+        header = next(reader, [])
+        try:
+            i_region = header.index('region')
+            i_count = header.index('ip_count')
+        except ValueError:
+            raise ValueError(f'{filename}: ожидаются столбцы region;okved;ip_count, получено {header}') from None
+        i_okved = header.index('okved') if 'okved' in header else None
+        width = max(i_region, i_count, i_okved or 0) + 1
+        for row in reader:
+            if len(row) < width:
+                continue   # пустая строка или недостаточно полей
+            try:
+                count = int(row[i_count])
+            except ValueError:
+                continue
+            key = row[i_region], row[i_okved] if i_okved is not None else ''
+            totals[key] = totals.get(key, 0) + count
+    return totals, i_okved is not None
+
+
+def import_csv(connection, load_regions, filenames):
+    """Заменяет содержимое базы данными CSV-файлов.
+
+    Выполняется внутри транзакции вызывающего кода (см. open_store()):
+    читатели до её завершения видят прежние данные.
+
+    Args:
+        connection (sqlite3.Connection): Соединение из connect().
+        load_regions (callable): Загрузчик regions.csv (например, main_pro.load_regions).
+        filenames (tuple): Пути к regions.csv, businesses.csv и assumptions.csv.
+
+    Исключения:
+        FileNotFoundError: Если один из исходных файлов не найден.
+    """
+    regions_file, businesses_file, assumptions_file = filenames
+    # Отпечатки снимаются до разбора: изменение файла во время импорта
+    # приведёт к повторному импорту при следующем запуске
+    stamps = [source_stamp(f) for f in filenames]
+    regions_table = load_regions(regions_file)
+    totals, has_okved = _business_totals(businesses_file)
+    assumptions = load_assumptions_columns(assumptions_file)
+
+    for table in ('meta', 'regions', 'businesses', 'assumptions'):
+        connection.execute(f'DROP TABLE IF EXISTS {table}')
+    for statement in SCHEMA.split(';'):
+        if statement.strip():
+            connection.execute(statement)
+    columns = [regions_table.columns[field] for field in ('children_5_7', 'avg_rent_per_sqm')]
+    connection.executemany('INSERT INTO regions (region, children_5_7, avg_rent_per_sqm) VALUES (?, ?, ?)',
+                           zip(regions_table.regions, *columns))
+    connection.executemany('INSERT INTO businesses (region, okved, ip_count) VALUES (?, ?, ?)',
+                           ((region, code, count) for (region, code), count in totals.items()))
+    connection.executemany(
+        'INSERT INTO assumptions (region, param, value) VALUES (?, ?, ?)',
+        ((region, param, assumptions.columns[param][i])
+         for i, region in enumerate(assumptions.regions)
+         for param in assumptions.params if assumptions.present[param][i]))
+    for statement in INDEXES:
+        connection.execute(statement)
+    meta = {
+        'sources': stamps,
+        'has_okved': has_okved,
+        'assumption_params': list(assumptions.params),
+        'skipped_rows': assumptions.skipped_rows,
+        'unknown_params': assumptions.unknown_params,
+    }
+    connection.executemany('INSERT INTO meta (key, value) VALUES (?, ?)',
+                           ((key, json.dumps(value, ensure_ascii=False)) for key, value in meta.items()))
+    connection.execute(f'PRAGMA user_version={STORE_VERSION}')
+
+
+def open_store(load_regions, filenames, path=None, verify_hash=False):
+    """Открывает базу для набора файлов, при необходимости импортируя CSV.
+
+    Args:
+        load_regions (callable): Загрузчик regions.csv.
+        filenames (tuple): Пути к regions.csv, businesses.csv и assumptions.csv.
+        path (str, optional): Путь к базе. По умолчанию - store_path(filenames).
+        verify_hash (bool, optional): Всегда сверять хеш содержимого файлов.
+
+    Returns:
+        sqlite3.Connection: Соединение с актуальной базой.
+
+    Исключения:
+        FileNotFoundError: Если один из исходных файлов не найден.
+    """
+    connection = connect(path or store_path(filenames))
+    if is_current(connection, filenames, verify_hash):
+        profiling.count('load', cache_hits=1)
+        return connection
+    # Импорт - под блокировкой записи: процесс, ожидавший блокировку, пока
+    # другой процесс импортировал те же файлы, застанет актуальную базу
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        if not is_current(connection, filenames, verify_hash):
+            import_csv(connection, load_regions, filenames)
+    except BaseException:
+        connection.execute('ROLLBACK')
+        connection.close()
+        raise
+    connection.execute('COMMIT')
+    connection.execute('ANALYZE')   # статистика индексов для планировщика запросов
+    return connection
+
+
+def _sources(connection, regions):
+    """Источники строк запросов: таблицы или их соединения с выборкой регионов.
+
+    Выборка записывается во временную таблицу selected (у каждого соединения
+    своя), поэтому текст запросов не зависит от её размера и запросы
+    подготавливаются один раз.
+
+    Returns:
+        dict: {таблица: текст после FROM}.
+    """
+    tables = ('regions', 'businesses', 'assumptions')
+    if regions is None:
+        return {table: table for table in tables}
+    connection.execute('CREATE TEMP TABLE IF NOT EXISTS selected (region TEXT PRIMARY KEY)')
+    connection.execute('DELETE FROM temp.selected')
+    connection.executemany('INSERT OR IGNORE INTO temp.selected (region) VALUES (?)', ((r,) for r in regions))
+    return {table: SELECTED_SOURCE.format(table=table) for table in tables}
+
+
+def read_tables(connection, okved=None, regions=None):
+    """Читает входные данные calculate_financials() для выборки регионов.
+
+    Args:
+        connection (sqlite3.Connection): Соединение из open_store().
+        okved (iterable, optional): Коды ОКВЭД, по которым суммируется число ИП;
+            None - все коды.
+        regions (iterable, optional): Выборка регионов. По умолчанию None - все.
+
+    Returns:
+        tuple: (regions_dict, businesses_dict, assumptions) - те же типы, что
+            у load_tables() из data_cache.py.
+    """
+    meta = _meta(connection)
+    sources = _sources(connection, regions)
+
+    rows = connection.execute(REGIONS_QUERY.format(source=sources['regions'])).fetchall()
+    names = [row[0] for row in rows]
+    regions_dict = RegionTable.from_columns(names, {
+        'children_5_7': array('q', [row[1] for row in rows]),
+        'avg_rent_per_sqm': array('q', [row[2] for row in rows]),
+    })
+
+    # Без столбца okved в файле фильтр по кодам не применяется (как в load_business_index())
+    codes = () if okved is None or not meta['has_okved'] else tuple(dict.fromkeys(okved))
+    where = '' if okved is None or not meta['has_okved'] else f' WHERE okved IN ({", ".join("?" * len(codes))})'
+    rows = connection.execute(BUSINESSES_QUERY.format(source=sources['businesses'], where=where), codes).fetchall()
+    businesses_dict = RegionTable.from_columns([row[0] for row in rows],
+                                               {'ip_count': array('q', [row[1] for row in rows])})
+
+    assumptions = AssumptionColumns(meta.get('assumption_params', ASSUMPTION_PARAMS))
+    set_value = assumptions.set
+    for region, param, value in connection.execute(ASSUMPTIONS_QUERY.format(source=sources['assumptions'])):
+        set_value(region, param, value)
+    # Пропущенные строки и неизвестные параметры относятся ко всему файлу
+    assumptions.skipped_rows = [tuple(row) for row in meta['skipped_rows']]
+    assumptions.unknown_params = dict(meta['unknown_params'])
+
+    profiling.count('load', rows=len(regions_dict) + len(businesses_dict) + len(assumptions))
+    return regions_dict, businesses_dict, assumptions
+
+
+def load_tables(load_regions, filenames=('regions.csv', 'businesses.csv', 'assumptions.csv'),
+                path=None, okved=None, regions=None, verify_hash=False):
+    """Загружает три таблицы из базы SQLite, импортируя CSV при первом обращении.
+
+    Args:
+        load_regions (callable): Загрузчик regions.csv (например, main_pro.load_regions).
+        filenames (tuple, optional): Пути к regions.csv, businesses.csv и assumptions.csv.
+        path (str, optional): Путь к базе. По умолчанию - store_path(filenames).
+        okved (iterable, optional): Коды ОКВЭД; None - все коды.
+        regions (iterable, optional): Выборка регионов (чтение по индексу).
+            По умолчанию None - все регионы.
+        verify_hash (bool, optional): Всегда сверять хеш содержимого файлов.
+
+    Returns:
+        tuple: (regions_dict, businesses_dict, assumptions).
+
+    Исключения:
+        FileNotFoundError: Если один из исходных файлов не найден.
+    """
+    connection = open_store(load_regions, filenames, path, verify_hash)
+    try:
+        return read_tables(connection, okved, regions)
+    finally:
+        connection.close()
+
+
+def load_region_names(load_regions, filenames=('regions.csv', 'businesses.csv', 'assumptions.csv'), path=None):
+    """Названия регионов из базы в порядке regions.csv (при необходимости импортирует CSV).
+
+    Returns:
+        list: Названия регионов.
+    """
+    connection = open_store(load_regions, filenames, path)
+    try:
+        return [region for region, in connection.execute('SELECT region FROM regions ORDER BY id')]
+    finally:
+        connection.close()
@@ -0,0 +1,101 @@
+"""Генератор синтетических исходных данных произвольного масштаба.
+
+Создаёт regions.csv, businesses.csv и assumptions.csv в том же формате, что и
+рабочие файлы проекта, для заданного числа регионов (от сотен до миллионов).
+Значения равномерно распределены в диапазонах, близких к реальным данным, и
+воспроизводимы при одинаковом зерне. Файлы пишутся потоково, поэтому память
+не зависит от числа регионов.
+
+Пример:
+    python synthetic_data.py --regions 100000 --output-dir data_100k
+    python main_pro.py --data-dir data_100k report --overview --top 50
+"""
+
+import argparse
+import csv
+import os
+import random
+
+from columnar_loaders import ASSUMPTION_PARAMS
+
+# Диапазоны синтетических входных данных (min, max) в терминах
+# batch_financials.INPUT_COLUMNS
+SYNTHETIC_RANGES = {
+    'rent': (600, 1500),
+    'area': (30, 60),
+    'teachers': (1, 4),
+    'salary': (30000, 50000),
+    'avg_check': (2500, 4500),
+    'marketing': (8000, 25000),
+    'other_costs': (4000, 12000),
+    'children_5_7': (20000, 60000),
+    'ip_count': (150, 700),
+}
+
+# Столбец SYNTHETIC_RANGES для каждого параметра assumptions.csv
+ASSUMPTION_RANGES = {
+    'area_sqm': 'area',
+    'teachers': 'teachers',
+    'salary_per_teacher': 'salary',
+    'avg_check': 'avg_check',
+    'marketing': 'marketing',
+    'other_costs': 'other_costs',
+}
+
+DEFAULT_OKVED = '85.59'   # код ОКВЕД в businesses.csv
+
+
+def region_names(count):
+    """Названия синтетических регионов: Регион-000000, Регион-000001, ..."""
+    width = max(6, len(str(count - 1)))
+    return [f'Регион-{i:0{width}d}' for i in range(count)]
+
+
+def generate_dataset(output_dir, count, seed=0):
+    """Записывает три CSV-файла с синтетическими данными.
+
+    Args:
+        output_dir (str): Директория для файлов (создаётся при необходимости).
+        count (int): Число регионов.
+        seed (int, optional): Зерно генератора. По умолчанию 0.
+
+    Returns:
+        tuple: Пути к regions.csv, businesses.csv и assumptions.csv.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    rnd = random.Random(seed)
+    randint = rnd.randint
+    names = region_names(count)
+    paths = tuple(os.path.join(output_dir, name) for name in ('regions.csv', 'businesses.csv', 'assumptions.csv'))
+    ranges = {param: SYNTHETIC_RANGES[column] for param, column in ASSUMPTION_RANGES.items()}
+
+    with open(paths[0], 'w', encoding='utf-8', newline='') as regions_file, \
+            open(paths[1], 'w', encoding='utf-8', newline='') as businesses_file, \
+            open(paths[2], 'w', encoding='utf-8', newline='') as assumptions_file:
+        regions = csv.writer(regions_file, delimiter=';')
+        businesses = csv.writer(businesses_file, delimiter=';')
+        assumptions = csv.writer(assumptions_file, delimiter=';')
+        regions.writerow(['region', 'children_5_7', 'avg_rent_per_sqm'])
+        businesses.writerow(['region', 'okved', 'ip_count'])
+        assumptions.writerow(['region', 'param', 'value'])
+        for name in names:
+            regions.writerow([name, randint(*SYNTHETIC_RANGES['children_5_7']),
+                              randint(*SYNTHETIC_RANGES['rent'])])
+            businesses.writerow([name, DEFAULT_OKVED, randint(*SYNTHETIC_RANGES['ip_count'])])
+            assumptions.writerows([name, param, randint(*ranges[param])] for param in ASSUMPTION_PARAMS)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--regions', type=lambda text: int(float(text)), default=1000,
+                        help='число регионов (допускается запись вида 1e5)')
+    parser.add_argument('--output-dir', default='synthetic_data', help='директория для CSV-файлов')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    for path in generate_dataset(args.output_dir, args.regions, args.seed):
+        print(f'Сохранено: {path}')
+
+
+if __name__ == '__main__':
+    main()
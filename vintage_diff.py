@@ -0,0 +1,211 @@
+"""Изменения выводов между двумя снимками входных данных (например, поквартальными).
+
+Показатели обоих снимков рассчитываются пакетно (calculate_financials_batch()),
+затем результаты соединяются по региону хеш-соединением: по старому снимку
+строится словарь {регион: номер строки}, новый снимок просматривается один
+раз, и для каждого его региона строка старого снимка находится за O(1).
+Строки сравниваются кортежами показателей целиком, поэтому неизменившиеся
+регионы (обычно большинство) отбрасываются одним сравнением. Время линейно
+по числу регионов, изменения выдаются потоково - в порядке нового снимка,
+затем выбывшие регионы в порядке старого.
+
+    changed  - регион есть в обоих снимках, изменился хотя бы один показатель
+               (или уровень - с levels_only);
+    added    - регион есть только в новом снимке;
+    removed  - регион есть только в старом снимке.
+"""
+
+import csv
+import math
+from collections import Counter
+from heapq import heappush, heapreplace
+
+from batch_financials import NO_IP_DATA
+from create_table import format_fancy_table
+
+# Сравниваемые числовые показатели (для них в выгрузке приводится разница)
+DIFF_METRICS = (
+    'children_5_7',
+    'ip_count',
+    'total_costs',
+    'monthly_revenue',
+    'profit',
+    'profitability',
+    'break_even_children',
+    'competition_density',
+    'payback_period_month',   # 'no payback' - разница не определена
+)
+DIFF_LEVELS = ('profitability_level', 'competition_level')
+DIFF_FIELDS = DIFF_METRICS + DIFF_LEVELS
+DIFF_TOP = 20   # регионов с наибольшим изменением прибыли в отчёте
+
+
+def _rows(batch):
+    """Строки пакетного результата в виде кортежей значений DIFF_FIELDS."""
+    return list(zip(*(batch[field] for field in DIFF_FIELDS)))
+
+
+def iter_changes(old, new, levels_only=False):
+    """Потоково выдаёт изменения между результатами двух снимков.
+
+    Args:
+        old (dict): Результат calculate_financials_batch() по старому снимку.
+        new (dict): Результат calculate_financials_batch() по новому снимку.
+        levels_only (bool, optional): Выдавать только регионы со сменой уровня
+            рентабельности или конкуренции (и добавленные/выбывшие). По умолчанию False.
+
+    Yields:
+        tuple: (регион, статус 'changed' | 'added' | 'removed', строка старого
+            снимка или None, строка нового снимка или None, изменившиеся поля).
+            Строки - кортежи значений в порядке DIFF_FIELDS.
+    """
+    old_rows, new_rows = _rows(old), _rows(new)
+    # Хеш-соединение: построение по старому снимку, просмотр нового
+    index = {region: i for i, region in enumerate(old['region'])}
+    first_level = len(DIFF_METRICS)
+    matched = bytearray(len(old_rows))
+    for region, new_row in zip(new['region'], new_rows):
+        i = index.get(region)
+        if i is None:
+            yield region, 'added', None, new_row, DIFF_FIELDS
+            continue
+        matched[i] = 1
+        old_row = old_rows[i]
+        if old_row == new_row:
+            continue
+        if levels_only and old_row[first_level:] == new_row[first_level:]:
+            continue
+        changed = tuple(field for field, a, b in zip(DIFF_FIELDS, old_row, new_row) if a != b)
+        yield region, 'changed', old_row, new_row, changed
+    for region, old_row, seen in zip(old['region'], old_rows, matched):
+        if not seen:
+            yield region, 'removed', old_row, None, DIFF_FIELDS
+
+
+def _delta(field, a, b):
+    """Разница показателя или '' (нет значения, нет данных об ИП или срок окупаемости не определён)."""
+    if field == 'ip_count' and NO_IP_DATA in (a, b):
+        return ''
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        if isinstance(a, float) or isinstance(b, float):
+            return round(b - a, 1) if math.isfinite(a) and math.isfinite(b) else ''
+        return b - a
+    return ''
+
+
+def write_diff(changes, path, top=DIFF_TOP):
+    """Записывает изменения в CSV (потоково) и собирает сводку для отчёта.
+
+    Для каждого показателя в файле три столбца (_old, _new, _delta), для
+    уровней - два (_old, _new); у добавленных и выбывших регионов значения
+    отсутствующего снимка пустые.
+
+    Args:
+        changes (iterable): Результат iter_changes().
+        path (str): Путь к CSV-файлу.
+        top (int, optional): Сколько регионов с наибольшим изменением прибыли
+            сохранить для отчёта. По умолчанию 20.
+
+    Returns:
+        dict: Сводка: 'counts' (Counter по статусам), 'level_changes'
+            ({поле уровня: Counter {(было, стало): регионов}}), 'level_changed'
+            (регионов со сменой хотя бы одного уровня), 'top' (изменения с
+            наибольшим ненулевым |Δ прибыли| по убыванию).
+    """
+    counts = Counter()
+    level_changes = {field: Counter() for field in DIFF_LEVELS}
+    level_changed = 0
+    heap = []   # (|Δ прибыли|, -порядковый номер, изменение): в корне - наименьшее
+    profit = DIFF_FIELDS.index('profit')
+    levels = [(field, DIFF_FIELDS.index(field)) for field in DIFF_LEVELS]
+    blank = ('',) * len(DIFF_FIELDS)
+
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(['region', 'status', 'changed',
+                         *(f'{field}_{suffix}' for field in DIFF_METRICS for suffix in ('old', 'new', 'delta')),
+                         *(f'{field}_{suffix}' for field in DIFF_LEVELS for suffix in ('old', 'new'))])
+        for seq, change in enumerate(changes):
+            region, status, old_row, new_row, changed = change
+            counts[status] += 1
+            a, b = old_row or blank, new_row or blank
+            writer.writerow([region, status, ','.join(changed) if status == 'changed' else '',
+                             *(value for i in range(len(DIFF_METRICS)) for value in (a[i], b[i], _delta(DIFF_FIELDS[i], a[i], b[i]))),
+                             *(value for _, i in levels for value in (a[i], b[i]))])
+            if status != 'changed':
+                continue
+            flipped = False
+            for field, i in levels:
+                if a[i] != b[i]:
+                    level_changes[field][a[i], b[i]] += 1
+                    flipped = True
+            level_changed += flipped
+            # Регионы без изменения прибыли (сменилась только конкуренция и т.п.) в топ не попадают
+            if b[profit] == a[profit]:
+                continue
+            entry = (abs(b[profit] - a[profit]), -seq, change)
+            if len(heap) < top:
+                heappush(heap, entry)
+            elif entry[:2] > heap[0][:2]:
+                heapreplace(heap, entry)
+    heap.sort(key=lambda entry: entry[:2], reverse=True)
+    return {'counts': counts, 'level_changes': level_changes, 'level_changed': level_changed,
+            'top': [change for *_, change in heap]}
+
+
+def generate_diff_report(summary, old_label, new_label, old_count, new_count, labels=None):
+    """Генерирует текстовый отчёт об изменениях между снимками.
+
+    Args:
+        summary (dict): Результат write_diff().
+        old_label (str): Описание старого снимка (например, директория).
+        new_label (str): Описание нового снимка.
+        old_count (int): Число регионов в старом снимке.
+        new_count (int): Число регионов в новом снимке.
+        labels (dict, optional): Текстовые метки уровней {поле уровня:
+            {уровень: метка}}. По умолчанию уровни выводятся как есть.
+
+    Returns:
+        str: Текст отчёта.
+    """
+    labels = labels or {}
+    counts = summary['counts']
+
+    def label(field, level):
+        return labels.get(field, {}).get(level, level)
+
+    sections = []
+    titles = {'profitability_level': 'СМЕНА УРОВНЯ РЕНТАБЕЛЬНОСТИ', 'competition_level': 'СМЕНА УРОВНЯ КОНКУРЕНЦИИ'}
+    for field in DIFF_LEVELS:
+        transitions = summary['level_changes'][field]
+        if not transitions:
+            continue
+        rows = [[label(field, before), label(field, after), count]
+                for (before, after), count in sorted(transitions.items(), key=lambda item: (-item[1], item[0]))]
+        sections.append(f'{titles[field]}\n' + format_fancy_table(["БЫЛО", "СТАЛО", "РЕГИОНОВ"], rows))
+
+    if summary['top']:
+        profit = DIFF_FIELDS.index('profit')
+        profitability = DIFF_FIELDS.index('profitability')
+        level = DIFF_FIELDS.index('profitability_level')
+        competition = DIFF_FIELDS.index('competition_level')
+        rows = []
+        for region, _, a, b, _ in summary['top']:
+            rows.append([region, a[profit], b[profit], b[profit] - a[profit],
+                         f'{a[profitability]:.1f}% → {b[profitability]:.1f}%',
+                         f'{label("profitability_level", a[level])} → {label("profitability_level", b[level])}',
+                         f'{label("competition_level", a[competition])} → {label("competition_level", b[competition])}'])
+        headers = ["РЕГИОН", "ПРИБЫЛЬ БЫЛО", "ПРИБЫЛЬ СТАЛО", "РАЗНИЦА", "РЕНТАБЕЛЬНОСТЬ", "УРОВЕНЬ", "КОНКУРЕНЦИЯ"]
+        sections.append(f'НАИБОЛЬШИЕ ИЗМЕНЕНИЯ ПРИБЫЛИ (ТОП-{len(rows)})\n'
+                        + format_fancy_table(headers, rows, currency_columns=[1, 2, 3]))
+
+    body = '\n\n'.join(sections) if sections else 'Выводы по регионам не изменились.'
+    return f"""ИЗМЕНЕНИЯ МЕЖДУ СНИМКАМИ ДАННЫХ
+• Было:                      {old_label} ({old_count} регионов)
+• Стало:                     {new_label} ({new_count} регионов)
+• Изменились показатели:     {counts['changed']} регионов, из них уровень: {summary['level_changed']}
+• Новые регионы:             {counts['added']}
+• Выбывшие регионы:          {counts['removed']}
+
+{body}
+"""